@@ -0,0 +1,91 @@
+# coding: utf-8
+"""
+Measures how long the event loop is blocked while texts are typeset with
+:meth:`typus.core.TypusCore.aprocess`, compared to calling Typus right in
+the loop, and what the executor costs for short texts, which is where
+``inline_size`` of :class:`typus.aio.AsyncTypus` comes from.
+
+    $ python -m benchmarks.aio --docs 20 --size 200000
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import asyncio
+from builtins import *  # noqa
+from timeit import default_timer
+
+from typus import EnTypus
+from typus.aio import AsyncTypus
+
+from .corpus import Corpus
+
+
+async def ticker(lags, interval=0.001):
+    # Longest delay of a timer is how long the loop has been blocked
+    while True:
+        start = default_timer()
+        await asyncio.sleep(interval)
+        lags.append(default_timer() - start - interval)
+
+
+async def blocking(aio, texts, inline):
+    lags = []
+    tick = asyncio.ensure_future(ticker(lags))
+    await asyncio.sleep(0.01)
+    start = default_timer()
+    if inline:
+        for text in texts:
+            aio.typus(text)
+            await asyncio.sleep(0)
+    else:
+        await aio.process_many(texts)
+    elapsed = default_timer() - start
+    tick.cancel()
+    return elapsed, max(lags or [0])
+
+
+async def overhead(aio, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = default_timer()
+        await aio.process(text)
+        best = min(best, default_timer() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=20)
+    parser.add_argument('--size', type=int, default=200000,
+                        help='document length in characters')
+    parser.add_argument('--repeat', type=int, default=200)
+    options = parser.parse_args()
+
+    typus = EnTypus()
+    corpus = Corpus()
+    texts = corpus.texts(options.docs, options.size)
+
+    print('mode      seconds  max loop lag, ms')
+    for inline in (True, False):
+        aio = AsyncTypus(typus, inline_size=0)
+        elapsed, lag = asyncio.run(blocking(aio, texts, inline))
+        aio.close()
+        print('{0:8}  {1:7.2f}  {2:16.1f}'.format(
+            'inline' if inline else 'executor', elapsed, lag * 1000))
+
+    print('\nsize   inline, us  executor, us')
+    for size in (64, 256, 1024, 4096, 16384):
+        text = corpus.text(size)
+        typus(text)
+        inline = AsyncTypus(typus, inline_size=size + 1)
+        executor = AsyncTypus(typus, inline_size=0)
+        print('{0:5d}  {1:10.0f}  {2:12.0f}'.format(
+            size, asyncio.run(overhead(inline, text, options.repeat)) * 1e6,
+            asyncio.run(overhead(executor, text, options.repeat)) * 1e6))
+        executor.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# coding: utf-8
+"""
+Compares :meth:`typus.core.TypusCore.process_bytes` with decoding bytes,
+typesetting the text and encoding it back: time and memory allocated at
+peak, on pages with large ``<pre>`` and ``<script>`` blocks and on plain
+text, where there is nothing to skip.
+
+    $ python -m benchmarks.bytes --pages 20 --size 20000 --block 50000
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import timeit
+import tracemalloc
+from builtins import *  # noqa
+
+from typus import en_typus
+
+from .corpus import Corpus
+
+
+def page(corpus, size, block):
+    # Text with a script and a code listing in between, both of ``block``
+    # characters, which typus never touches
+    script = '<script>var s = "{0}";</script>'.format('x -- "y" ' * (
+        block // 9))
+    code = '<pre><code>{0}</code></pre>'.format(
+        'print("(c) {0}...")\n'.format('ы' * 20) * (block // 40))
+    return ''.join(('<html><head>', script, '</head><body><p>',
+                    corpus.text(size // 2), '</p>', code, '<p>',
+                    corpus.text(size // 2), '</p></body></html>'))
+
+
+def decode(data):
+    return en_typus(data.decode('utf-8')).encode('utf-8')
+
+
+def process_bytes(data):
+    return en_typus.process_bytes(data)
+
+
+def peak(func, pages):
+    # Largest memory allocated at once, above the input
+    tracemalloc.start()
+    for data in pages:
+        func(data)
+    size = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--size', type=int, default=20000,
+                        help='text characters per page')
+    parser.add_argument('--block', type=int, default=50000,
+                        help='characters of every skipped block')
+    parser.add_argument('--repeat', type=int, default=3)
+    options = parser.parse_args()
+
+    corpus = Corpus(html=0.2)
+    samples = (
+        ('html', [page(corpus, options.size, options.block).encode('utf-8')
+                  for _ in range(options.pages)]),
+        ('text', [corpus.text(options.size).encode('utf-8')
+                  for _ in range(options.pages)]),
+    )
+
+    print('{0:6s} {1:14s} {2:>9s} {3:>10s} {4:>11s}'.format(
+        '', '', 'time, s', 'MB/s', 'peak, KiB'))
+    for name, pages in samples:
+        size = sum(len(x) for x in pages)
+        for func in (decode, process_bytes):
+            assert all(func(x) == decode(x) for x in pages[:2])
+            elapsed = min(timeit.repeat(
+                lambda: [func(x) for x in pages], number=1,
+                repeat=options.repeat))
+            print('{0:6s} {1:14s} {2:9.4f} {3:10.1f} {4:11.0f}'.format(
+                name, func.__name__, elapsed, size / elapsed / 1e6,
+                peak(func, pages) / 1024))
+
+
+if __name__ == '__main__':
+    main()
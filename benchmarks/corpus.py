@@ -0,0 +1,159 @@
+# coding: utf-8
+"""
+Generates synthetic English and Russian texts for benchmarks. Texts are
+random but reproducible: the same options and seed give the same text.
+
+    $ python -m benchmarks.corpus --size 2000 --html 0.3 --depth 3
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import random
+from builtins import *  # noqa
+
+WORDS = {
+    'en': (
+        'the a of and to in is it you that he was for on are with as his '
+        'they at be this from have or by one had not but what all were '
+        'when we there can an your which their said if do will each about '
+        'how up out them then she many some so these would other into has '
+        'more her two like him see time could no make than first been its '
+        'who now people my made over did down only way find use may water '
+        'long little very after words called just where most know'
+    ).split(),
+    'ru': (
+        'и в не на я быть он с что а по это она этот к но они мы как из у '
+        'который то за свой что весь год от так о для ты же все тот мочь '
+        'вы человек такой его сказать только или еще бы себя один как уже '
+        'до время если сам когда другой вот говорить наш мой знать стать '
+        'при чтобы дело жизнь кто первый очень два день её новый рука даже '
+        'во со раз где там под можно ну какой после их работа без самый'
+    ).split(),
+}
+
+UNITS = {
+    'en': 'mm cm m km kg g ml l pages dollars pcs'.split(),
+    'ru': 'мм см м км кг г мл л страниц руб. шт.'.split(),
+}
+
+SYMBOLS = '(c) (r) (tm) +- <= >= -> <- ...'.split()
+
+TAGS = ('b', 'i', 'em', 'strong', 'span', 'a href="/foo/"')
+
+
+class Corpus(object):
+    """
+    Makes texts of paragraphs of sentences, every sentence is English or
+    Russian.
+
+    :param float html: Share of sentences with html tags in them, some
+        of those have ``<code>`` blocks.
+    :param int depth: Quotes nesting depth, ``0`` for no quotes.
+    :param float digits: Share of words which are numbers, units, ranges,
+        fractions and math.
+    :param float cyrillic: Share of Russian sentences.
+    :param int seed: Random seed.
+    """
+
+    def __init__(self, html=0.1, depth=2, digits=0.1, cyrillic=0.5, seed=0):
+        self.html, self.depth = html, depth
+        self.digits, self.cyrillic = digits, cyrillic
+        self.random = random.Random(seed)
+
+    def text(self, size):
+        """
+        Returns a text of ``size`` characters and some more, since it ends
+        with a whole sentence.
+        """
+
+        paragraphs, length = [], 0
+        while length < size:
+            paragraph = ' '.join(self.sentence() for _ in range(
+                self.random.randint(1, 6)))
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        return '\n\n'.join(paragraphs)
+
+    def texts(self, count, size):
+        """
+        Returns a list of texts of about ``size`` characters.
+        """
+
+        return [self.text(size) for _ in range(count)]
+
+    def sentence(self):
+        lang = 'ru' if self.random.random() < self.cyrillic else 'en'
+        words = [self.word(lang) for _ in range(self.random.randint(4, 16))]
+
+        if self.depth:
+            start = self.random.randint(0, len(words) - 1)
+            end = self.random.randint(start, len(words) - 1)
+            words[start:end + 1] = [self.quote(words[start:end + 1])]
+
+        if self.random.random() < self.html:
+            index = self.random.randint(0, len(words) - 1)
+            words[index] = self.tag(words[index])
+
+        if self.random.random() < 0.2:
+            words.insert(self.random.randint(1, len(words)),
+                         self.random.choice(('-', '--', '—')))
+
+        sentence = ' '.join(words)
+        return sentence[0].upper() + sentence[1:] + self.random.choice(
+            '....!?')
+
+    def word(self, lang):
+        if self.random.random() >= self.digits:
+            return self.random.choice(WORDS[lang])
+
+        number = self.random.randint(1, 2000)
+        kind = self.random.randint(0, 6)
+        if kind == 0:
+            return '{0} {1}'.format(number, self.random.choice(UNITS[lang]))
+        if kind == 1:
+            return '{0}-{1}'.format(number, number + self.random.randint(1, 9))
+        if kind == 2:
+            return self.random.choice(('1/2', '1/4', '3/4', '2/3'))
+        if kind == 3:
+            return '{0}%'.format(number % 100)
+        if kind == 4:
+            return '{0} x {1}'.format(number, self.random.randint(1, 99))
+        if kind == 5:
+            return self.random.choice(SYMBOLS)
+        return str(number)
+
+    def quote(self, words):
+        # Nested quotes go at the edges: ""foo" bar"
+        depth = self.random.randint(1, self.depth)
+        text = ' '.join(words)
+        for level in range(depth):
+            quote = self.random.choice('"\'') if level else '"'
+            text = '{0}{1}{0}'.format(quote, text)
+        return text
+
+    def tag(self, word):
+        if self.random.random() < 0.1:
+            return '<code>"{0}" (c)</code>'.format(word)
+        tag = self.random.choice(TAGS)
+        return '<{0}>{1}</{2}>'.format(tag, word, tag.split()[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--html', type=float, default=0.1)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--digits', type=float, default=0.1)
+    parser.add_argument('--cyrillic', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    corpus = Corpus(options.html, options.depth, options.digits,
+                    options.cyrillic, options.seed)
+    print(corpus.text(options.size))
+
+
+if __name__ == '__main__':
+    main()
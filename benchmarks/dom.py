@@ -0,0 +1,73 @@
+# coding: utf-8
+"""
+Compares typesetting a whole html page with the streaming html mode,
+:meth:`typus.core.TypusCore.stream_html`: time and memory allocated at
+peak, for pages of growing size. Pages are generated and fed by chunks,
+results are dropped, so the streaming mode only holds a run of text.
+
+    $ python -m benchmarks.dom --paragraphs 100 1000 10000
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import tracemalloc
+from builtins import *  # noqa
+from timeit import default_timer
+
+from typus import en_typus
+
+from .corpus import Corpus
+
+
+def page(paragraphs, size):
+    # Yields chunks of html of paragraphs and code listings
+    corpus = Corpus(html=0.3, seed=1)
+    yield '<html><head><style>p { margin: 0 }</style></head><body>\n'
+    for index in range(paragraphs):
+        yield '<p>{0}</p>\n'.format(corpus.text(size))
+        if index % 10 == 9:
+            yield '<pre><code>x = "{0}" -- 1</code></pre>\n'.format(index)
+    yield '</body></html>\n'
+
+
+def whole(chunks):
+    return len(en_typus(''.join(chunks)))
+
+
+def stream(chunks):
+    return sum(len(x) for x in en_typus.stream_html(chunks))
+
+
+def measure(func, paragraphs, size):
+    tracemalloc.start()
+    start = default_timer()
+    length = func(page(paragraphs, size))
+    elapsed = default_timer() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return length, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, nargs='+',
+                        default=[100, 1000, 5000])
+    parser.add_argument('--size', type=int, default=300,
+                        help='characters per paragraph')
+    options = parser.parse_args()
+
+    print('{0:>10s} {1:>10s} {2:8s} {3:>9s} {4:>11s}'.format(
+        'paragraphs', 'chars', '', 'time, s', 'peak, KiB'))
+    for paragraphs in options.paragraphs:
+        for func in (whole, stream):
+            length, elapsed, peak = measure(func, paragraphs, options.size)
+            print('{0:10d} {1:10d} {2:8s} {3:9.3f} {4:11.0f}'.format(
+                paragraphs, length, func.__name__, elapsed, peak / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# coding: utf-8
+"""
+Compares regex engines which are installed, see :mod:`typus.engines`:
+throughput on generated corpora, the number of patterns which fall back
+to :mod:`re` and whether results are the same as with :mod:`re` alone.
+
+    $ pip install regex google-re2
+    $ python -m benchmarks.engines --docs 200 --fallbacks
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+from builtins import *  # noqa
+from timeit import default_timer
+
+from typus import EnTypus, RuTypus
+from typus.engines import available_engines, fallbacks
+
+from .corpus import Corpus
+
+
+def typus(base, engine):
+    return type(str('Typus'), (base, ), dict(regex_engine=engine))()
+
+
+def throughput(typus, texts, repeat):
+    # Warms up lazy compilation
+    for text in texts:
+        typus(text)
+    best = float('inf')
+    for _ in range(repeat):
+        start = default_timer()
+        for text in texts:
+            typus(text)
+        best = min(best, default_timer() - start)
+    return sum(len(x) for x in texts) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--size', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fallbacks', action='store_true',
+                        help='lists patterns which run with re')
+    options = parser.parse_args()
+
+    texts = Corpus().texts(options.docs, options.size)
+    print('engine  typus     chars/s  fallbacks  same')
+    for name in available_engines():
+        for base in (EnTypus, RuTypus):
+            reference = typus(base, None)
+            tested = typus(base, name)
+            same = all(tested(x) == reference(x) for x in texts)
+            skipped = fallbacks(tested)
+            print('{0:7} {1:8} {2:9.0f} {3:10} {4}'.format(
+                name, base.__name__,
+                throughput(tested, texts, options.repeat),
+                len(skipped), 'yes' if same else 'NO'))
+            if options.fallbacks:
+                for pattern, reason in skipped:
+                    print('    {0}: {1}'.format(pattern, reason))
+
+
+if __name__ == '__main__':
+    main()
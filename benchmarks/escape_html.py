@@ -0,0 +1,106 @@
+# coding: utf-8
+"""
+Compares :class:`typus.processors.EscapeHtml` single-pass scanner and
+one-pass restoration with the former three regex passes and a replace
+per tag on tag-dense documents.
+
+    $ python -m benchmarks.escape_html --rows 2000 --repeat 5
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import timeit
+from builtins import *  # noqa
+from itertools import count
+
+from typus import en_typus
+from typus.processors import EscapeHtml
+from typus.utils import re_compile
+
+
+class RegexEscapeHtml(EscapeHtml):
+    """
+    The former implementation: skipped blocks, tags and comments are
+    replaced one pattern after another, then put back one by one.
+    """
+
+    patterns = (
+        re_compile(r'(<)({0})(.*?>.*?</\2>)'.format(EscapeHtml.skiptags)),
+        re_compile(r'(<[\!\?/]?[a-z]+.*?>)'),
+        re_compile(r'(<\!\-\-.*?\-\->)'),
+    )
+
+    def _save_values(self, text, storage, counter, **kwargs):
+        def replace(match):
+            key = self._key(next(counter))
+            storage.append((key, ''.join(match.groups())))
+            return key
+
+        for pattern in self.patterns:
+            text = pattern.sub(replace, text)
+        return text
+
+    def _restore_values(self, text, storage, **kwargs):
+        for key, value in reversed(storage):
+            text = text.replace(key, value)
+        return text
+
+
+def table(rows):
+    row = ('<tr class="row"><td><b>"{0}"</b></td><td><i>3-5</i> mm</td>'
+           '<td><a href="/item/{0}/" title="item">(c) item</a></td>'
+           '<!-- row {0} --><td><code>x = "{0}"</code></td></tr>\n')
+    return '<table>\n{0}</table>'.format(
+        ''.join(row.format(i) for i in range(rows)))
+
+
+def unclosed(rows):
+    # Neither tags nor comments are closed, the former patterns scan
+    # to the end of text for every one of them
+    return '<b "{0}" <!-- '.format('x' * 10) * rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    for text in (table(options.rows), unclosed(options.rows)):
+        compare(text, options.repeat)
+
+
+def compare(text, repeat):
+    print('{0} chars, {1} tags'.format(len(text), text.count('<')))
+
+    results = {}
+    for processor in (RegexEscapeHtml, EscapeHtml):
+        escape = processor(en_typus)
+        storage = []
+
+        def save():
+            del storage[:]
+            return escape._save_values(text, storage, count())
+
+        escaped = results[processor.__name__] = save()
+
+        def restore():
+            return escape._restore_values(escaped, storage)
+
+        assert restore() == text
+        print('{0:16s} save {1:8.4f}s  restore {2:8.4f}s'.format(
+            processor.__name__,
+            min(timeit.repeat(save, number=1, repeat=repeat)),
+            min(timeit.repeat(restore, number=1, repeat=repeat))))
+
+    # Both leave the same text to process, only keys are numbered
+    # in a different order
+    strip = EscapeHtml.re_keys.sub
+    assert (strip('', results['EscapeHtml']) ==
+            strip('', results['RegexEscapeHtml']))
+
+
+if __name__ == '__main__':
+    main()
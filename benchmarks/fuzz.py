@@ -0,0 +1,142 @@
+# coding: utf-8
+"""
+Looks for input which takes superlinear time for any built-in expression
+or processor pattern. Texts are random short seeds repeated to grow,
+which is the way catastrophic backtracking usually shows up, with some
+random characters around. A pattern is reported if a text four times as
+long takes more than ``--ratio`` times as long, and does so again twice
+as long. Runs until the time is over, exits with 1 if anything is found.
+
+    $ python -m benchmarks.fuzz --time 60 --seed 1
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import random
+import sys
+import time
+from builtins import *  # noqa
+from functools import partial
+from timeit import default_timer
+
+from typus import EnTypus, RuTypus
+from typus.chars import (DLQUO, LAQUO, LDQUO, MDASH, MINUS, NBSP, NDASH,
+                         NNBSP, RAQUO, RDQUO, TIMES)
+from typus.core import Boundary
+from typus.processors import EscapeHtml, Expressions, Quotes
+
+# Characters built-in patterns look for, the ones they read are added
+ALPHABET = (
+    ' \n\r\t.,:;!?…-+=*/<>()[]"\'`%$&№_' + NBSP + NNBSP + NDASH + MDASH +
+    MINUS + TIMES + LAQUO + RAQUO + LDQUO + RDQUO + DLQUO +
+    'aAcxz19яЯсрх'
+)
+
+# Texts get long enough to tell quadratic time from noise
+SIZE = 2000
+
+
+def patterns():
+    """
+    Yields names, compiled patterns and functions which run them the way
+    Typus does, of every built-in rule.
+    """
+
+    seen = set()
+    for cls in (EnTypus, RuTypus):
+        for name, rule in Expressions(cls()).named_rules:
+            if rule.expr.pattern not in seen:
+                seen.add(rule.expr.pattern)
+                yield name, rule.expr, partial(rule.expr.sub, rule.repl)
+
+    # Tags are looked for up to the last '>' only
+    escape_html = EscapeHtml(EnTypus())
+    yield ('EscapeHtml.re_tags', EscapeHtml.re_tags,
+           partial(escape_html._escape_tags, replace=''))
+    for name, expr in (
+            ('EscapeHtml.re_skiptags', EscapeHtml.re_skiptags),
+            ('EscapeHtml.re_skiptags_tail', EscapeHtml.re_skiptags_tail),
+            ('EscapeHtml.re_keys', EscapeHtml.re_keys),
+            ('Quotes.re_normalize', Quotes.re_normalize),
+            ('Quotes.re_quotes', Quotes.re_quotes),
+            ('Boundary.re_tokens', Boundary.re_tokens)):
+        yield name, expr, partial(expr.sub, '')
+    # Matched at the beginning of lines only
+    yield 'Boundary.re_blank', Boundary.re_blank, Boundary.re_blank.match
+
+
+def timing(apply, text):
+    best = float('inf')
+    for _ in range(2):
+        start = default_timer()
+        apply(text)
+        best = min(best, default_timer() - start)
+    return best
+
+
+def grow(seed, prefix, suffix, size):
+    return prefix + seed * (size // len(seed)) + suffix
+
+
+def fuzz(expr, apply, random, ratio):
+    """
+    Tries a random text and returns it if it takes superlinear time.
+    """
+
+    alphabet = ALPHABET + ''.join(set(expr.pattern) - set('\\{}^$|'))
+    choice = random.choice
+    seed = ''.join(choice(alphabet) for _ in range(random.randint(1, 6)))
+    prefix = ''.join(choice(alphabet) for _ in range(random.randint(0, 2)))
+    suffix = ''.join(choice(alphabet) for _ in range(random.randint(0, 2)))
+
+    small = timing(apply, grow(seed, prefix, suffix, SIZE))
+    large = timing(apply, grow(seed, prefix, suffix, SIZE * 4))
+    # Fast enough for any length
+    if large < 0.002 or large < small * ratio:
+        return None
+
+    # Makes sure it's not noise
+    larger = timing(apply, grow(seed, prefix, suffix, SIZE * 8))
+    if larger < large * ratio / 2:
+        return None
+    return seed, prefix, suffix, small, large, larger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--time', type=float, default=60,
+                        help='seconds to run for')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ratio', type=float, default=8,
+                        help='time ratio of texts 4x as long to report, '
+                             'linear is 4 and quadratic is 16')
+    options = parser.parse_args()
+
+    rng = random.Random(options.seed)
+    rules = list(patterns())
+    found = {}
+    tries = 0
+    deadline = time.time() + options.time
+    while time.time() < deadline:
+        for name, expr, apply in rules:
+            if name in found:
+                continue
+            result = fuzz(expr, apply, rng, options.ratio)
+            tries += 1
+            if result:
+                found[name] = result
+                seed, prefix, suffix, small, large, larger = result
+                print('{0}: {1!r} + {2!r} * n + {3!r}, '
+                      '{4:.4f}s, {5:.4f}s x4, {6:.4f}s x8'.format(
+                          name, prefix, seed, suffix, small, large, larger))
+                sys.stdout.flush()
+
+    print('{0} patterns, {1} texts, {2} superlinear'.format(
+        len(rules), tries, len(found)))
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# coding: utf-8
+"""
+Compares a full run with ``assume_idempotent=True`` on text which is
+already typeset and on raw text, that's typeset the first time.
+
+    $ python -m benchmarks.idempotent --size 20000
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import timeit
+from builtins import *  # noqa
+
+from typus import RuTypus
+
+SAMPLES = (
+    ('prose', 'Все счастливые семьи похожи друг на друга, каждая несчастливая '
+              'семья несчастлива по-своему. Глава 1\n\n'),
+    ('rich', '<p>Цена -- 1000 руб., т.е. 10 x 20 см (c) ООО "Рога".</p>\n'
+             '<b>Was it 1/2 or 3/4?</b> -- A.A. Milne 1926-1927, +-5%\n\n'),
+    ('title', 'Анна Каренина'),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=20000,
+                        help='document length in characters')
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    typus = RuTypus()
+
+    def timing(func):
+        return min(timeit.repeat(func, number=10, repeat=options.repeat))
+
+    print('text     state       full  idempotent')
+    for name, sample in SAMPLES:
+        raw = (sample * (options.size // len(sample) + 1))[:options.size]
+        for state, text in (('raw', raw), ('typeset', typus(raw))):
+            assert typus(text, assume_idempotent=True) == typus(text)
+            print('{0:8} {1:8} {2:7.4f} {3:11.4f}'.format(
+                name, state, timing(lambda: typus(text)),
+                timing(lambda: typus(text, assume_idempotent=True))))
+
+
+if __name__ == '__main__':
+    main()
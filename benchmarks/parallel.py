@@ -0,0 +1,61 @@
+# coding: utf-8
+"""
+Measures :class:`typus.parallel.TypusPool` throughput depending on
+the number of workers.
+
+    $ python -m benchmarks.parallel --docs 2000 --size 5000 --workers 1 2 4
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import time
+from builtins import *  # noqa
+
+from typus import RuTypus
+from typus.parallel import TypusPool
+
+SAMPLE = (
+    '"I don\'t feel very much like Pooh today..." said Pooh. '
+    '"There there," said Piglet. "I\'ll bring you tea and honey until '
+    'you do." - A.A. Milne, Winnie-the-Pooh (c) 1926, 3-5 pages. '
+    'Он сказал: "\'Винни-Пух\' -- моя любимая книга!" 1000 р. '
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=1000)
+    parser.add_argument('--size', type=int, default=5000,
+                        help='document length in characters')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--chunksize', type=int, default=16)
+    options = parser.parse_args()
+
+    doc = (SAMPLE * (options.size // len(SAMPLE) + 1))[:options.size]
+    # Different documents, so nothing is cached by accident
+    docs = ['{0} {1}'.format(i, doc) for i in range(options.docs)]
+    total = sum(len(x) for x in docs)
+
+    print('workers  seconds  docs/s  chars/s  speedup')
+    base = None
+    for workers in options.workers:
+        with TypusPool(RuTypus, workers=workers,
+                       chunksize=options.chunksize) as pool:
+            # Warms up workers
+            list(pool.map(docs[:workers]))
+
+            start = time.time()
+            for _ in pool.map(docs):
+                pass
+            elapsed = time.time() - start
+
+        base = base or elapsed
+        print('{0:7d}  {1:7.2f}  {2:6.0f}  {3:7.0f}  {4:7.2f}'.format(
+            workers, elapsed, options.docs / elapsed, total / elapsed,
+            base / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# coding: utf-8
+"""
+Measures escape_phrases cost depending on the number of phrases:
+a str.replace per phrase against a precompiled
+:class:`typus.utils.PhraseSet`.
+
+    $ python -m benchmarks.phrases --size 50000 --phrases 5 500 5000
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import re
+import timeit
+from builtins import *  # noqa
+
+from typus import RuTypus
+from typus.utils import PhraseSet
+
+SAMPLE = (
+    '"I don\'t feel very much like Pooh today..." said Pooh. '
+    '"There there," said Piglet. "I\'ll bring you tea and Brand42 honey '
+    'until you do." - A.A. Milne, Winnie-the-Pooh (c) 1926, 3-5 pages. '
+)
+
+
+def replace_each(text, phrases):
+    # The former implementation
+    for index, phrase in enumerate(phrases):
+        text = text.replace(phrase, '{0}'.format(index))
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=50000,
+                        help='document length in characters')
+    parser.add_argument('--phrases', type=int, nargs='+',
+                        default=[5, 500, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    text = (SAMPLE * (options.size // len(SAMPLE) + 1))[:options.size]
+    typus = RuTypus()
+
+    print('phrases  replace  phraseset  compile  typus')
+    for number in options.phrases:
+        phrases = ['Brand{0}'.format(x) for x in range(number)]
+        compiled = PhraseSet(phrases)
+
+        def timing(func):
+            return min(timeit.repeat(func, number=1, repeat=options.repeat))
+
+        print('{0:7d} {1:8.4f} {2:10.4f} {3:8.4f} {4:6.4f}'.format(
+            number,
+            timing(lambda: replace_each(text, phrases)),
+            timing(lambda: compiled.sub('', text)),
+            # Not from the re module cache
+            timing(lambda: re.purge() or PhraseSet(phrases)),
+            timing(lambda: typus(text, escape_phrases=compiled))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# coding: utf-8
+"""
+Compares :class:`typus.processors.Quotes` single-pass pairing with
+the former regex loop, which rescanned the text once per nesting level,
+on growing texts: plain, deeply nested and unbalanced quotes.
+
+    $ python -m benchmarks.quotes --sizes 1000 2000 4000 8000
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import timeit
+from builtins import *  # noqa
+
+from typus import RuTypus
+from typus.processors import Quotes
+from typus.utils import re_compile
+
+
+class RegexQuotes(Quotes):
+    """
+    The former implementation: replaces the innermost pairs until there
+    is nothing left.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(RegexQuotes, self).__init__(*args, **kwargs)
+        self.re_normal = re_compile(
+            r'(?<!\w)(["\'])(?!\s)((?!\1).+?)(?!\s)\1(?!\w)')
+        self.re_normal_replace = r'{0}\2{1}'.format(self.loq, self.roq)
+
+    def __call__(self, func):
+        def inner(text, *args, **kwargs):
+            normalized = self.re_normalize.sub('\'', text)
+            nested = 0
+            while True:
+                normalized, replaced = self.re_normal.subn(
+                    self.re_normal_replace, normalized)
+                if not replaced:
+                    break
+                nested += 1
+            if nested < 2:
+                return func(normalized, *args, **kwargs)
+            return func(self._switch_nested(normalized), *args, **kwargs)
+        return inner
+
+
+class QuotesOnly(RuTypus):
+    processors = (Quotes, )
+
+
+class RegexQuotesOnly(RuTypus):
+    processors = (RegexQuotes, )
+
+
+def plain(size):
+    return ('He said "it\'s \'fine\'" and left. ' * size)[:size * 10]
+
+
+def nested(size):
+    # Every quote is one level deeper
+    half = ''.join('"a \'b ' for _ in range(size // 12))
+    return half + ''.join(' c\' d"' for _ in range(size // 12))
+
+
+def unbalanced(size):
+    # Neither quote is ever closed
+    return '"a ' * (size // 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 2000, 4000, 8000])
+    parser.add_argument('--repeat', type=int, default=3)
+    options = parser.parse_args()
+
+    typuses = QuotesOnly(), RegexQuotesOnly()
+    print('text        size   single-pass   regex loop')
+    for text in (plain, nested, unbalanced):
+        for size in options.sizes:
+            source = text(size)
+            results = []
+            timings = []
+            for typus in typuses:
+                results.append(typus(source))
+                timings.append(min(timeit.repeat(
+                    lambda: typus(source), number=1, repeat=options.repeat)))
+
+            # Documented cases are the same, these ones too
+            assert results[0] == results[1]
+            print('{0:10s} {1:6d} {2:12.4f}s {3:11.4f}s'.format(
+                text.__name__, len(source), *timings))
+
+
+if __name__ == '__main__':
+    main()
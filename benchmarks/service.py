@@ -0,0 +1,127 @@
+# coding: utf-8
+"""
+Load test of :mod:`typus.service`: starts it on a free port of localhost,
+unless ``--url`` is given, and keeps ``--clients`` processes sending
+requests over keep-alive connections for ``--time`` seconds. Prints
+throughput, latency percentiles seen by clients and server counters.
+
+    $ python -m benchmarks.service --workers 4 --clients 8 --size 2000
+    $ python -m benchmarks.service --url http://127.0.0.1:8000 --batch 50
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import time
+from builtins import *  # noqa
+from http.client import HTTPConnection
+from multiprocessing import Pool
+from timeit import default_timer
+from urllib.parse import urlsplit
+
+from .corpus import Corpus
+
+
+def client(args):
+    url, texts, batch, duration = args
+    parts = urlsplit(url)
+    connection = HTTPConnection(parts.hostname, parts.port)
+    # Headers and body are sent apart
+    connection.connect()
+    connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if batch:
+        bodies = [b''.join(json.dumps(x).encode('utf-8') + b'\n'
+                           for x in texts[i:i + batch])
+                  for i in range(0, len(texts), batch)]
+        path, count = '/batch', batch
+    else:
+        bodies = [json.dumps({'text': x}).encode('utf-8') for x in texts]
+        path, count = '/typeset', 1
+
+    latencies, done, errors = [], 0, 0
+    deadline = default_timer() + duration
+    while default_timer() < deadline:
+        body = bodies[len(latencies) % len(bodies)]
+        start = default_timer()
+        connection.request('POST', path, body)
+        response = connection.getresponse()
+        data = response.read()
+        latencies.append(default_timer() - start)
+        if response.status == 200 and b'"error"' not in data:
+            done += count
+        else:
+            errors += 1
+    connection.close()
+    return latencies, done, errors
+
+
+def percentile(values, share):
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='runs the service if not given')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='processes of the service')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--time', type=float, default=10,
+                        help='seconds to run for')
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--size', type=int, default=2000,
+                        help='document length in characters')
+    parser.add_argument('--batch', type=int, default=0,
+                        help='texts per batch request, 0 sends one by one')
+    options = parser.parse_args()
+
+    server = None
+    url = options.url
+    if url is None:
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'typus.service', '--port', '0',
+             '--workers', str(options.workers)],
+            stdout=subprocess.PIPE, universal_newlines=True)
+        # Prints the address once it's ready
+        url = server.stdout.readline().split()[-1].rstrip('/')
+
+    try:
+        texts = Corpus().texts(options.docs, options.size)
+        chars = sum(len(x) for x in texts) / len(texts)
+        pool = Pool(options.clients)
+        start = time.time()
+        results = pool.map(client, [(url, texts, options.batch, options.time)
+                                    for _ in range(options.clients)])
+        elapsed = time.time() - start
+        pool.close()
+
+        latencies = sorted(x for result in results for x in result[0])
+        done = sum(x[1] for x in results)
+        errors = sum(x[2] for x in results)
+        print('requests  texts/s  chars/s  p50 ms  p90 ms  p99 ms  errors')
+        print('{0:8d}  {1:7.0f}  {2:7.0f}  {3:6.1f}  {4:6.1f}  {5:6.1f}  '
+              '{6:6d}'.format(
+                  len(latencies), done / elapsed, done * chars / elapsed,
+                  percentile(latencies, 0.5) * 1000,
+                  percentile(latencies, 0.9) * 1000,
+                  percentile(latencies, 0.99) * 1000, errors))
+
+        parts = urlsplit(url)
+        connection = HTTPConnection(parts.hostname, parts.port)
+        connection.request('GET', '/stats')
+        stats = json.loads(connection.getresponse().read().decode('utf-8'))
+        print('\nserver: {0}'.format(json.dumps(stats, indent=2)))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# coding: utf-8
+"""
+Measures ``import typus`` and the first call latency in fresh
+interpreters, like a command line tool or a serverless cold start.
+
+    $ python -m benchmarks.startup --repeat 20
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import subprocess
+import sys
+from builtins import *  # noqa
+
+SCRIPT = '''
+import sys
+from timeit import default_timer as timer
+start = timer()
+from typus import ru_typus
+imported = timer()
+ru_typus(sys.argv[1])
+called = timer()
+ru_typus(sys.argv[1])
+print(imported - start, called - imported, timer() - called)
+'''
+
+# Expressions are compiled once they run, so the first call on plain text
+# compiles just a few of them
+SAMPLES = (
+    ('plain', 'Plain title'),
+    ('rich', '"Цена" -- 1000 руб., т.е. 10 x 20 см (c) 1/2 +-5%'),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    options = parser.parse_args()
+
+    print('text     import  first call  second call')
+    for name, sample in SAMPLES:
+        timings = []
+        for _ in range(options.repeat):
+            output = subprocess.check_output(
+                [sys.executable, '-c', SCRIPT, sample.encode('utf8')])
+            timings.append([float(x) for x in output.split()])
+
+        print('{0:8} {1:7.4f} {2:11.4f} {3:12.5f}'.format(
+            name, *(min(x) for x in zip(*timings))))
+
+
+if __name__ == '__main__':
+    main()
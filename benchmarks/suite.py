@@ -0,0 +1,187 @@
+# coding: utf-8
+"""
+Runs ``en_typus`` and ``ru_typus`` over generated corpora, see
+:mod:`benchmarks.corpus`, and measures throughput, latency percentiles of
+single documents and scaling with text length. Results are saved as json
+to compare revisions:
+
+    $ python -m benchmarks.suite --output before.json
+    $ git checkout feature
+    $ python -m benchmarks.suite --output after.json
+    $ python -m benchmarks.suite --compare before.json after.json
+
+Corpora are the same for the same options, so are the results of
+different revisions. Custom corpus options make one more scenario:
+
+    $ python -m benchmarks.suite --scenarios --html 0.5 --depth 4
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+from builtins import *  # noqa
+from timeit import default_timer
+
+from typus import en_typus, ru_typus
+
+from .corpus import Corpus
+
+SCENARIOS = (
+    ('plain', dict(html=0, depth=0, digits=0.02, cyrillic=0.5)),
+    ('prose', dict(html=0, depth=1, digits=0, cyrillic=0.5)),
+    ('html', dict(html=0.5, depth=1, digits=0.02, cyrillic=0.5)),
+    ('quotes', dict(html=0, depth=4, digits=0.02, cyrillic=0.5)),
+    ('digits', dict(html=0, depth=1, digits=0.3, cyrillic=0.5)),
+    ('english', dict(html=0.1, depth=2, digits=0.1, cyrillic=0)),
+    ('russian', dict(html=0.1, depth=2, digits=0.1, cyrillic=1)),
+)
+
+TYPUSES = (('en', en_typus), ('ru', ru_typus))
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def measure(typus, options, corpus_options):
+    # Warms up lazy compilation, so it's not in the first timing
+    typus(Corpus(**corpus_options).text(options.size))
+
+    latencies = []
+    texts = Corpus(**corpus_options).texts(options.docs, options.size)
+    for text in texts:
+        start = default_timer()
+        typus(text)
+        latencies.append(default_timer() - start)
+
+    scaling = {}
+    for size in options.sizes:
+        text = Corpus(**corpus_options).text(size)
+        timings = []
+        for _ in range(options.repeat):
+            start = default_timer()
+            typus(text)
+            timings.append(default_timer() - start)
+        # Per kilobyte, so growing numbers mean superlinear time
+        scaling[str(size)] = min(timings) * 1000 / len(text) * 1000
+
+    return {
+        'throughput': sum(len(x) for x in texts) / sum(latencies),
+        'p50': percentile(latencies, 0.5),
+        'p90': percentile(latencies, 0.9),
+        'p99': percentile(latencies, 0.99),
+        'scaling': scaling,
+    }
+
+
+def revision():
+    try:
+        output = subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'],
+            stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('utf8').strip()
+
+
+def run(options):
+    scenarios = [x for x in SCENARIOS
+                 if options.scenarios is None or x[0] in options.scenarios]
+    custom = dict((x, getattr(options, x)) for x in
+                  ('html', 'depth', 'digits', 'cyrillic')
+                  if getattr(options, x) is not None)
+    if custom:
+        scenarios.append(('custom', dict(
+            dict(html=0, depth=0, digits=0.02, cyrillic=0.5), **custom)))
+
+    results = []
+    print('typus  scenario   chars/s     p50, ms  p90, ms  p99, ms  '
+          'ms/KB by size')
+    for name, corpus_options in scenarios:
+        for typus_name, typus in TYPUSES:
+            result = measure(typus, options, corpus_options)
+            result.update(typus=typus_name, scenario=name,
+                          corpus=corpus_options)
+            results.append(result)
+            print('{0:6} {1:9} {2:9.0f} {3:9.3f} {4:8.3f} {5:8.3f}  '
+                  '{6}'.format(
+                      typus_name, name, result['throughput'],
+                      result['p50'] * 1000, result['p90'] * 1000,
+                      result['p99'] * 1000,
+                      ' '.join('{0:.3f}'.format(result['scaling'][str(x)])
+                               for x in options.sizes)))
+
+    return {
+        'revision': revision(),
+        'python': platform.python_version(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'options': dict((x, getattr(options, x))
+                        for x in ('docs', 'size', 'sizes', 'repeat')),
+        'results': results,
+    }
+
+
+def compare(before, after):
+    with open(before) as source:
+        before = json.load(source)
+    with open(after) as source:
+        after = json.load(source)
+
+    print('{0} -> {1}, the time ratio, less is faster'.format(
+        before['revision'], after['revision']))
+    print('typus  scenario   throughput    p50    p99  largest size')
+    results = dict(((x['typus'], x['scenario']), x)
+                   for x in before['results'])
+    for new in after['results']:
+        old = results.get((new['typus'], new['scenario']))
+        if old is None:
+            continue
+        size = max(set(old['scaling']) & set(new['scaling']), key=int)
+        print('{0:6} {1:9} {2:10.2f} {3:6.2f} {4:6.2f} {5:13.2f}'.format(
+            new['typus'], new['scenario'],
+            old['throughput'] / new['throughput'],
+            new['p50'] / old['p50'], new['p99'] / old['p99'],
+            new['scaling'][size] / old['scaling'][size]))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=200,
+                        help='documents to measure throughput and latency')
+    parser.add_argument('--size', type=int, default=2000,
+                        help='document length in characters')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 4000, 16000, 64000],
+                        help='text lengths to measure scaling')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scenarios', nargs='*',
+                        help='scenarios to run, all by default: {0}'.format(
+                            ', '.join(x[0] for x in SCENARIOS)))
+    for name in ('html', 'digits', 'cyrillic'):
+        parser.add_argument('--' + name, type=float)
+    parser.add_argument('--depth', type=int)
+    parser.add_argument('--output', help='json file to save results to')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compares two json files of results')
+    options = parser.parse_args()
+
+    if options.compare:
+        compare(*options.compare)
+        return
+
+    results = run(options)
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
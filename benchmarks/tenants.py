@@ -0,0 +1,59 @@
+# coding: utf-8
+"""
+Measures creating a lot of Typus configurations, say, one per tenant with
+its own quotes and symbols, and typesetting the first text with each,
+with :data:`typus.utils.pattern_cache` and with no cache at all.
+
+    $ python -m benchmarks.tenants --tenants 1000
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import timeit
+from builtins import *  # noqa
+
+from typus import EnTypus, RuTypus
+from typus.chars import LAQUO, LDQUO, RAQUO, RDQUO
+from typus.utils import pattern_cache
+
+SAMPLE = '"Цена" -- 1000 руб., т.е. 10 x 20 см (c) 1/2 +-5%, page 1'
+
+
+def tenant(index):
+    base = (EnTypus, RuTypus)[index % 2]
+    attrs = {}
+    if index % 3:
+        attrs['loq'], attrs['roq'] = (
+            (LAQUO, RAQUO), (LDQUO, RDQUO))[index % 3 - 1]
+    if index % 5 == 0:
+        attrs['complex_symbols'] = dict(base.complex_symbols, **{'(q)': 'Q'})
+    return type(str('Tenant{0}'.format(index)), (base, ), attrs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    options = parser.parse_args()
+
+    classes = [tenant(x) for x in range(options.tenants)]
+
+    def build(clear):
+        for cls in classes:
+            if clear:
+                pattern_cache.clear()
+            cls()(SAMPLE)
+
+    print('cache     seconds  per tenant, ms')
+    for name, clear in (('none', True), ('shared', False)):
+        timing = min(timeit.repeat(lambda: build(clear), number=1,
+                                   repeat=options.repeat))
+        print('{0:8} {1:8.3f} {2:15.3f}'.format(
+            name, timing, timing / options.tenants * 1000))
+    print(pattern_cache.info())
+
+
+if __name__ == '__main__':
+    main()
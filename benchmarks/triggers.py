@@ -0,0 +1,80 @@
+# coding: utf-8
+"""
+Measures skipping of processors and expressions which can't match text,
+since it has none of characters they need: plain text, text with quotes,
+digits and html, and a lot of short plain strings like titles.
+
+    $ python -m benchmarks.triggers --size 100000
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import timeit
+from builtins import *  # noqa
+from copy import copy
+
+from typus import RuTypus
+from typus.processors import EscapeHtml, EscapePhrases, Expressions, Quotes
+from typus.utils import cached_property
+
+# Digits bound the mdash expression, which is quadratic on long text with
+# no digits at all
+PLAIN = 'Most of our inputs are plain sentences like this one, page 1\n'
+RICH = ('<p>Цена -- 1000 руб., т.е. 10 x 20 см (c) ООО "Рога".</p>\n'
+        '<b>Was it 1/2 or 3/4?</b> -- A.A. Milne 1926-1927, +-5%\n')
+TITLE = 'Plain title'
+
+
+class AlwaysHtml(EscapeHtml):
+    triggers = None
+
+
+class AlwaysQuotes(Quotes):
+    triggers = None
+
+
+class AlwaysExpressions(Expressions):
+    @cached_property
+    def rules(self):
+        # Rules are shared with other Typus instances
+        rules = [copy(x) for x in super(AlwaysExpressions, self).rules]
+        for rule in rules:
+            rule.requires = []
+        return rules
+
+
+class AlwaysTypus(RuTypus):
+    processors = (EscapePhrases, AlwaysHtml, AlwaysQuotes, AlwaysExpressions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=100000,
+                        help='document length in characters')
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    typus, always = RuTypus(), AlwaysTypus()
+
+    def timing(func):
+        return min(timeit.repeat(func, number=1, repeat=options.repeat))
+
+    print('text      always  triggers  run  skipped')
+    for name, sample in (('plain', PLAIN), ('rich', RICH)):
+        text = (sample * (options.size // len(sample) + 1))[:options.size]
+        assert typus(text) == always(text)
+        print('{0:8} {1:7.4f} {2:9.4f} {3:4d} {4:8d}'.format(
+            name, timing(lambda: always(text)), timing(lambda: typus(text)),
+            typus.stats.run, typus.stats.skipped))
+
+    titles = [TITLE] * (options.size // len(TITLE))
+    print('{0:8} {1:7.4f} {2:9.4f} {3:4d} {4:8d}'.format(
+        'titles', timing(lambda: [always(x) for x in titles]),
+        timing(lambda: [typus(x) for x in titles]),
+        typus.stats.run, typus.stats.skipped))
+
+
+if __name__ == '__main__':
+    main()
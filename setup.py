@@ -1,5 +1,12 @@
+import sys
+
 from setuptools import setup
 
+# The command line tool is Python 3.7+ only, see typus.cli
+entry_points = {}
+if sys.version_info >= (3, 7):
+    entry_points['console_scripts'] = ['typus = typus.cli:main']
+
 setup(
     name='typus',
     version='0.1',
@@ -9,6 +16,9 @@ setup(
     author_email='byashimov@gmail.com',
     packages=['typus'],
     install_requires=['future'],
+    # Optional regex engines, see typus.engines
+    extras_require={'regex': ['regex'], 're2': ['google-re2']},
+    entry_points=entry_points,
     license='BSD',
     classifiers=[
         'Development Status :: 4 - Beta',
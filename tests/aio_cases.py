@@ -0,0 +1,119 @@
+# coding: utf-8
+"""
+Asyncio tests, Python 3.7+ syntax, see test_aio.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import asyncio
+import threading
+from builtins import *  # noqa
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import mock
+import unittest2
+from typus import RuTypus, en_typus, ru_typus
+from typus.aio import AsyncTypus
+
+
+class Blocking(object):
+    """
+    Typus which waits for the event, counts texts typeset at once.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.running = self.most = 0
+        self.texts = []
+
+    def __call__(self, text):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+            self.texts.append(text)
+        self.event.wait(5)
+        with self.lock:
+            self.running -= 1
+        return text.upper()
+
+
+class AsyncTypusTest(unittest2.TestCase):
+    texts = ['"foo" -- bar', '', '(c) 2mm', '"foo "bar" baz"'] * 5
+
+    def test_aprocess(self):
+        self.assertEqual(asyncio.run(ru_typus.aprocess('"foo"', debug=True)),
+                         '«foo»')
+        self.assertEqual(asyncio.run(ru_typus.aprocess_many(self.texts)),
+                         [ru_typus(x) for x in self.texts])
+
+    def test_inline(self):
+        executor = mock.Mock()
+        aio = AsyncTypus(en_typus, executor=executor, inline_size=6)
+        self.assertEqual(asyncio.run(aio.process('(c)')), '©')
+        self.assertFalse(executor.submit.called)
+
+        with ThreadPoolExecutor(1) as executor:
+            aio = AsyncTypus(en_typus, executor=executor, inline_size=1)
+            with mock.patch.object(executor, 'submit',
+                                   wraps=executor.submit) as submit:
+                self.assertEqual(asyncio.run(aio.process('(c)')), '©')
+            self.assertTrue(submit.called)
+
+    def test_process_executor(self):
+        with ProcessPoolExecutor(2) as executor:
+            aio = AsyncTypus(RuTypus(), executor=executor, inline_size=0)
+            self.assertEqual(asyncio.run(aio.process_many(self.texts)),
+                             [ru_typus(x) for x in self.texts])
+
+    def test_async_iterable(self):
+        async def texts():
+            for text in self.texts:
+                yield text
+
+        aio = AsyncTypus(en_typus, limit=2, inline_size=0)
+        self.assertEqual(asyncio.run(aio.process_many(texts())),
+                         [en_typus(x) for x in self.texts])
+        aio.close()
+
+    def test_limit(self):
+        typus = Blocking()
+        aio = AsyncTypus(typus, limit=2, inline_size=0)
+
+        async def run():
+            tasks = [asyncio.ensure_future(aio.process(x)) for x in 'abcde']
+            for _ in range(100):
+                if typus.running == 2:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            # The rest wait for their turn in the loop
+            self.assertEqual(typus.most, 2)
+            self.assertEqual(len(typus.texts), 2)
+
+            # Cancelled before it got into the executor
+            tasks[-1].cancel()
+            typus.event.set()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            self.assertEqual(results[:4], ['A', 'B', 'C', 'D'])
+            self.assertNotIn('e', typus.texts)
+
+        asyncio.run(run())
+        self.assertEqual(typus.most, 2)
+        aio.close()
+
+    def test_map_stopped(self):
+        typus = Blocking()
+        typus.event.set()
+        aio = AsyncTypus(typus, limit=2, inline_size=0)
+
+        async def run():
+            results = aio.map(iter('abcdef'))
+            self.assertEqual(await results.__anext__(), 'A')
+            await results.aclose()
+
+        asyncio.run(run())
+        # Texts are taken as previous ones are done
+        self.assertLessEqual(len(typus.texts), 3)
+        aio.close()
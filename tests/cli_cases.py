@@ -0,0 +1,116 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from builtins import *  # noqa
+
+import mock
+import unittest2
+from typus import EnTypus, RuTypus, en_typus
+from typus.cli import (find_files, get_typus_class, main, read_file,
+                       typeset_file)
+
+
+class CliTest(unittest2.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        for name, text in (('a/x.md', '"x"\n'), ('a/b/y.md', '"y" (c)\n'),
+                           ('a/b/z.txt', 'z\n'), ('a/c.md', 'done\n')):
+            self.write(name, text)
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def write(self, name, text):
+        path = self.path(name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with io.open(path, 'w', encoding='utf-8', newline='') as fp:
+            fp.write(text)
+
+    def read(self, name):
+        with io.open(self.path(name), encoding='utf-8', newline='') as fp:
+            return fp.read()
+
+    def test_get_typus_class(self):
+        self.assertIs(get_typus_class('en'), EnTypus)
+        self.assertIs(get_typus_class('typus:RuTypus'), RuTypus)
+        for name in ('de', 'typus.foo', 'typus.utils.PhraseSet'):
+            with self.assertRaises(ValueError):
+                get_typus_class(name)
+
+    def test_find_files(self):
+        files = list(find_files([self.path('a')], include=['*.md']))
+        self.assertEqual([y for _, y in files],
+                         ['c.md', 'x.md', os.path.join('b', 'y.md')])
+        # Relative to the part before the glob
+        files = list(find_files([os.path.join(self.root, '*', 'b', '*')]))
+        self.assertEqual(
+            [y for _, y in files],
+            [os.path.join('a', 'b', 'y.md'), os.path.join('a', 'b', 'z.txt')])
+
+    def test_typeset_file(self):
+        self.write('crlf.md', '"foo"\r\n')
+        self.assertEqual(typeset_file(en_typus, self.path('crlf.md')),
+                         (7, True))
+        self.assertEqual(self.read('crlf.md'), '“foo”\r\n')
+
+        # Unchanged files are not rewritten
+        inode = os.stat(self.path('a/c.md')).st_ino
+        with mock.patch('typus.cli.write_file') as write_file:
+            self.assertEqual(typeset_file(en_typus, self.path('a/c.md')),
+                             (5, False))
+        self.assertFalse(write_file.called)
+        self.assertEqual(os.stat(self.path('a/c.md')).st_ino, inode)
+
+    def test_read_mmap(self):
+        self.write('empty.md', '')
+        with mock.patch('typus.cli.MMAP_SIZE', 0):
+            self.assertEqual(read_file(self.path('a/b/y.md')), '"y" (c)\n')
+            self.assertEqual(read_file(self.path('empty.md')), '')
+
+    def test_output(self):
+        self.write('a/bad.md', '')
+        with io.open(self.path('a/bad.md'), 'wb') as fp:
+            fp.write(b'\xff')
+        output = self.path('out')
+        with mock.patch('sys.stderr') as stderr:
+            code = main(['-j', '2', '-o', output, '--include', '*.md',
+                         '--escape-phrase', '(c)', self.path('a')])
+        self.assertEqual(code, 1)
+        report = ''.join(x[0][0] for x in stderr.write.call_args_list)
+        self.assertIn('bad.md', report)
+        self.assertIn('3 files, 2 changed, 1 errors', report)
+
+        self.assertEqual(self.read('out/x.md'), '“x”\n')
+        self.assertEqual(self.read('out/b/y.md'), '“y” (c)\n')
+        self.assertEqual(self.read('out/c.md'), 'done\n')
+        self.assertFalse(os.path.exists(self.path('out/b/z.txt')))
+        # Sources are left as is
+        self.assertEqual(self.read('a/x.md'), '"x"\n')
+
+    def test_in_place(self):
+        os.chmod(self.path('a/x.md'), 0o600)
+        self.assertEqual(main(['-q', '-j', '1', '-l', 'ru', '-i',
+                               self.path('a/x.md')]), 0)
+        self.assertEqual(self.read('a/x.md'), '«x»\n')
+        self.assertEqual(os.stat(self.path('a/x.md')).st_mode & 0o777, 0o600)
+        # No temporary files left
+        self.assertEqual(sorted(os.listdir(self.path('a'))),
+                         ['b', 'c.md', 'x.md'])
+
+    def test_stdin(self):
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'typus', '--lang', 'ru', '--debug'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        output, _ = process.communicate('"foo" (c)\n\n\n"bar"\n'.encode(
+            'utf-8'))
+        self.assertEqual(output.decode('utf-8'), '«foo» ©\n\n«bar»\n')
@@ -0,0 +1,18 @@
+# coding: utf-8
+"""
+Asyncio support is Python 3.7+ only, tests are in aio_cases, so older
+Pythons never compile their syntax.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import sys
+from builtins import *  # noqa
+
+import unittest2
+
+if sys.version_info < (3, 7):
+    raise unittest2.SkipTest('asyncio support is Python 3.7+ only')
+
+from tests.aio_cases import *  # noqa
@@ -0,0 +1,18 @@
+# coding: utf-8
+"""
+The command line tool is Python 3.7+ only, tests are in cli_cases, so older
+Pythons never import it.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import sys
+from builtins import *  # noqa
+
+import unittest2
+
+if sys.version_info < (3, 7):
+    raise unittest2.SkipTest('command line tool is Python 3.7+ only')
+
+from tests.cli_cases import *  # noqa
@@ -1,11 +1,15 @@
+# coding: utf-8
+
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import io
 from builtins import *  # noqa
 
 import mock
 import unittest2
-from typus import TypusCore, ru_typus
+from typus import EnTypus, RuTypus, TypusCore, en_typus, ru_typus
+from typus.utils import LRUCache
 
 
 class TypusTest(unittest2.TestCase):
@@ -17,6 +21,285 @@ class TypusTest(unittest2.TestCase):
     def test_debug(self):
         self.assertEqual(ru_typus('2mm', debug=True), '2_mm')
 
+    def test_process_many(self):
+        texts = ['"foo"', '2mm', '', ' "foo" ', '"foo"', '(c)']
+        self.assertEqual(ru_typus.process_many(texts),
+                         [ru_typus(text) for text in texts])
+        self.assertEqual(ru_typus.process_many(texts, debug=True),
+                         [ru_typus(text, debug=True) for text in texts])
+
+    @mock.patch('typus.ru_typus.process', side_effect=lambda text: text)
+    def test_process_many_dedupes(self, mock_process):
+        ru_typus.process_many(['foo', 'bar', ' foo', 'foo '])
+        self.assertEqual(mock_process.call_count, 2)
+
+    def test_stats(self):
+        ru_typus('foo')
+        self.assertEqual((ru_typus.stats.run, ru_typus.stats.skipped),
+                         (0, 30))
+        # Html and quotes go along with some of expressions
+        ru_typus('<b>"foo" - bar</b>')
+        self.assertGreater(ru_typus.stats.run, 2)
+        self.assertEqual(ru_typus.stats.run + ru_typus.stats.skipped, 30)
+
+    def test_profile(self):
+        ru_typus('"foo" (c)')
+        self.assertEqual(ru_typus.stats.records, [])
+
+        records = []
+        typus = RuTypus(profile=records.append)
+        text = '<b>"foo"</b> (c)'
+        self.assertEqual(typus(text), ru_typus(text))
+        self.assertEqual(typus.stats.records, records)
+
+        names = [x.name for x in records]
+        self.assertEqual(names[-4:], ['Expressions', 'Quotes', 'EscapeHtml',
+                                      'EscapePhrases'])
+        self.assertEqual(len(names) - 4, typus.stats.run - 2)
+        self.assertIn('expr_complex_symbols[0]', names)
+
+        records = dict((x.name, x) for x in records)
+        symbols = records['expr_complex_symbols[0]']
+        self.assertEqual((symbols.replaced, symbols.input_size,
+                          symbols.output_size), (1, 15, 13))
+        # Tags are escaped, quotes are paired
+        self.assertEqual(records['EscapeHtml'].replaced, 2)
+        self.assertEqual(records['Quotes'].replaced, 2)
+        self.assertEqual(records['Expressions'].replaced,
+                         sum(x.replaced for x in records.values()
+                             if x.name.startswith('expr_')))
+        self.assertTrue(all(x.time >= 0 for x in records.values()))
+
+    def test_needs_typesetting(self):
+        for text in ('"foo" -- bar', '  (c) 2017', 'a  b', '<b>"foo"</b>'):
+            self.assertTrue(ru_typus.needs_typesetting(text))
+            self.assertFalse(ru_typus.needs_typesetting(ru_typus(text)))
+
+        self.assertFalse(ru_typus.needs_typesetting(' foo '))
+        self.assertFalse(ru_typus.needs_typesetting(''))
+
+        # Escaped phrases are not typeset
+        self.assertFalse(ru_typus.needs_typesetting(
+            '(c)', escape_phrases=['(c)']))
+
+    def test_assume_idempotent(self):
+        typeset = ru_typus('"foo" -- 2mm')
+        stats = repr(ru_typus.stats)
+        with mock.patch('typus.ru_typus.process',
+                        side_effect=ru_typus.process) as mock_process:
+            self.assertEqual(ru_typus(typeset, assume_idempotent=True),
+                             typeset)
+            mock_process.assert_called_once()
+
+            # Text is typeset once, expressions run after the first change
+            mock_process.reset_mock()
+            self.assertEqual(ru_typus('"foo" -- 2mm', assume_idempotent=True),
+                             typeset)
+            mock_process.assert_called_once()
+            self.assertEqual(repr(ru_typus.stats), stats)
+
+        # Phrases may come as a generator
+        phrases = (x for x in ['(c)'])
+        self.assertEqual(ru_typus('(c) (r)', assume_idempotent=True,
+                                  escape_phrases=phrases), '(c)®')
+
+    def test_process_many_phrases_generator(self):
+        phrases = (x for x in ['(c)'])
+        self.assertEqual(
+            ru_typus.process_many(['(c)', '(c) (r)'], escape_phrases=phrases),
+            ['(c)', '(c)®'])
+
+
+class CacheTest(unittest2.TestCase):
+    def setUp(self):
+        self.cache = LRUCache()
+        self.ru_typus = RuTypus(cache=self.cache)
+
+    def test_cache(self):
+        with mock.patch.object(self.ru_typus, 'process',
+                               wraps=self.ru_typus.process) as mock_process:
+            self.assertEqual(self.ru_typus('"foo"'), '«foo»')
+            self.assertEqual(self.ru_typus(' "foo" '), '«foo»')
+            self.assertEqual(mock_process.call_count, 1)
+        self.assertEqual(self.cache.info()[:4], (1, 1, 0, 1))
+
+    def test_kwargs(self):
+        self.assertEqual(self.ru_typus('2mm (c)', escape_phrases=['(c)']),
+                         ru_typus('2mm (c)', escape_phrases=['(c)']))
+        self.assertEqual(self.ru_typus('2mm (c)', debug=True),
+                         ru_typus('2mm (c)', debug=True))
+        self.assertEqual(self.ru_typus('2mm (c)', escape_phrases=iter([])),
+                         ru_typus('2mm (c)'))
+        self.assertEqual(self.ru_typus('2mm (c)'), ru_typus('2mm (c)'))
+        self.assertEqual(self.cache.info()[:2], (1, 3))
+
+    def test_shared(self):
+        en_typus = EnTypus(cache=self.cache)
+        self.assertEqual(self.ru_typus('"foo"'), '«foo»')
+        self.assertEqual(en_typus('"foo"'), '“foo”')
+        self.assertEqual(self.cache.info().misses, 2)
+
+    def test_unhashable(self):
+        self.assertEqual(self.ru_typus('(c)', foo=[]), '©')
+        self.assertEqual(self.cache.info().size, 0)
+
+
+class StreamTest(unittest2.TestCase):
+    def typus(self, chunk_size=0):
+        def inner(text):
+            for source in ([text], io.StringIO(text), list(text)):
+                self.assertEqual(
+                    ''.join(ru_typus.stream(source, chunk_size=chunk_size)),
+                    ru_typus(text))
+        return inner
+
+    def test_paragraphs(self):
+        test = self.typus()
+        test('"foo"\n\n"bar"')
+        test('foo -- bar\n \n\n\n1 - 2\n\n')
+        test('a\r\n\r\nb\r\n')
+        # Line ends are typeset within the whole text
+        test('foo \r\n\r\nbar')
+        test('- \r\n\n1')
+        test('foo - \n\nbar')
+
+    def test_strip(self):
+        test = self.typus()
+        test('  \t"foo"  \n\n  bar  \n\n\t\n')
+        test('\t\n\n\tfoo\n\n\t')
+        test('foo\t\n\n\tbar')
+        test('a\t\n\n\t')
+        test('a\n\n\t\n\n\t')
+
+    def test_quotes(self):
+        test = self.typus()
+        test('"foo\n\nbar"\n\nbaz')
+        test('"foo "bar\n\nbaz" qux"')
+        test("it's\n\n'a'\n\n 'b\n\nc'")
+
+    def test_html(self):
+        test = self.typus()
+        test('<pre>"x"\n\n\n"y"</pre>\n\n"z"')
+        test('<a\n\nhref="x">"y"</a>\n\nfoo')
+        test('<!-- "a\n\n" -->\n\n"b"')
+
+    def test_mdash(self):
+        # Mdash before a digit looks back for a word through paragraphs
+        test = self.typus()
+        test('foo\n\n... - 1')
+        test('...\n\n... - 1')
+        test('foo\n\n<b>(c) - 1</b>\n\nbar - 1')
+        # Tags count as words
+        test('<b>\n\n... - 1')
+        self.assertEqual(len(list(ru_typus.stream(
+            ['foo\n\n... - 1\n\nbar - 1'], chunk_size=0))), 2)
+
+    def test_chunk_size(self):
+        text = '\n\n'.join(['"foo"'] * 10)
+        self.assertEqual(len(list(ru_typus.stream([text], chunk_size=0))), 10)
+        self.assertEqual(len(list(ru_typus.stream([text], chunk_size=12))), 5)
+        self.assertEqual(len(list(ru_typus.stream([text]))), 1)
+
+    def test_kwargs(self):
+        text = '2mm (c)\n\n(c)'
+        self.assertEqual(
+            ''.join(ru_typus.stream([text], debug=True, chunk_size=0,
+                                    escape_phrases=iter(['(c)']))),
+            ru_typus(text, debug=True, escape_phrases=['(c)']))
+
+    def test_phrases(self):
+        for text, phrases in (('"a" (c)\n\n(c) "b"', ['(c)\n\n(c)']),
+                              ('a\n\n(c) "b"', ['\n(c)']),
+                              ('(c)\n\n... - 1', ['(c)'])):
+            self.assertEqual(
+                ''.join(en_typus.stream([text], chunk_size=0,
+                                        escape_phrases=phrases)),
+                en_typus(text, escape_phrases=phrases))
+
+
+class SessionTest(unittest2.TestCase):
+    def test_update(self):
+        session = ru_typus.session()
+        for text in ('"foo"\n\n"bar"\n\n2mm', '  "foo"\n\n"baz"\n\n2mm',
+                     '', '"foo\n\nbar"', '<pre>\n\n"foo"</pre>\n\n"foo"',
+                     'foo \r\n\r\nbar', '- \r\n\n1', 'a\t\n\n\t',
+                     'foo\t\n\n\tbar  \n \n\n'):
+            self.assertEqual(session.update(text), ru_typus(text))
+
+    def test_reuse(self):
+        session = ru_typus.session()
+        session.update('"foo"\n\n"bar"\n\n2mm')
+        self.assertEqual((session.processed, session.reused), (3, 0))
+
+        session.update('"foo"\n\n"baz"\n\n2mm')
+        self.assertEqual((session.processed, session.reused), (1, 2))
+
+        # Quote is left open, the rest of text is a single paragraph
+        session.update('"foo\n\n"baz"\n\n2mm')
+        self.assertEqual((session.processed, session.reused), (1, 0))
+
+        # Forgets old paragraphs
+        session.update('"foo"')
+        self.assertEqual(len(session.results), 1)
+
+    def test_kwargs(self):
+        text = '2mm (c)\n\n(c)'
+        session = ru_typus.session(debug=True, escape_phrases=iter(['(c)']))
+        self.assertEqual(session.update(text), ru_typus(
+            text, debug=True, escape_phrases=['(c)']))
+
+    def test_phrases(self):
+        # Phrases may span paragraphs
+        text = '"a" (c)\n\n(c) "b"'
+        session = en_typus.session(escape_phrases=['(c)\n\n(c)'])
+        self.assertEqual(session.update(text), '“a” (c)\n\n(c) “b”')
+        self.assertEqual(session.processed, 1)
+
+
+class BytesTest(unittest2.TestCase):
+    def test_blocks(self):
+        text = ('  <pre>"я" -- (c)\xa0</pre> "я" (c) '
+                '<script>x = "--"</script>\n')
+        data = text.encode('utf-8')
+        for kwargs in ({}, {'debug': True}, {'escape_phrases': ['(c)']}):
+            result = ru_typus(text, **kwargs).encode('utf-8')
+            self.assertEqual(ru_typus.process_bytes(data, **kwargs), result)
+            self.assertEqual(
+                ru_typus.process_bytes(memoryview(data), **kwargs), result)
+            self.assertEqual(
+                ru_typus.process_bytes(bytearray(data), **kwargs), result)
+
+    @mock.patch('typus.processors.EscapeHtml.restore_blocks')
+    def test_no_blocks(self, mock_restore):
+        self.assertEqual(en_typus.process_bytes(b'<b>"foo"</b>'),
+                         '<b>“foo”</b>'.encode('utf-8'))
+        self.assertEqual(en_typus.process_bytes(b''), b'')
+        mock_restore.assert_not_called()
+
+    def test_untouched(self):
+        # Blocks are never decoded
+        data = b'<pre>\xff</pre> "foo"'
+        self.assertEqual(en_typus.process_bytes(data),
+                         b'<pre>\xff</pre> ' + '“foo”'.encode('utf-8'))
+        with self.assertRaises(UnicodeDecodeError):
+            en_typus.process_bytes(b'\xff "foo"')
+        # Not closed one is kept to the end
+        data = b'"foo" <code>\xff <code></code> "bar"'
+        self.assertEqual(en_typus.process_bytes(data),
+                         '“foo” '.encode('utf-8') + data[6:])
+
+    def test_keys(self):
+        # Text which looks like a key is processed as is
+        text = '<pre>(c)</pre> \ue002\ue100 (c)'
+        self.assertEqual(en_typus.process_bytes(text.encode('utf-8')),
+                         en_typus(text).encode('utf-8'))
+        # Private use characters right after a block aren't taken for
+        # a part of its key
+        text = '<pre>(c)</pre>\uf001 <b>\uf001</b>\uf8ff (c)'
+        self.assertEqual(en_typus.process_bytes(text.encode('utf-8')),
+                         '<pre>(c)</pre>\uf001 <b>\uf001</b>\uf8ff ©'
+                         .encode('utf-8'))
+
 
 class BaseTypusTest(unittest2.TestCase):
     def test_empty(self):
@@ -0,0 +1,88 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from builtins import *  # noqa
+
+import mock
+import unittest2
+from typus import en_typus, ru_typus
+from typus.core import TypusCore
+from typus.dom import HtmlTypesetter
+
+
+class HtmlTypesetterTest(unittest2.TestCase):
+    def typeset(self, chunks, typus=ru_typus, **kwargs):
+        return ''.join(typus.stream_html(chunks, **kwargs))
+
+    def test_runs(self):
+        # Quotes are paired across inline tags, but not block ones
+        self.assertEqual(
+            self.typeset(['<p>"foo <b>bar</b>" <a href="/">"x"</a></p>']),
+            '<p>«foo <b>bar</b>» <a href="/">«x»</a></p>')
+        self.assertEqual(self.typeset(['<p>"foo</p><p>bar"</p>']),
+                         '<p>"foo</p><p>bar"</p>')
+        # Spaces around runs are left as they are
+        self.assertEqual(self.typeset(['<ul>\n  <li> (c) </li>\n</ul>']),
+                         '<ul>\n  <li> © </li>\n</ul>')
+
+    def test_skipped(self):
+        self.assertEqual(
+            self.typeset(['<p>"foo <code>"<code>"</code>--"</code>"</p>',
+                          '<pre>"(c)"</pre><script>x = "--"',
+                          '</script><style>a:after { content: "--" }',
+                          '</style>(c)']),
+            '<p>«foo <code>"<code>"</code>--"</code>»</p>'
+            '<pre>"(c)"</pre><script>x = "--"</script>'
+            '<style>a:after { content: "--" }</style>©')
+        # Unclosed ones
+        self.assertEqual(self.typeset(['(c) <script>"(c)"']),
+                         '© <script>"(c)"')
+        self.assertEqual(self.typeset(['(c) <code>"(c)"']),
+                         '©\u00a0<code>"(c)"')
+
+    def test_markup(self):
+        html = ('<!DOCTYPE html><?xml version="1.0"?><!-- "(c)" -->'
+                '<DIV Class="x">&laquo;foo&raquo; &amp; (c)<br/></div>'
+                '<![CDATA["(c)"]]> a < b')
+        self.assertEqual(self.typeset([html]), html.replace(
+            '; &amp; (c)', ';\u00a0&amp; ©').replace('a <', 'a\u00a0<'))
+
+    def test_chunks(self):
+        html = ('<p>"foo <b class="x">bar</b>" &amp; (c)</p>'
+                '<pre>"x"</pre><p><code>(c)</code> -- "baz"</p>')
+        self.assertEqual(self.typeset(list(html)), self.typeset([html]))
+
+    def test_incremental(self):
+        parser = HtmlTypesetter(ru_typus)
+        parser.feed('<p>"foo" <b>"bar"')
+        self.assertEqual(parser.read(), '<p>')
+        parser.feed('</b></p><p>"baz')
+        self.assertEqual(parser.read(), '«foo» <b>«bar»</b></p><p>')
+        # The run is kept until it ends
+        self.assertEqual(parser.run, ['"baz'])
+        parser.close()
+        self.assertEqual(parser.read(), '"baz')
+
+    def test_passthrough(self):
+        html = ('<p class=x>"foo <i>bar</i>"</p><pre><b>"x"</b></pre>'
+                '<!-- x --><code>-- (c)</code> &#34;&nbsp; <a\nhref="">'
+                '</a>')
+        with mock.patch.object(TypusCore, '_process_part',
+                               lambda self, text, *args: text):
+            self.assertEqual(self.typeset(list(html)), html)
+            self.assertEqual(self.typeset([html]), html)
+
+    def test_keys(self):
+        # Text which looks like keys is left as it is
+        html = '<p><b>\ue002\ue100</b>\ue100 "foo"</p>'
+        self.assertEqual(self.typeset([html]),
+                         html.replace('"foo"', '«foo»'))
+
+    def test_kwargs(self):
+        html = '<p>"foo" (c) 2 mm</p>'
+        self.assertEqual(
+            self.typeset([html], en_typus, debug=True,
+                         escape_phrases=iter(['(c)'])),
+            en_typus(html, debug=True, escape_phrases=['(c)']))
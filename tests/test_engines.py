@@ -0,0 +1,137 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import re
+from builtins import *  # noqa
+
+import unittest2
+from typus import EnTypus, RuTypus, en_typus, ru_typus
+from typus.engines import (Engine, RegexEngine, Unsupported,
+                           available_engines, fallbacks, get_engine)
+from typus.chars import NBSP, NNBSP, WHSP
+from typus.processors import Expressions
+from typus.utils import pattern_cache
+
+TEXTS = (
+    '"foo" -- bar',
+    'Say "what" again, 2-3 times (c) 1/2 ...',
+    '<b>"foo"</b> <code>"bar" (c)</code> 10 mm',
+    '«Мама — "мыла" раму» 1000 р. и т.д.',
+    '  foo  -  bar  \n\n\n1 - 2 x 3',
+)
+
+
+class Recorder(Engine):
+    """
+    Runs what the stdlib runs, but patterns with no extensions only.
+    """
+
+    name = 'recorder'
+
+    def __init__(self):
+        super(Recorder, self).__init__()
+        self.compiled = []
+
+    def check(self, pattern, flags):
+        if '(?' in pattern:
+            raise Unsupported('extension')
+        self.compiled.append(pattern)
+        return super(Recorder, self).check(pattern, flags)
+
+
+class EngineTest(unittest2.TestCase):
+    def test_get_engine(self):
+        engine = Engine()
+        self.assertIsNone(get_engine(None))
+        self.assertIs(get_engine(engine), engine)
+        self.assertIsInstance(get_engine('re'), Engine)
+        self.assertIn('re', available_engines())
+        with self.assertRaises(KeyError):
+            get_engine('foo')
+
+    def test_compile(self):
+        engine = Engine()
+        self.assertEqual(engine.compile('a', re.I).sub('b', 'aA'), 'bb')
+        self.assertIsNone(engine.reason('a', 0))
+        self.assertIsNotNone(engine.reason('(a', 0))
+
+    def test_fallback(self):
+        engine = Recorder()
+        self.assertEqual(engine.compile('(a)', 0).sub('b', 'a'), 'b')
+        self.assertEqual(engine.compile('(?:a)', 0).sub('b', 'a'), 'b')
+        self.assertEqual(engine.compiled, ['(a)'])
+        self.assertEqual(engine.reason('(?:a)', 0), 'extension')
+
+    def test_typus(self):
+        # Patterns are compiled once for all instances of the engine
+        pattern_cache.clear()
+        engine = Recorder()
+        for base, typus in ((EnTypus, en_typus), (RuTypus, ru_typus)):
+            class Testus(base):
+                regex_engine = engine
+
+            testus = Testus()
+            for text in TEXTS:
+                self.assertEqual(testus(text), typus(text))
+
+            # Every pattern which is not compiled with the engine is listed
+            names = dict(fallbacks(testus))
+            self.assertEqual(names['expr_mdash[1]'], 'extension')
+            self.assertEqual(names['re_quotes'], 'extension')
+            self.assertNotIn('re_nested', names)
+            self.assertNotIn('expr_spaces[0]', names)
+            self.assertEqual(fallbacks(typus), [])
+        self.assertIn('[{0}]{{2,}}'.format(WHSP + NBSP + NNBSP),
+                      engine.compiled)
+
+
+@unittest2.skipUnless('regex' in available_engines(), 'regex not installed')
+class RegexEngineTest(unittest2.TestCase):
+    def test_typus(self):
+        class Testus(EnTypus):
+            regex_engine = 'regex'
+
+        testus = Testus()
+        for text in TEXTS:
+            self.assertEqual(testus(text), en_typus(text))
+        # Unicode classes are not the same
+        names = dict(fallbacks(testus))
+        self.assertTrue(names['expr_mdash[2]'].startswith('unicode'))
+        self.assertNotIn('expr_spaces[0]', names)
+        expr = Expressions(testus).compiled_exprs[0][0]
+        self.assertIn('regex', type(expr.sub.__self__).__module__)
+
+    def test_unicode_classes(self):
+        class Engine(RegexEngine):
+            unicode_classes = True
+
+        class Testus(EnTypus):
+            regex_engine = Engine()
+
+        self.assertEqual(fallbacks(Testus()), [])
+
+
+@unittest2.skipUnless('re2' in available_engines(), 're2 not installed')
+class Re2EngineTest(unittest2.TestCase):
+    def test_reason(self):
+        engine = get_engine('re2')
+        flags = re.I | re.U | re.M | re.S
+        self.assertIsNone(engine.reason('(a|b)+ c', flags))
+        self.assertIsNone(engine.reason(r'\d', re.A))
+        self.assertEqual(engine.reason(r'(?<=a)b', flags), 'lookaround')
+        self.assertEqual(engine.reason(r'(a)\1', flags), 'back reference')
+        self.assertEqual(engine.reason(r'[\d]', flags),
+                         'unicode \\w, \\d or \\s')
+        self.assertEqual(engine.reason(r'\bfoo', flags), 'unicode \\b')
+        self.assertEqual(engine.reason(r'a$', 0), 'end of text')
+
+    def test_typus(self):
+        class Testus(RuTypus):
+            regex_engine = 're2'
+
+        testus = Testus()
+        for text in TEXTS:
+            self.assertEqual(testus(text), ru_typus(text))
+        self.assertIn(('expr_mdash[1]', 'lookaround'), fallbacks(testus))
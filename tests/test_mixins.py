@@ -34,6 +34,7 @@ class EnRuExpressionsTestCommon(object):
     def test_spaces(self):
         test = self.typus('spaces')
         test('foo{0}bar'.format(' ' * 30), 'foo bar')
+        test('  foo  \n  bar{0} \n'.format(NBSP), 'foo\nbar')
 
     def test_linebreaks(self):
         test = self.typus('linebreaks')
@@ -202,6 +203,12 @@ class EnRuExpressionsTest(EnRuExpressionsTestCommon, unittest2.TestCase):
         test('foo - "11" 00', 'foo{0}"11" 00'.format(MDASH_PAIR))
         test('2 - 2foo', '2{0}2foo'.format(MDASH_PAIR))
         test('2 - 2', '2 - 2')  # Doesn't clash with minus
+        # Non-digits before dash start after the last digit
+        test('(foo) - 2', '(foo){0}2'.format(MDASH_PAIR))
+        test('1 bar - baz - 2', '1 bar{0}baz{0}2'.format(MDASH_PAIR))
+        test('1st - 2', '1st - 2')
+        test('1  - 2', '1 {0}2'.format(MDASH_PAIR))
+        test('foo  -  bar', 'foo{0}bar'.format(MDASH_PAIR))
 
     def test_phones(self):
         test = super(EnRuExpressionsTest, self).test_phones()
@@ -229,6 +236,11 @@ class EnRuExpressionsTest(EnRuExpressionsTestCommon, unittest2.TestCase):
         test('3-2', '3-2')
         test('3-3', '3-3')
 
+        # Numbers are taken whole
+        test('12-34', '12{0}34'.format(MDASH))
+        test('123-4', '123-4')
+        test('1.2.3-4', '1.2.3{0}4'.format(MDASH))
+
     def test_pairs(self):
         test = super(EnRuExpressionsTest, self).test_pairs()
         test('aaa 2a', 'aaa 2a')  # letters only, no digits
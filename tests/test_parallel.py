@@ -0,0 +1,85 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from builtins import *  # noqa
+
+import mock
+import unittest2
+from typus import RuTypus, ru_typus
+from typus.parallel import (SharedText, TypusPool, _process_chunk,
+                            shared_memory)
+
+
+class TypusPoolTest(unittest2.TestCase):
+    texts = ['"foo" -- bar', '', '(c) 2mm', '"foo "bar" baz"'] * 10
+
+    def test_map(self):
+        with TypusPool(RuTypus, workers=2, chunksize=3) as pool:
+            self.assertEqual(list(pool.map(self.texts)),
+                             [ru_typus(text) for text in self.texts])
+
+    def test_instance(self):
+        with TypusPool(ru_typus, workers=1) as pool:
+            self.assertEqual(list(pool.map(['"foo" 2 mm'], debug=True)),
+                             ['«foo» 2_mm'])
+
+    def test_kwargs(self):
+        phrases = (x for x in ['(c)'])
+        with TypusPool(RuTypus, workers=2, chunksize=1) as pool:
+            self.assertEqual(
+                list(pool.map(['(c)', '(c) (r)'], escape_phrases=phrases)),
+                ['(c)', '(c)®'])
+
+
+@unittest2.skipIf(shared_memory is None, 'Requires Python 3.8+')
+class SharedTextTest(unittest2.TestCase):
+    def setUp(self):
+        # Names of blocks made and read by this process
+        self.names = names = []
+        init, read = SharedText.__init__, SharedText.read
+
+        def record_init(self, text):
+            init(self, text)
+            names.append(self.name)
+
+        def record_read(self, unlink=False):
+            names.append(self.name)
+            return read(self, unlink)
+
+        for name, method in (('__init__', record_init),
+                             ('read', record_read)):
+            patcher = mock.patch.object(SharedText, name, method)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def assertUnlinked(self):
+        self.assertTrue(self.names)
+        for name in self.names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+    def test_map(self):
+        texts = ['"foo" ' * 100, 'x', '(c)' * 100]
+        with TypusPool(RuTypus, workers=2, chunksize=1, threshold=50) as pool:
+            self.assertEqual(list(pool.map(texts)),
+                             [ru_typus(text) for text in texts])
+
+            # Stops in the middle, shared memory is cleaned up
+            results = pool.map(texts * 10)
+            next(results)
+            results.close()
+        self.assertUnlinked()
+
+    def test_error(self):
+        def typus(text):
+            if text == 'error':
+                raise ValueError(text)
+            return text
+
+        # Results made before the error are unlinked
+        with mock.patch('typus.parallel._typus', typus):
+            with self.assertRaises(ValueError):
+                _process_chunk(['x' * 100, 'error'], 50, (), {})
+        self.assertUnlinked()
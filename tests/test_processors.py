@@ -5,13 +5,15 @@ from __future__ import (absolute_import, division, print_function,
 
 import os
 from builtins import *  # noqa
+from itertools import count
 
 import mock
 import requests
 import unittest2
-from typus import RuTypus, ru_typus
+from typus import EnTypus, RuTypus, en_typus, ru_typus
 from typus.core import TypusCore
-from typus.processors import BaseProcessor
+from typus.processors import BaseProcessor, EscapePhrases, Expressions
+from typus.utils import PhraseSet, pattern_cache
 
 
 class BaseProcessorTest(unittest2.TestCase):
@@ -45,6 +47,52 @@ class EscapePhrasesTest(unittest2.TestCase):
         # Empty string, nothing to escape
         test('"foo"', '«foo»', '')
 
+        # Phrase inside of a tag
+        test('<a title="(c)">(c)</a>', '<a title="(c)">(c)</a>', '(c)')
+
+        # The longest one wins
+        test('"(c) (r)" (r)', '«(c) (r)»®', '(c)', '(c) (r)')
+
+    def test_phrase_set(self):
+        phrases = PhraseSet(['(c)', '(r)'])
+        self.assertEqual(
+            ru_typus('(c) (r) (tm)', escape_phrases=phrases),
+            ru_typus('(c) (r) (tm)', escape_phrases=['(c)', '(r)']))
+
+    def test_restore(self):
+        escape = EscapePhrases(ru_typus)
+        storage = []
+        counter = count()
+        text = escape._save_values('a b c', storage, counter,
+                                   escape_phrases=['a', 'b'])
+        self.assertNotIn('a', text)
+
+        # Stored values have keys to each other
+        key = escape._key(next(counter))
+        storage.append((key, text))
+        self.assertEqual(escape._restore_values(key + key, storage),
+                         'a b ca b c')
+
+        # Unknown keys are left as is
+        unknown = escape._key(100)
+        self.assertEqual(escape._restore_values(unknown, storage), unknown)
+
+    def test_keys(self):
+        escape = EscapePhrases(ru_typus)
+        keys = [escape._key(x) for x in range(10000)]
+        self.assertEqual(len(set(keys)), 10000)
+        self.assertEqual(len(keys[-1]), 4)
+        self.assertTrue(all(escape.re_keys.match(x).group() == x
+                            for x in keys))
+
+    def test_private_use(self):
+        # Icon fonts characters after a key aren't taken for a part of it
+        self.assertEqual(
+            ru_typus('foo\uf007bar (c)', escape_phrases=['foo', '(c)']),
+            'foo\uf007bar (c)')
+        self.assertEqual(ru_typus('<i class="fa">\uf007</i>\uf8ff "x"'),
+                         '<i class="fa">\uf007</i>\uf8ff «x»')
+
 
 class EscapeHtmlTest(unittest2.TestCase):
     def typus(self):
@@ -59,6 +107,15 @@ class EscapeHtmlTest(unittest2.TestCase):
         ru_typus('<code>test</code>')
         mock_restore_values.assert_called_once()
 
+    @mock.patch('typus.processors.EscapeHtml._save_values',
+                side_effect=lambda text, *args, **kwargs: text)
+    def test_triggers(self, mock_save_values):
+        ru_typus('test > test')
+        mock_save_values.assert_not_called()
+
+        ru_typus('test < test')
+        mock_save_values.assert_called_once()
+
     def test_codeblocks(self):
         test = self.typus()
         test('<pre>"test"</pre>', '<pre>"test"</pre>')
@@ -76,11 +133,41 @@ class EscapeHtmlTest(unittest2.TestCase):
              '<script type="text/javascript" src="/test/">"test"</script>')
 
     def test_nested_codeblocks(self):
-        # No nested codeblocks
         test = self.typus()
-        with self.assertRaises(AssertionError):
-            test('<code>dsfsdf <code>"test"</code> "sdfdf"</code>',
-                 '<code>dsfsdf <code>"test"</code> "sdfdf"</code>')
+        test('<code>dsfsdf <code>"test"</code> "sdfdf"</code>',
+             '<code>dsfsdf <code>"test"</code> "sdfdf"</code>')
+        test('<CODE>"a" <code>"b"</code></Code> "c"',
+             '<CODE>"a" <code>"b"</code></Code> «c»')
+
+        # Not closed outer one skips the rest of text
+        test('<code>"a" <code>"b"</code> "c"',
+             '<code>"a" <code>"b"</code> "c"')
+        test('<pre>>1/2<pre>x</pre>', '<pre>>1/2<pre>x</pre>')
+        self.assertEqual(en_typus('foo<code>+-2"  x<code></code>'),
+                         'foo<code>+-2"  x<code></code>')
+
+        # Not closed inner one is skipped with the outer one
+        test('<pre><code>"a"</pre> "b"', '<pre><code>"a"</pre> «b»')
+
+    def test_unclosed(self):
+        test = self.typus()
+        test('"test" <code>"test"', '«test» <code>"test"')
+        test('"test" <b', '«test» <b')
+        test('<!-- "test"', '<!-- «test»')
+        test('<header>"test"</header>', '<header>«test»</header>')
+
+    def test_mdash(self):
+        # Tags before a dash count as words, like text
+        test = self.typus()
+        test('<li> - 5 items</li>', '<li>\u00a0— 5\u00a0items</li>')
+        test('<br> - 1/2', '<br>\u00a0— ½')
+        test('</b> -  - x', '</b>\u00a0—\u00a0— x')
+        test('5 -  - "<b> - 1/2', '5\u00a0—\u00a0— "<b>\u00a0— ½')
+
+    def test_script(self):
+        test = self.typus()
+        test('<script>if (a<b) "c";</script> "d" <i>"e"</i>',
+             '<script>if (a<b) "c";</script> «d» <i>«e»</i>')
 
     def test_tags(self):
         test = self.typus()
@@ -205,8 +292,45 @@ class Quotes(unittest2.TestCase):
         test('''00" "11 '22' 11"? "11 '22 "33 33"' 11" 00' "11 '22' 11" 00"''',
              '00" «11 „22“ 11»? «11 „22 «33 33»“ 11» 00\' «11 „22“ 11» 00"')
 
+    def test_unbalanced(self):
+        test = self.typus()
+        # The leftmost pair wins
+        test('"a "b c"', '«a "b c»')
+        test('"a" "b', '«a» "b')
+        test('""a" b"', '«„a“ b»')
+
+        # Overlapping quotes of different types
+        test('"a \'b" c\'', '«a „b“ c»')
+
+    def test_deep(self):
+        test = self.typus()
+        test('"a ' * 5000, '"a' + ' "a' * 4999)
+        test('"a ' * 500 + 'b" ' * 500,
+             '«a „a ' * 250 + ('b“ b» ' * 250).strip())
+
     def test_me(self):
         test = self.typus()
         # Html test
         test('<span>"11"</span>', '<span>«11»</span>')
         test('"<span>11</span>"', '«<span>11</span>»')
+
+
+class ExpressionsTest(unittest2.TestCase):
+    def test_lazy(self):
+        # Patterns compiled by other tests are shared
+        pattern_cache.clear()
+        expressions = Expressions(RuTypus())
+        self.assertNotIn('compiled_exprs', vars(expressions))
+
+        # Every expression is compiled once it runs
+        expressions(lambda text: text)('Plain title')
+        compiled = [x for x, _ in expressions.compiled_exprs
+                    if 'subn' in vars(x)]
+        self.assertTrue(0 < len(compiled) < len(expressions.compiled_exprs))
+
+    def test_shared(self):
+        # Different Typus classes analyze and compile patterns once
+        en, ru = Expressions(EnTypus()), Expressions(RuTypus())
+        for x, y in zip(en.rules, ru.rules):
+            self.assertIs(x.expr, y.expr)
+            self.assertIs(x.requires, y.requires)
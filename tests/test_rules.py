@@ -0,0 +1,83 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import re
+from builtins import *  # noqa
+
+import unittest2
+from typus.rules import Rule, TextChars
+from typus.utils import re_compile
+
+
+class RuleTest(unittest2.TestCase):
+    def rule(self, pattern, repl='x', flags=re.I | re.U | re.M | re.S):
+        return Rule(re_compile(pattern, flags), repl)
+
+    def test_shared(self):
+        expr = re_compile('a')
+        rule = Rule.shared(expr, 'b')
+        self.assertIs(Rule.shared(expr, 'b'), rule)
+        self.assertIsNot(Rule.shared(expr, 'c'), rule)
+
+        # Functions have the same analysis, but every rule has its own one
+        func = lambda match: 'b'  # noqa
+        shared = Rule.shared(expr, func)
+        self.assertIs(shared.repl, func)
+        other = Rule.shared(expr, lambda match: 'c')
+        self.assertIs(other.writes, shared.writes)
+        self.assertIsNot(other.repl, func)
+
+    def test_writes(self):
+        rule = self.rule
+        self.assertEqual(rule('(a)', r'\1b').writes.chars, set('b'))
+        self.assertFalse(rule('(a)', r'\1b').writes.any)
+        # Deleted text joins its neighbours
+        self.assertTrue(rule('a', '').writes.any)
+        self.assertTrue(rule('a', lambda match: 'b').writes.any)
+
+
+class TextCharsTest(unittest2.TestCase):
+    def has(self, text, pattern, flags=re.I | re.U | re.M | re.S):
+        rule = Rule(re_compile(pattern, flags), '')
+        return TextChars(text).has(rule.requires)
+
+    def test_has(self):
+        self.assertTrue(self.has('a b', 'a'))
+        self.assertFalse(self.has('a b', 'c'))
+
+        # Every one is needed, but only one of a branch
+        self.assertFalse(self.has('a b', r'a\d'))
+        self.assertTrue(self.has('a b', 'c|b'))
+        self.assertFalse(self.has('a b', 'c|d'))
+
+        # Optional ones are not
+        self.assertTrue(self.has('a b', 'c?a'))
+
+        # Lookahead needs its characters, negative one doesn't
+        self.assertFalse(self.has('a b', 'a(?=c)'))
+        self.assertTrue(self.has('a b', 'a(?!c)'))
+
+    def test_categories(self):
+        self.assertTrue(self.has('a 5', r'\d'))
+        self.assertTrue(self.has('a \u0663', r'\d'))  # Arabic-indic three
+        self.assertFalse(self.has('a b', r'\d'))
+        self.assertFalse(self.has('ab', r'\s'))
+        self.assertTrue(self.has('a\xa0', r'\s'))
+        self.assertTrue(self.has('a', r'[^\W\d]'))
+
+    def test_ignorecase(self):
+        self.assertTrue(self.has('A', 'a'))
+        self.assertFalse(self.has('A', 'a', flags=0))
+        # Special cases of case folding
+        self.assertTrue(self.has('\u017f', 's'))  # Long s
+        self.assertTrue(self.has('\u212a', 'k'))  # Kelvin
+        self.assertTrue(self.has('\u0130', '\u0131'))  # Dotted and dotless i
+
+    def test_writes(self):
+        chars = TextChars('a')
+        rule = Rule(re_compile('b'), '')
+        self.assertFalse(chars.has(rule.requires))
+        chars.add(Rule(re_compile('a'), 'b').writes)
+        self.assertTrue(chars.has(rule.requires))
@@ -0,0 +1,187 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import os
+import subprocess
+import sys
+import threading
+from builtins import *  # noqa
+from http.client import HTTPConnection
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+import unittest2
+from typus import en_typus, ru_typus
+from typus.service import Counters, Service, make_server
+
+
+class ServiceTest(unittest2.TestCase):
+    def setUp(self):
+        self.service = Service(max_size=100)
+
+    def request(self, path, body=b'', method='POST', **environ):
+        environ.update(PATH_INFO=path, REQUEST_METHOD=method,
+                       CONTENT_LENGTH=str(len(body)),
+                       **{'wsgi.input': BytesIO(body + b'next request')})
+        if '?' in path:
+            environ['PATH_INFO'], environ['QUERY_STRING'] = path.split('?')
+        setup_testing_defaults(environ)
+
+        response = {}
+
+        def start_response(status, headers):
+            response.update(status=status, headers=dict(headers))
+
+        body = b''.join(self.service(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_typeset(self):
+        status, headers, body = self.request(
+            '/typeset', b'{"text": "\\"foo\\" (c)", "debug": true}')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(json.loads(body.decode('utf-8')),
+                         {'text': en_typus('"foo" (c)', debug=True)})
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+
+        # Lang in the query string, phrases in the body
+        status, _, body = self.request(
+            '/typeset?lang=ru',
+            b'{"text": "\\"foo\\" (c)", "escape_phrases": ["(c)"]}')
+        self.assertEqual(json.loads(body.decode('utf-8')),
+                         {'text': '«foo» (c)'})
+
+        # Plain text
+        status, headers, body = self.request(
+            '/typeset?lang=ru', '"foo"'.encode('utf-8'),
+            CONTENT_TYPE='text/plain')
+        self.assertEqual(body.decode('utf-8'), '«foo»')
+        self.assertTrue(headers['Content-Type'].startswith('text/plain'))
+
+    def test_batch(self):
+        lines = [
+            '"\\"foo\\""', '', '{"text": "(c)", "lang": "ru"}', 'foo',
+            '{"text": 1}', '{"text": "x", "lang": "de"}',
+            '{"text": "x", "foo": 1}', '{"text": "x", "debug": "no"}',
+            '"{0}"'.format('x' * 100), '"\\"bar\\""',
+        ]
+        status, headers, body = self.request(
+            '/batch', '\n'.join(lines).encode('utf-8'))
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('Content-Length', headers)
+
+        results = [json.loads(x) for x in body.decode('utf-8').splitlines()]
+        self.assertEqual(len(results), 9)
+        self.assertEqual(results[0], {'text': en_typus('"foo"')})
+        self.assertEqual(results[1], {'text': ru_typus('(c)')})
+        self.assertEqual(results[-1], {'text': en_typus('"bar"')})
+        for result, error in zip(results[2:-1], (
+                'invalid json', '"text" must', 'unknown lang',
+                'unknown options: foo', '"debug" must', 'longer than')):
+            self.assertTrue(result['error'].startswith(error))
+
+        stats = self.service.counters.snapshot()
+        self.assertEqual(stats['texts'], 3)
+        self.assertEqual(stats['requests'], 1)
+
+    def test_errors(self):
+        for path, body, method, status in (
+                ('/foo', b'', 'GET', '404 Not Found'),
+                ('/typeset', b'', 'GET', '405 Method Not Allowed'),
+                ('/typeset', b'x' * 101, 'POST', '413'),
+                ('/typeset', b'{"text": "\xff"}', 'POST', '400 Bad Request'),
+                ('/typeset', b'[]', 'POST', '400 Bad Request'),
+                ('/typeset', b'{"text": "", "debug": "no"}', 'POST',
+                 '400 Bad Request'),
+                ('/typeset', b'{"text": "", "debug": 1}', 'POST',
+                 '400 Bad Request')):
+            self.assertEqual(
+                self.request(path, body, method)[0].split()[0],
+                status.split()[0])
+        self.assertEqual(self.service.counters.snapshot()['errors'], 7)
+
+    def test_stats(self):
+        self.request('/typeset', b'"foo"')
+        status, _, body = self.request('/stats', method='GET')
+        stats = json.loads(body.decode('utf-8'))
+        self.assertEqual((stats['requests'], stats['texts'], stats['chars']),
+                         (1, 1, 3))
+        self.assertEqual(sum(stats['latency']['histogram'].values()), 1)
+        self.assertEqual(self.request('/health', method='GET')[2], b'ok\n')
+
+
+class CountersTest(unittest2.TestCase):
+    def test_percentiles(self):
+        counters = Counters()
+        for _ in range(98):
+            counters.add(texts=1, seconds=0.0005)
+        counters.add(texts=1, seconds=0.015)
+        counters.add(texts=1, seconds=10, error=True)
+        stats = counters.snapshot()
+        self.assertEqual(stats['errors'], 1)
+        latency = stats['latency']
+        self.assertEqual((latency['p50'], latency['p90'], latency['p99']),
+                         (1, 1, 20))
+        self.assertEqual(latency['histogram']['>5000'], 1)
+
+        counters.add(seconds=10)
+        self.assertIsNone(counters.snapshot()['latency']['p99'])
+
+
+class ServerTest(unittest2.TestCase):
+    def test_keep_alive(self):
+        server = make_server(port=0)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            connection = HTTPConnection(*server.server_address)
+            socks = []
+            for text in ('"foo"', '(c)'):
+                connection.request(
+                    'POST', '/typeset', json.dumps({'text': text}))
+                response = connection.getresponse()
+                self.assertEqual(json.loads(response.read().decode('utf-8')),
+                                 {'text': en_typus(text)})
+                self.assertFalse(response.will_close)
+                socks.append(connection.sock)
+            self.assertIs(socks[0], socks[1])
+
+            # Streamed response ends with the connection
+            connection.request('POST', '/batch', '"(c)"\n"(r)"')
+            response = connection.getresponse()
+            self.assertEqual(response.read().decode('utf-8'),
+                             '{"text": "©"}\n{"text": "®"}\n')
+            self.assertTrue(response.will_close)
+            connection.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    @unittest2.skipUnless(hasattr(os, 'fork'), 'Requires fork')
+    def test_workers(self):
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'typus.service', '--port', '0',
+             '--workers', '2'],
+            stdout=subprocess.PIPE, universal_newlines=True)
+        try:
+            host, port = process.stdout.readline().split('//')[1].rstrip(
+                '/\n').split(':')
+            for _ in range(4):
+                # New connections are taken by any of the workers
+                connection = HTTPConnection(host, int(port))
+                connection.request('POST', '/typeset', '"(c)"')
+                self.assertEqual(connection.getresponse().read(),
+                                 '{"text": "©"}\n'.encode('utf-8'))
+                connection.close()
+
+            connection = HTTPConnection(host, int(port))
+            connection.request('GET', '/stats')
+            stats = json.loads(connection.getresponse().read().decode('utf-8'))
+            connection.close()
+            self.assertEqual(stats['texts'], 4)
+        finally:
+            process.terminate()
+            self.assertEqual(process.wait(), 0)
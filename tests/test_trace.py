@@ -0,0 +1,125 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import random
+from builtins import *  # noqa
+
+import unittest2
+from typus import en_typus, ru_typus
+from typus.trace import Edit, OffsetMap, Trace, apply_edits
+
+
+class TraceTest(unittest2.TestCase):
+    def test_random_edits(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = current = ''.join(rng.choice('ab ')
+                                     for _ in range(rng.randint(0, 12)))
+            trace = Trace(text)
+            for step in range(rng.randint(1, 4)):
+                points = sorted(rng.randint(0, len(current))
+                                for _ in range(2 * rng.randint(0, 3)))
+                edits = [(points[i], points[i + 1],
+                          rng.choice(('', 'x', 'yz')), 'rule{0}'.format(step))
+                         for i in range(0, len(points), 2)]
+                trace.apply(edits)
+                current = apply_edits(current, edits)
+
+            edits = trace.edit_list(current)
+            self.assertEqual(apply_edits(text, edits), current)
+            self.assertTrue(all(x.end <= y.start
+                                for x, y in zip(edits, edits[1:])))
+
+    def test_rules(self):
+        trace = Trace('foo bar')
+        trace.apply([(0, 3, 'baz', 'first'), (4, 4, '_', 'first')])
+        # Takes 'z' of one literal, the space between and the other one
+        trace.apply([(2, 5, 'Z', 'second')])
+        self.assertEqual(trace.edit_list('baZbar'), [
+            Edit(0, 4, 'baZ', 'first+second'),
+        ])
+        trace.apply([(6, 6, 'bar', None), (6, 6, '!', 'third')])
+        self.assertEqual(trace.edit_list('baZbarbar!')[-1],
+                         Edit(7, 7, 'bar!', 'third'))
+
+
+class OffsetMapTest(unittest2.TestCase):
+    def test_lookup(self):
+        text = 'a...b  c'
+        edits = [Edit(0, 0, '"', None), Edit(1, 4, '…', None),
+                 Edit(5, 6, '', None)]
+        offsets = OffsetMap(edits, apply_edits(text, edits))
+        self.assertEqual(offsets.text, '"a…b c')
+        self.assertEqual(len(offsets), 3)
+        self.assertEqual([offsets.to_output(x) for x in range(9)],
+                         [1, 2, 2, 2, 3, 4, 4, 5, 6])
+        self.assertEqual([offsets.to_original(x) for x in range(7)],
+                         [0, 0, 1, 4, 6, 7, 8])
+
+    def test_typeset(self):
+        rng = random.Random(0)
+        chars = ' .-"(c)1a'
+        for _ in range(500):
+            text = ''.join(rng.choice(chars)
+                           for _ in range(rng.randint(0, 30)))
+            edits = ru_typus.edits(text)
+            offsets = edits.offsets()
+            self.assertEqual(offsets.text, ru_typus(text))
+            self.assertEqual(offsets.to_output(len(text)), len(offsets.text))
+            self.assertEqual(offsets.to_original(len(offsets.text)),
+                             len(text))
+
+            edited = set()
+            for edit in edits:
+                edited.update(range(edit.start, edit.end))
+            for position in range(len(text)):
+                if position not in edited:
+                    output = offsets.to_output(position)
+                    self.assertEqual(offsets.text[output], text[position])
+                    self.assertEqual(offsets.to_original(output), position)
+
+
+class EditsTest(unittest2.TestCase):
+    def test_edits(self):
+        text = ' "foo" -- <b>"bar"</b> (c)\n'
+        edits = ru_typus.edits(text)
+        self.assertEqual(edits.text, ru_typus(text))
+        self.assertEqual([x.rule for x in edits], [
+            'strip', 'Quotes', 'Quotes', 'expr_mdash[0]', 'Quotes', 'Quotes',
+            'expr_complex_symbols[0]', 'strip',
+        ])
+        self.assertEqual(edits[3], Edit(6, 9, '\u00a0—', 'expr_mdash[0]'))
+
+    def test_unchanged(self):
+        edits = en_typus.edits('“foo”')
+        self.assertFalse(edits.changed)
+        self.assertEqual(edits.text, '“foo”')
+        self.assertEqual(en_typus.edits('  '), [Edit(0, 2, '', 'strip')])
+        self.assertEqual(en_typus.edits(''), [])
+
+    def test_escaping(self):
+        text = '<b>"(c)"</b> <code>"(c)"</code>'
+        edits = en_typus.edits(text, escape_phrases=['(c)', 'b'])
+        self.assertEqual(edits, [Edit(3, 4, '“', 'Quotes'),
+                                 Edit(7, 8, '”', 'Quotes')])
+
+    def test_debug(self):
+        edits = en_typus.edits('1 (c) 2', debug=True)
+        self.assertEqual(edits.text, en_typus('1 (c) 2', debug=True))
+        self.assertIn('debug', edits[-1].rule)
+
+    def test_typeset(self):
+        rng = random.Random(0)
+        chars = ' \n.,-+=*/<>()"\' “«1a'
+        for _ in range(1000):
+            text = ''.join(rng.choice(chars)
+                           for _ in range(rng.randint(0, 30)))
+            for typus in (en_typus, ru_typus):
+                for kwargs in ({}, {'debug': True},
+                               {'escape_phrases': ['a', '"']}):
+                    edits = typus.edits(text, **kwargs)
+                    self.assertEqual(edits.text, typus(text, **kwargs))
+                    self.assertEqual(apply_edits(text, edits), edits.text)
+                    self.assertTrue(all(x.rule for x in edits))
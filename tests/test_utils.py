@@ -3,8 +3,12 @@ from __future__ import (absolute_import, division, print_function,
 
 from builtins import *  # noqa
 
+from threading import Thread
+
 import unittest2
-from typus.utils import idict, splinter
+from typus.utils import (LazyPattern, LRUCache, PhraseSet, cached_property,
+                         idict, map_choices, pattern_cache, re_compile,
+                         splinter)
 
 
 class IdictTest(unittest2.TestCase):
@@ -32,6 +36,51 @@ class IdictTest(unittest2.TestCase):
         self.assertEqual(self.compare, target)
 
 
+class LazyTest(unittest2.TestCase):
+    def test_re_compile(self):
+        pattern = re_compile('a', lazy=True)
+        self.assertIsInstance(pattern, LazyPattern)
+        self.assertEqual(vars(pattern), {'pattern': 'a',
+                                         'flags': re_compile('a').flags,
+                                         'engine': None})
+
+        # Compiled once used
+        self.assertEqual(pattern.sub('b', 'aA'), 'bb')
+        self.assertIn('sub', vars(pattern))
+        with self.assertRaises(AttributeError):
+            pattern.foo
+
+    def test_pattern_cache(self):
+        self.assertIs(re_compile('a'), re_compile('a'))
+        self.assertIs(re_compile('a', lazy=True), re_compile('a', lazy=True))
+        self.assertIsNot(re_compile('a'), re_compile('a', flags=0))
+
+        pattern_cache.clear()
+        re_compile('a', flags=0)
+        re_compile('a', flags=0)
+        self.assertEqual(pattern_cache.info()[:2], (1, 1))
+
+    def test_map_choices_cache(self):
+        self.assertIs(map_choices({'a': 'b'}), map_choices({'A': 'b'}))
+        self.assertIsNot(map_choices({'a': 'b'}),
+                         map_choices({'a': 'b'}, dict_class=dict))
+        # Unhashable values are not cached
+        self.assertIsNot(map_choices({'a': ['b']}), map_choices({'a': ['b']}))
+
+    def test_cached_property(self):
+        class Foo(object):
+            calls = 0
+
+            @cached_property
+            def bar(self):
+                self.calls += 1
+                return self.calls
+
+        foo = Foo()
+        self.assertEqual((foo.bar, foo.bar, foo.calls), (1, 1, 1))
+        self.assertEqual(Foo().bar, 1)
+
+
 class SplinterTest(unittest2.TestCase):
     def test_basic(self):
         split = splinter(',')
@@ -65,3 +114,110 @@ class SplinterTest(unittest2.TestCase):
     def test_doesnt_remove_other_slashes(self):
         split = splinter('*')
         self.assertEqual(split('a * b * c\*c \\b'), ['a', 'b', 'c*c \\b'])
+
+
+class PhraseSetTest(unittest2.TestCase):
+    def sub(self, phrases, text):
+        return PhraseSet(phrases).sub(
+            lambda match: '[{0}]'.format(match.group()), text)
+
+    def test_leftmost_longest(self):
+        self.assertEqual(self.sub(['b', 'abc'], 'abcd'), '[abc]d')
+        self.assertEqual(self.sub(['ab', 'bcd'], 'abcd'), '[ab]cd')
+        self.assertEqual(self.sub(['a', 'ab', 'abcd'], 'abcabcd'),
+                         '[ab]c[abcd]')
+
+    def test_case_sensitive(self):
+        self.assertEqual(self.sub(['(C)'], '(c) (C)'), '(c) [(C)]')
+
+    def test_special_chars(self):
+        self.assertEqual(self.sub(['a.b', '[x]', '\\'], 'axb a.b [x] \\'),
+                         'axb [a.b] [[x]] [\\]')
+
+    def test_empty(self):
+        self.assertEqual(self.sub(['', '  '], 'foo  bar'), 'foo  bar')
+        self.assertFalse(PhraseSet())
+
+    def test_splinter(self):
+        phrases = PhraseSet(splinter(',')('foo, bar\\, baz'))
+        self.assertEqual(set(phrases), {'foo', 'bar, baz'})
+
+    def test_hash(self):
+        phrases = PhraseSet(['foo', 'bar'])
+        self.assertEqual(phrases, PhraseSet(['bar', 'foo', 'foo']))
+        self.assertEqual(hash(phrases), hash(PhraseSet(phrases)))
+        self.assertNotEqual(phrases, PhraseSet(['foo']))
+
+    def test_many(self):
+        phrases = ['brand{0}'.format(x) for x in range(5000)]
+        self.assertEqual(self.sub(phrases, 'brand42 brand4999x brand'),
+                         '[brand42] [brand4999]x brand')
+
+    def test_deep(self):
+        # Every phrase is a prefix of the next one
+        for count in (50, 500):
+            phrases = ['a' * x for x in range(1, count + 1)]
+            self.assertEqual(self.sub(phrases, 'b' + 'a' * (count + 1)),
+                             'b[{0}][a]'.format('a' * count))
+        phrases = ['ab' * x for x in range(1, 200)] + ['aba', 'abac']
+        self.assertEqual(self.sub(phrases, 'abac ababa'),
+                         '[abac] [abab]a')
+
+
+class LRUCacheTest(unittest2.TestCase):
+    def test_maxsize(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 0)
+        cache.set('b', 1)
+        self.assertEqual(cache.get('a'), 0)
+        cache.set('c', 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 0)
+        self.assertEqual(cache.get('c'), 2)
+        self.assertEqual(cache.info(), (3, 1, 1, 2, cache.bytes))
+
+    def test_maxbytes(self):
+        cache = LRUCache(maxsize=None, maxbytes=10)
+        cache.set('a', 0, size=4)
+        cache.set('b', 1, size=4)
+        cache.set('c', 2, size=4)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.info().bytes, 8)
+
+        # Too big to be cached at all
+        cache.set('d', 3, size=11)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(len(cache), 2)
+
+    def test_update(self):
+        cache = LRUCache()
+        cache.set('a', 0, size=4)
+        cache.set('a', 1, size=2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.info().bytes, 2)
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache.set('a', 0)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 0, 0, 0))
+
+    def test_threads(self):
+        cache = LRUCache(maxsize=10)
+
+        def run():
+            for i in range(1000):
+                cache.set(i % 20, i)
+                cache.get(i % 15)
+
+        threads = [Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        info = cache.info()
+        self.assertEqual(info.size, 10)
+        self.assertEqual(info.hits + info.misses, 4000)
@@ -0,0 +1,159 @@
+# coding: utf-8
+"""
+Asyncio support, Python 3.7+ only: the module is imported once it's
+used, see :meth:`typus.core.TypusCore.aprocess`, so Typus itself runs
+on older Pythons too.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import asyncio
+from builtins import *  # noqa
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import cpu_count
+from weakref import WeakKeyDictionary
+
+from .utils import PhraseSet
+
+__all__ = ('AsyncTypus', )
+
+# Worker's own Typus instances by class, see :func:`_process`
+_typuses = {}
+
+
+def _process(typus_class, text, args, kwargs):
+    typus = _typuses.get(typus_class)
+    if typus is None:
+        typus = _typuses[typus_class] = typus_class()
+    return typus(text, *args, **kwargs)
+
+
+class AsyncTypus(object):
+    """
+    Typesets texts in an executor, so large ones don't block the event
+    loop. Short texts are typeset right away, it's faster than passing
+    them to a thread. Every Typus has one: see
+    :meth:`typus.core.TypusCore.aprocess`.
+
+    :param typus: :class:`typus.core.TypusCore` instance.
+    :param executor: :mod:`concurrent.futures` executor, a thread pool of
+        ``limit`` threads by default. Processes of
+        :class:`concurrent.futures.ProcessPoolExecutor` make their own
+        Typus instances, so the class must be importable.
+    :param int limit: Number of texts in the executor at once, defaults
+        to the number of CPUs. The rest wait for their turn without
+        taking any memory of the executor.
+    :param int inline_size: Texts shorter than that are typeset in
+        the event loop.
+
+    >>> import asyncio
+    >>> from typus.aio import AsyncTypus
+    >>> aio = AsyncTypus(en_typus, limit=2, inline_size=4)
+    >>> asyncio.run(aio.process_many(['"foo"', '(c)']))
+    ['“foo”', '©']
+
+    A cancelled text is dropped if it hasn't got into the executor yet,
+    otherwise the executor finishes it, and it takes its place in
+    ``limit`` until then.
+    """
+
+    def __init__(self, typus, executor=None, limit=None, inline_size=1024):
+        self.typus = typus
+        self.limit = limit or cpu_count()
+        self.inline_size = inline_size
+        self.executor = executor
+        # Semaphores are bound to a loop in older Pythons
+        self.semaphores = WeakKeyDictionary()
+
+    def close(self):
+        """
+        Shuts down the default executor, the given one is left as is.
+        """
+
+        if isinstance(self._executor, _OwnExecutor):
+            self._executor.shutdown()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = _OwnExecutor(self.limit)
+        return self._executor
+
+    @executor.setter
+    def executor(self, executor):
+        self._executor = executor
+
+    async def process(self, text, *args, **kwargs):
+        """
+        Typesets text, the same as calling Typus does.
+        """
+
+        if len(text) < self.inline_size:
+            return self.typus(text, *args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self.semaphores[loop] = asyncio.Semaphore(self.limit)
+
+        await semaphore.acquire()
+        try:
+            if isinstance(self.executor, ProcessPoolExecutor):
+                future = self.executor.submit(
+                    _process, type(self.typus), text, args, kwargs)
+            else:
+                future = self.executor.submit(
+                    self.typus, text, *args, **kwargs)
+        except BaseException:
+            semaphore.release()
+            raise
+        # Takes its place until the executor is done with it,
+        # even if the caller has stopped waiting
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(semaphore.release))
+        return await asyncio.wrap_future(future)
+
+    async def map(self, texts, *args, **kwargs):
+        """
+        Typesets an iterable or an async iterable of texts and yields
+        results in the same order. Takes next texts once previous ones
+        are done, no more than ``limit`` at once.
+        """
+
+        # Phrases may come as a generator, see TypusCore.process_many
+        if kwargs.get('escape_phrases'):
+            kwargs['escape_phrases'] = PhraseSet(kwargs['escape_phrases'])
+
+        pending = deque()
+        try:
+            if hasattr(texts, '__aiter__'):
+                async for text in texts:
+                    pending.append(asyncio.ensure_future(
+                        self.process(text, *args, **kwargs)))
+                    if len(pending) >= self.limit:
+                        yield await pending.popleft()
+            else:
+                for text in texts:
+                    pending.append(asyncio.ensure_future(
+                        self.process(text, *args, **kwargs)))
+                    if len(pending) >= self.limit:
+                        yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            # Iteration has been stopped
+            for future in pending:
+                future.cancel()
+
+    async def process_many(self, texts, *args, **kwargs):
+        """
+        Typesets texts, see :meth:`map`, and returns a list of results.
+        """
+
+        return [x async for x in self.map(texts, *args, **kwargs)]
+
+
+class _OwnExecutor(ThreadPoolExecutor):
+    pass
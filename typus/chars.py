@@ -22,5 +22,8 @@ DLQUO = '„'  # double low curly quote mark
 LAQUO = '«'  # left angle quote marks
 RAQUO = '»'  # right angle quote marks
 
+# Ends keys of escaped html and phrases, see EscapePhrases
+KEY_END = '\uE0FF'
+
 SPRIME = '′'
 DPRIME = '″'
@@ -0,0 +1,328 @@
+"""
+Command line tool, typesets files or stdin:
+
+    $ echo '"foo" -- bar' | typus
+    $ typus --lang ru --in-place content/
+    $ typus --lang myproject.typography.MyTypus -o build/ 'docs/**/*.md'
+
+Directories are read recursively, ``--include`` picks files of them.
+Files are spread over a pool of processes, which read and write them
+themselves, so only paths are passed between processes. Files are written
+atomically: to a temporary file which then replaces the target one.
+The tool is installed on Python 3.7+ only, since it needs recursive globs,
+os.replace() and the process pool initializer.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import codecs
+import fnmatch
+import glob
+import io
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+from builtins import *  # noqa
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from multiprocessing import cpu_count
+from timeit import default_timer
+
+from .core import TypusCore
+
+__all__ = ('main', 'get_typus_class', 'find_files', 'typeset_file')
+
+LANGS = {'en': 'typus.EnTypus', 'ru': 'typus.RuTypus'}
+
+# Files of that size and larger are read with mmap
+MMAP_SIZE = 1 << 20
+
+# Worker's own Typus instance, see :func:`_init_worker`
+_typus = None
+
+
+def get_typus_class(name):
+    """
+    Returns Typus class by language or dotted path to a
+    :class:`typus.core.TypusCore` subclass or instance.
+
+    >>> from typus.cli import get_typus_class
+    >>> get_typus_class('ru')
+    <class 'typus.RuTypus'>
+    >>> get_typus_class('typus.en_typus')
+    <class 'typus.EnTypus'>
+    """
+
+    path = LANGS.get(name, name)
+    module, _, attr = path.replace(':', '.').rpartition('.')
+    try:
+        typus = getattr(import_module(module), attr)
+    except (ImportError, AttributeError, ValueError):
+        raise ValueError('No such Typus: {0}'.format(name))
+
+    typus_class = typus if isinstance(typus, type) else type(typus)
+    if not issubclass(typus_class, TypusCore):
+        raise ValueError('Not a Typus: {0}'.format(name))
+    return typus_class
+
+
+def find_files(paths, include=()):
+    """
+    Yields pairs of file paths and the paths relative to the given ones:
+    globs are expanded, directories are walked recursively and their files
+    are matched with ``include`` patterns, if any.
+    """
+
+    for path in paths:
+        if glob.has_magic(path):
+            matched = sorted(glob.glob(path, recursive=True))
+            # Matches are relative to the part of the glob before magic
+            parts = path.split(os.sep)
+            index = next(i for i, x in enumerate(parts) if glob.has_magic(x))
+            base = os.sep.join(parts[:index]) or os.curdir
+            if index == 1 and not parts[0]:
+                base = os.sep
+        else:
+            matched, base = [path], os.path.dirname(path) or os.curdir
+
+        for match in matched:
+            if not os.path.isdir(match):
+                yield match, os.path.relpath(match, base)
+                continue
+
+            for root, dirs, files in os.walk(match):
+                dirs.sort()
+                for name in sorted(files):
+                    if include and not any(
+                            fnmatch.fnmatch(name, x) for x in include):
+                        continue
+                    filename = os.path.join(root, name)
+                    yield filename, os.path.relpath(filename, match)
+
+
+def read_file(filename, encoding='utf-8'):
+    """
+    Reads text of the file, large ones are decoded right from the memory
+    mapped file, so they aren't copied into bytes first.
+    """
+
+    with io.open(filename, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        # Empty files can't be mapped
+        if size < MMAP_SIZE or not size:
+            return fp.read().decode(encoding)
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return codecs.decode(data, encoding)
+        finally:
+            data.close()
+
+
+def write_file(filename, text, encoding='utf-8', mode_from=None):
+    """
+    Writes the file atomically: readers see either the old file or
+    the whole new one.
+    """
+
+    dirname = os.path.dirname(os.path.abspath(filename))
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    fd, temp = tempfile.mkstemp(dir=dirname, prefix='.typus-')
+    try:
+        with io.open(fd, 'wb') as fp:
+            fp.write(text.encode(encoding))
+        if mode_from is not None:
+            shutil.copymode(mode_from, temp)
+        os.replace(temp, filename)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def typeset(typus, text, *args, **kwargs):
+    # Keeps the last line break of the file
+    result = typus(text, *args, **kwargs)
+    if result:
+        for ending in ('\r\n', '\n'):
+            if text.endswith(ending):
+                return result + ending
+    return result
+
+
+def typeset_file(typus, source, target=None, encoding='utf-8', *args,
+                 **kwargs):
+    """
+    Typesets the source file into the target one, in place by default.
+    A file is not rewritten in place if nothing has changed.
+    Returns the number of bytes read and whether it has changed.
+    """
+
+    size = os.path.getsize(source)
+    text = read_file(source, encoding)
+    result = typeset(typus, text, *args, **kwargs)
+    changed = result != text
+    if changed or (target is not None and target != source):
+        write_file(target or source, result, encoding, mode_from=source)
+    return size, changed
+
+
+def _init_worker(typus_class):
+    global _typus
+    _typus = typus_class()
+
+
+def _typeset_file(source, target, encoding, args, kwargs):
+    try:
+        return typeset_file(_typus, source, target, encoding, *args,
+                            **kwargs) + (None, )
+    except (IOError, OSError, UnicodeError) as e:
+        return 0, False, str(e)
+
+
+def _run(jobs, typus_class, workers, encoding, args, kwargs):
+    # Yields (source, size, changed, error) in order of jobs
+    if workers <= 1:
+        _init_worker(typus_class)
+        for source, target in jobs:
+            yield (source, ) + _typeset_file(source, target, encoding, args,
+                                             kwargs)
+        return
+
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(typus_class, ))
+    pending = deque()
+    jobs = iter(jobs)
+    try:
+        for source, target in jobs:
+            pending.append((source, executor.submit(
+                _typeset_file, source, target, encoding, args, kwargs)))
+            # Keeps a few files per worker in flight
+            if len(pending) >= workers * 4:
+                source, future = pending.popleft()
+                yield (source, ) + future.result()
+        while pending:
+            source, future = pending.popleft()
+            yield (source, ) + future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+def _lines(stream, ending):
+    # Remembers the last line break, see typeset()
+    for line in stream:
+        ending[:] = [line[-2:]]
+        yield line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='typus', description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', metavar='PATH',
+                        help='files, directories or globs, stdin if none '
+                             'or "-"')
+    parser.add_argument('-l', '--lang', default='en',
+                        help='en, ru or a dotted path to Typus class')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('-i', '--in-place', action='store_true',
+                        help='rewrites files')
+    output.add_argument('-o', '--output', metavar='DIR',
+                        help='writes files into the directory')
+    parser.add_argument('--include', action='append', default=[],
+                        metavar='GLOB',
+                        help='file names to take from directories, '
+                             'say, "*.md", all by default')
+    parser.add_argument('-j', '--workers', type=int, default=cpu_count(),
+                        help='number of processes')
+    parser.add_argument('--encoding', default='utf-8')
+    parser.add_argument('--escape-phrase', action='append', default=[],
+                        metavar='PHRASE',
+                        help='phrase to leave as is, can be repeated')
+    parser.add_argument('--debug', action='store_true',
+                        help='shows nbsp as underscores')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='reports errors only')
+    options = parser.parse_args(argv)
+
+    try:
+        typus_class = get_typus_class(options.lang)
+    except ValueError as e:
+        parser.error(str(e))
+
+    kwargs = {}
+    if options.escape_phrase:
+        kwargs['escape_phrases'] = options.escape_phrase
+    args = (options.debug, )
+
+    if not options.paths or options.paths == ['-']:
+        if options.in_place or options.output:
+            parser.error('stdin is written to stdout only')
+        stdin = io.open(sys.stdin.fileno(), encoding=options.encoding,
+                        newline='', closefd=False)
+        stdout = io.open(sys.stdout.fileno(), 'w', encoding=options.encoding,
+                         newline='', closefd=False)
+        ending, written = [], False
+        with stdout:
+            # Large input is typeset part by part
+            for part in typus_class().stream(_lines(stdin, ending), 1 << 16,
+                                             *args, **kwargs):
+                stdout.write(part)
+                written = True
+            if written and ending[0].endswith('\n'):
+                stdout.write('\r\n' if ending[0] == '\r\n' else '\n')
+        return 0
+
+    files = list(find_files(options.paths, options.include))
+    if options.output:
+        jobs = [(x, os.path.join(options.output, y)) for x, y in files]
+    elif options.in_place:
+        jobs = [(x, None) for x, _ in files]
+    else:
+        # Prints results, nothing is written
+        stdout = io.open(sys.stdout.fileno(), 'w', encoding=options.encoding,
+                         newline='', closefd=False)
+        typus = typus_class()
+        errors = 0
+        with stdout:
+            for filename, _ in files:
+                try:
+                    stdout.write(typeset(
+                        typus, read_file(filename, options.encoding),
+                        *args, **kwargs))
+                except (IOError, OSError, UnicodeError) as e:
+                    errors += 1
+                    print('{0}: {1}'.format(filename, e), file=sys.stderr)
+        return 1 if errors else 0
+
+    start = default_timer()
+    done = changed = errors = size = 0
+    for source, read, modified, error in _run(
+            jobs, typus_class, min(options.workers, len(jobs)),
+            options.encoding, args, kwargs):
+        if error:
+            errors += 1
+            print('{0}: {1}'.format(source, error), file=sys.stderr)
+            continue
+        done += 1
+        changed += modified
+        size += read
+
+    elapsed = max(default_timer() - start, 1e-9)
+    if not options.quiet:
+        print('{0} files, {1} changed, {2} errors in {3:.2f}s: '
+              '{4:.1f} files/s, {5:.0f} bytes/s'.format(
+                  done, changed, errors, elapsed, done / elapsed,
+                  size / elapsed), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,27 +1,261 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import sys
 from builtins import *  # noqa
+from collections import deque
 from functools import update_wrapper
+from threading import local
 
-from .chars import NBSP, NNBSP
-from .utils import re_compile
+from .chars import (ANYSP, DLQUO, LAQUO, LDQUO, LSQUO, NBSP, NDASH, NNBSP,
+                    RAQUO, RDQUO, RSQUO)
+from .engines import get_engine
+from .processors import EscapeHtml, EscapePhrases, Quotes, TextChanged
+from .trace import Trace
+from .utils import PhraseSet, cached_property, re_compile
 
 __all__ = ('TypusCore', )
 
 
+def iter_lines(source):
+    """
+    Yields lines with line endings from a file object or any iterable
+    of text chunks.
+    """
+
+    tail = []
+    for chunk in source:
+        start = 0
+        end = chunk.find('\n') + 1
+        while end:
+            line = chunk[start:end]
+            yield ''.join(tail) + line if tail else line
+            tail = []
+            start, end = end, chunk.find('\n', end) + 1
+        if start < len(chunk):
+            tail.append(chunk[start:])
+    if tail:
+        yield ''.join(tail)
+
+
+class Boundary(object):
+    """
+    Follows lines of text and tells if everything is closed at the end of
+    the last line: html tags, comments, skipped blocks like ``<pre>`` and
+    quotes. Text split at a safe boundary is processed by parts the same
+    way as the whole one.
+
+    Mdash between a non-digit and a digit looks back through all text
+    since the last digit for a word or escaped html, see
+    :meth:`typus.mixins.EnRuExpressions.expr_mdash`. So once there are
+    words or tags, a part is split off only if its first line has a word
+    before such a dash, see :meth:`splits`.
+    """
+
+    re_blank = re_compile(r'{0}*\r?\n?\Z'.format(ANYSP), lazy=True)
+    re_tokens = re_compile(
+        r'(<!--)|(-->)|<(/?)({0})\b|(<[!?/]?[a-z])|(>)|([{1}])'.format(
+            EscapeHtml.skiptags,
+            '"\'' + LSQUO + RSQUO + LDQUO + RDQUO + DLQUO + LAQUO + RAQUO),
+        lazy=True)
+    re_word = re_compile(r'\w', lazy=True)
+    re_dash = re_compile(r'\W*?{0}[\-|{1}]{0}'.format(ANYSP, NDASH),
+                         lazy=True)
+    # Symbols like (c) are no words once they are replaced
+    re_symbols = re_compile(r'\(\w+\)', lazy=True)
+
+    def __init__(self):
+        self.offset = 0
+        self.comment = self.tag = False
+        # Whether there is a word outside of markup or a tag, and
+        # the text outside of markup of the last line
+        self.words = False
+        self.text = ''
+        # Unpaired skipped tags by name, any of them may be closed later
+        self.blocks = {}
+        # Runs of unpaired opening quotes
+        self.quotes = {'"': deque(), "'": deque()}
+
+    @property
+    def safe(self):
+        return not (self.markup or self.quotes['"'] or self.quotes["'"])
+
+    @property
+    def markup(self):
+        return self.comment or self.tag or any(self.blocks.values())
+
+    def splits(self, words):
+        """
+        Tells if a part which starts with the last line is typeset the same
+        way after the text before it, which has ``words`` or not.
+        """
+
+        if not words:
+            return True
+        text = self.re_symbols.sub('', self.text)
+        return bool(self.re_word.search(text) and
+                    not self.re_dash.match(text))
+
+    def feed(self, line):
+        normalized = None
+        text = []
+        position = 0
+        for match in self.re_tokens.finditer(line):
+            opened, closed, slash, skiptag, tag, _, quote = match.groups()
+            outside = not self.markup
+            if outside:
+                text.append(line[position:match.start()])
+            position = match.end()
+            if self.comment:
+                self.comment = not closed
+            elif opened:
+                self.comment = True
+            elif skiptag:
+                # Skipped tags are paired even within other tags,
+                # see :class:`typus.processors.EscapeHtml`
+                self._skiptag(skiptag.lower(), slash)
+                self.tag = True
+            elif self.tag:
+                self.tag = not match.group().endswith('>')
+            elif tag:
+                self.tag = True
+            elif quote and not any(self.blocks.values()):
+                if normalized is None:
+                    normalized = Quotes.re_normalize.sub("'", line)
+                self._quote(normalized, match.start())
+            if outside and not (opened or skiptag or tag):
+                # Quotes, stray '>' and '-->' are text
+                text.append(match.group())
+            elif outside:
+                # Escaped html counts as a word
+                self.words = True
+        if not self.markup:
+            text.append(line[position:])
+        self.text = ''.join(text)
+        self.words = self.words or bool(self.re_word.search(self.text))
+        self.offset += len(line)
+
+    def _skiptag(self, name, closing):
+        count = self.blocks.get(name, 0)
+        self.blocks[name] = max(count - 1, 0) if closing else count + 1
+
+    def _quote(self, line, index):
+        # Pairs quotes the same way :class:`typus.processors.Quotes` does
+        quote, opens, closes = Quotes.re_quotes.match(line, index).groups()
+        Quotes._pair_quote(self.quotes[quote], self.offset + index,
+                           opens is not None, closes is not None)
+
+
+def split_parts(source, chunk_size=0, phrases=()):
+    """
+    Splits text from a file object or an iterable of text chunks by blank
+    lines into parts of ``chunk_size`` characters and more. Splits only at
+    safe boundaries, see :class:`Boundary`. A part ends with the blank
+    lines after it, line breaks included, so it is typeset the same way
+    as within the whole text, and the results are joined as they are.
+    The first and the last parts are stripped the same way the whole text
+    would be, empty ones are skipped.
+
+    Escape ``phrases`` with line breaks may span blank lines, then text
+    is never split. Other ones count as words, like escaped html does.
+    """
+
+    phrases = list(phrases)
+    multiline = any('\n' in x for x in phrases)
+    boundary = Boundary()
+    boundary.words = bool(phrases)
+    chunk, blanks, size = [], [], 0
+    # A part is held back until the next one, since the last part is
+    # stripped with all blank lines and spaces before it
+    pending = ''
+    for line in iter_lines(source):
+        if boundary.re_blank.match(line):
+            if chunk:
+                blanks.append(line)
+            continue
+
+        split = False
+        if blanks:
+            # Blank lines could be a part of <pre> or a quote
+            chunk.extend(blanks)
+            blanks = []
+            split = (size >= chunk_size and boundary.safe and
+                     not multiline)
+            words = boundary.words
+
+        boundary.feed(line)
+        if split and boundary.splits(words):
+            if pending:
+                yield pending
+                pending = ''.join(chunk)
+            else:
+                pending = ''.join(chunk).lstrip()
+            chunk, size = [], 0
+
+        chunk.append(line)
+        size += len(line)
+
+    text = ''.join(chunk).rstrip()
+    if not pending:
+        text = text.lstrip()
+    elif not text:
+        pending = pending.rstrip()
+    if pending:
+        yield pending
+    if text:
+        yield text
+
+
+class Stats(object):
+    """
+    Counts processors and expressions which have run on a text and which
+    have been skipped, since the text has none of characters they need.
+    Processors which always run are not counted. Profiled Typus also keeps
+    :class:`typus.processors.Record` of every one that has run in
+    ``records``.
+    """
+
+    def __init__(self):
+        self.run = self.skipped = 0
+        self.records = []
+
+    def __repr__(self):
+        return 'Stats(run={0}, skipped={1})'.format(self.run, self.skipped)
+
+
 class TypusCore(object):
     """
     This class makes :mod:`typus.processors` and :mod:`typus.mixins` work
     together.
+
+    :param cache: Optional :class:`typus.utils.LRUCache` to store results in.
+        Can be shared between threads and different Typus instances.
+    :param profile: ``True`` keeps :class:`typus.processors.Record` of every
+        processor and expression in :attr:`stats`, a function is also called
+        with every record, say, to send it to metrics. Typus which is not
+        profiled has no overhead at all.
+
+    >>> typus = EnTypus(profile=True)
+    >>> typus('"foo" bar')
+    '“foo” bar'
+    >>> [x.name for x in typus.stats.records]  # doctest: +ELLIPSIS
+    ['expr_spaces[0]', ..., 'Expressions', 'Quotes', 'EscapePhrases']
+    >>> typus.stats.records[-2].replaced  # quotes
+    2
     """
 
     processors = ()
     expressions = ()
-    re_nbsp = re_compile('[{0}{1}]'.format(NBSP, NNBSP))
+    # Engine name or instance, see :class:`typus.engines.Engine`
+    regex_engine = None
+    re_nbsp = re_compile('[{0}{1}]'.format(NBSP, NNBSP), lazy=True)
+    re_nbsp_bytes = re_compile(
+        '{0}|{1}'.format(NBSP, NNBSP).encode('utf-8'), 0, lazy=True)
 
-    def __init__(self):
+    def __init__(self, cache=None, profile=None):
         assert self.processors
+        self.profile = profile
+        self.engine = get_engine(self.regex_engine)
 
         # Makes possible to decorate Typus.
         # updated=() skips __dict__ attribute
@@ -30,15 +264,422 @@ class TypusCore(object):
         # Chains all processors into one single function
         self.process = sum(p(self) for p in reversed(self.processors))
 
+        self.cache = cache
+        self.local = local()
+        # Different Typus configurations never share results in the cache
+        self.fingerprint = (
+            self.__class__, self.processors, tuple(self.expressions),
+            tuple(getattr(self, x, None) for x in ('loq', 'roq', 'leq', 'req'))
+        )
+
+    @property
+    def stats(self):
+        """
+        :class:`Stats` of the last text typeset in the current thread.
+
+        >>> en_typus('"foo"')
+        '“foo”'
+        >>> en_typus.stats
+        Stats(run=1, skipped=29)
+        """
+
+        stats = getattr(self.local, 'stats', None)
+        if stats is None:
+            stats = self.local.stats = Stats()
+        return stats
+
+    def record(self, record):
+        # Keeps what processors and expressions have done, see `profile`
+        self.stats.records.append(record)
+        if callable(self.profile):
+            self.profile(record)
+
+    @property
+    def probing(self):
+        # Processors only check if text needs typesetting, see below,
+        # or "apply" expressions once any of them changes it, see __call__
+        return getattr(self.local, 'probing', False)
+
+    @property
+    def trace(self):
+        # Processors report what they replace, see edits()
+        return getattr(self.local, 'trace', None)
+
+    def needs_typesetting(self, text, *args, **kwargs):
+        """
+        Tells if typesetting may change the text other than stripping it.
+        Runs processors, but expressions only look for matches and stop
+        once any of them changes the text.
+
+        The check is conservative: it never tells ``False`` for text which
+        typesetting changes, but it may tell ``True`` for text which comes
+        out the same, say, if an expression replaces a match with the same
+        text or a later one puts it back.
+
+        >>> en_typus.needs_typesetting('“foo” bar')
+        False
+        >>> en_typus.needs_typesetting('"foo" -- bar')
+        True
+        """
+
+        self.local.stats = Stats()
+        text = text.strip()
+        if not text:
+            return False
+
+        self.local.probing = True
+        try:
+            return self.process(text, *args, **kwargs) != text
+        except TextChanged:
+            return True
+        finally:
+            self.local.probing = False
+
     def __call__(self, text, debug=False, *args, **kwargs):
+        """
+        Typesets text.
+
+        :param bool debug: Makes non-breaking spaces visible.
+        :param bool assume_idempotent: Expressions only look for matches
+            the way :meth:`needs_typesetting` does and run once any of
+            them changes the text, so text typeset already comes back
+            with no replacements made.
+        """
+
+        assume_idempotent = kwargs.pop('assume_idempotent', False)
+        self.local.stats = Stats()
         text = text.strip()
         if not text:
             return ''
 
-        # All the magic
-        text = self.process(text, *args, **kwargs)
+        key = self.cache is not None and self._cache_key(
+            text, debug, args, kwargs)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # Profile records every expression as it runs
+        if assume_idempotent and not self.profile:
+            self.local.probing = 'apply'
+        try:
+            # All the magic
+            processed = self.process(text, *args, **kwargs)
+        finally:
+            self.local.probing = False
+
+        # Makes nbsp visible
+        if debug:
+            processed = self.re_nbsp.sub('_', processed)
+
+        if key:
+            self.cache.set(key, processed,
+                           sys.getsizeof(text) + sys.getsizeof(processed))
+        return processed
+
+    def edits(self, text, debug=False, *args, **kwargs):
+        """
+        Typesets text and returns :class:`typus.trace.EditList` of what
+        has been replaced in the original text and by which rule, rather
+        than the whole result. Escaped html and phrases are put back,
+        so they are never in there. ``changed`` tells if there is anything
+        to save at all, and ``text`` is the typeset text.
+
+        >>> en_typus.edits('"foo"...')  # doctest: +NORMALIZE_WHITESPACE
+        [Edit(start=0, end=1, replacement='“', rule='Quotes'),
+         Edit(start=4, end=5, replacement='”', rule='Quotes'),
+         Edit(start=5, end=8, replacement='…', rule='expr_complex_symbols[0]')]
+        >>> en_typus.edits('“foo”').changed
+        False
+
+        Edits are not cached.
+        """
+
+        trace = Trace(text)
+        self.local.stats = Stats()
+        stripped = text.strip()
+        leading = len(text) - len(text.lstrip())
+        trace.apply([x for x in (
+            (0, leading, '', 'strip'),
+            (leading + len(stripped), len(text), '', 'strip')) if x[0] < x[1]])
+        if not stripped:
+            return trace.edit_list('')
+
+        if kwargs.get('escape_phrases'):
+            kwargs['escape_phrases'] = PhraseSet(kwargs['escape_phrases'])
+
+        self.local.trace = trace
+        try:
+            processed = self.process(stripped, *args, **kwargs)
+        finally:
+            self.local.trace = None
+
+        if debug:
+            trace.apply([(x.start(), x.end(), '_', 'debug')
+                         for x in self.re_nbsp.finditer(processed)])
+            processed = self.re_nbsp.sub('_', processed)
+        return trace.edit_list(processed)
+
+    def offsets(self, text, *args, **kwargs):
+        """
+        Typesets text and returns :class:`typus.trace.OffsetMap` of
+        positions in the original text to the typeset ``text`` and back,
+        see :meth:`edits`.
+
+        >>> offsets = en_typus.offsets('(c) 2016')
+        >>> offsets.text, offsets.to_output(4), offsets.to_original(2)
+        ('©\\xa02016', 2, 4)
+        """
+
+        return self.edits(text, *args, **kwargs).offsets()
+
+    @cached_property
+    def bytes_escaper(self):
+        """
+        :class:`typus.processors.EscapeHtml` which escapes blocks of bytes
+        for :meth:`process_bytes`, if it runs first, phrases aside.
+        """
+
+        for processor in self.processors:
+            if issubclass(processor, EscapeHtml):
+                return processor(self)
+            if not issubclass(processor, EscapePhrases):
+                return None
+        return None
+
+    def process_bytes(self, data, debug=False, *args, **kwargs):
+        """
+        Typesets utf-8 bytes, a memoryview or any other bytes-like object
+        and returns utf-8 bytes. Skipped blocks, like ``<pre>`` or
+        ``<script>``, are escaped before the text is decoded, so they are
+        never decoded, copied or encoded, only the text around them is.
+
+        >>> en_typus.process_bytes(b'<code>"x"</code> "x"').decode('utf-8')
+        '<code>"x"</code> “x”'
+
+        Escaped phrases may be anywhere, so the whole text is decoded if
+        there are any. Invalid utf-8 is passed as is within blocks.
+        """
+
+        if not isinstance(data, bytes):
+            view = memoryview(data)
+            # A view of whole bytes is taken as is, others are copied
+            if isinstance(view.obj, bytes) and view.nbytes == len(view.obj):
+                data = view.obj
+            else:
+                data = view.tobytes()
+
+        escaper = self.bytes_escaper
+        if (escaper is None or kwargs.get('escape_phrases') or
+                escaper.blocks_sentinel.encode('utf-8') in data):
+            return self(data.decode('utf-8'), debug, *args,
+                        **kwargs).encode('utf-8')
+
+        text, storage = escaper.escape_blocks(data)
+        text = self(text, debug, *args, **kwargs)
+        if not storage:
+            return text.encode('utf-8')
+        if debug:
+            storage = [(x, self.re_nbsp_bytes.sub(b'_', y))
+                       for x, y in storage]
+        return escaper.restore_blocks(text, storage)
+
+    def _cache_key(self, text, debug, args, kwargs):
+        options = []
+        for name, value in sorted(kwargs.items()):
+            if name == 'escape_phrases':
+                # Phrases may come as a generator
+                value = kwargs[name] = PhraseSet(value)
+                if not value:
+                    continue
+            options.append((name, value))
+
+        key = self.fingerprint, text, bool(debug), args, tuple(options)
+        try:
+            hash(key)
+        except TypeError:
+            # Can't cache unhashable arguments
+            return None
+        return key
+
+    def process_many(self, texts, *args, **kwargs):
+        """
+        Typesets an iterable of texts with the same arguments and returns
+        a list of results in the same order. Since the text is stripped
+        before processing, texts which differ in surrounding spaces only
+        are processed once.
+
+        >>> en_typus.process_many(['"foo"', '(c)', ' "foo" '])
+        ['“foo”', '©', '“foo”']
+        """
+
+        # Phrases may come as a generator which is exhausted after
+        # the first call. Also they are compiled once for all texts
+        if kwargs.get('escape_phrases'):
+            kwargs['escape_phrases'] = PhraseSet(kwargs['escape_phrases'])
+
+        results = {}
+        processed = []
+        for text in texts:
+            key = text.strip()
+            if key not in results:
+                results[key] = self(key, *args, **kwargs)
+            processed.append(results[key])
+        return processed
+
+    def stream(self, source, chunk_size=1 << 16, debug=False, *args,
+               **kwargs):
+        r"""
+        Typesets a file object or an iterable of text chunks part by part
+        and yields the results, which joined together are the same as
+        the whole text typeset at once.
+        Text is split by blank lines, where no quote, html tag or skipped
+        block (say, ``<pre>``) is left open, into parts of ``chunk_size``
+        characters and more.
 
+        >>> list(en_typus.stream(['"foo"\n', '\n\n', '"bar', '"'],
+        ...                      chunk_size=1))
+        ['“foo”\n\n', '“bar”']
+
+        .. caution::
+            A quote which is never closed makes the rest of text a single
+            part. An escape phrase with a line break makes the whole text
+            a single part.
+        """
+
+        if kwargs.get('escape_phrases'):
+            kwargs['escape_phrases'] = PhraseSet(kwargs['escape_phrases'])
+
+        parts = split_parts(source, chunk_size,
+                            kwargs.get('escape_phrases') or ())
+        for part in parts:
+            yield self._process_part(part, debug, args, kwargs)
+
+    def stream_html(self, source, debug=False, *args, **kwargs):
+        """
+        Typesets html from a file object or an iterable of chunks with
+        a streaming parser and yields the results as soon as they are
+        ready, see :mod:`typus.dom`.
+
+        >>> ''.join(en_typus.stream_html(
+        ...     ['<p>"foo <i>bar', '</i>"</p><code>"x"</code>']))
+        '<p>“foo <i>bar</i>”</p><code>"x"</code>'
+        """
+
+        # The parser takes a while to import, see aio
+        from .dom import HtmlTypesetter
+
+        if kwargs.get('escape_phrases'):
+            kwargs['escape_phrases'] = PhraseSet(kwargs['escape_phrases'])
+
+        parser = HtmlTypesetter(self, debug, *args, **kwargs)
+        for chunk in source:
+            parser.feed(chunk)
+            output = parser.read()
+            if output:
+                yield output
+        parser.close()
+        output = parser.read()
+        if output:
+            yield output
+
+    @cached_property
+    def aio(self):
+        """
+        :class:`typus.aio.AsyncTypus` which runs :meth:`aprocess`, assign
+        your own one to set the executor and limits.
+        """
+
+        from .aio import AsyncTypus
+        return AsyncTypus(self)
+
+    def aprocess(self, text, *args, **kwargs):
+        """
+        Coroutine which typesets text in an executor, so the event loop
+        is not blocked, short texts are typeset right away. Python 3.7+
+        only.
+
+        >>> import asyncio
+        >>> asyncio.run(en_typus.aprocess('"foo"'))
+        '“foo”'
+        """
+
+        return self.aio.process(text, *args, **kwargs)
+
+    def aprocess_many(self, texts, *args, **kwargs):
+        """
+        Coroutine which typesets an iterable or an async iterable of texts
+        in an executor, see :meth:`typus.aio.AsyncTypus.map`, and returns
+        a list of results.
+        """
+
+        return self.aio.process_many(texts, *args, **kwargs)
+
+    def session(self, debug=False, *args, **kwargs):
+        """
+        Returns :class:`Session` which typesets new versions of the same
+        text processing only changed paragraphs.
+        """
+
+        return Session(self, debug, *args, **kwargs)
+
+    def _process_part(self, text, debug, args, kwargs):
+        self.local.stats = Stats()
+        text = self.process(text, *args, **kwargs)
         # Makes nbsp visible
         if debug:
             return self.re_nbsp.sub('_', text)
         return text
+
+
+class Session(object):
+    r"""
+    Keeps typeset paragraphs of a text, so every next version of it
+    is processed paragraph by paragraph, and only the changed ones run
+    through Typus. Paragraphs with open quotes or html tags are kept
+    together with their neighbours, so the result is the same as if
+    the whole text was typeset.
+
+    >>> session = en_typus.session()
+    >>> session.update('"foo"\n\n"bar"')
+    '“foo”\n\n“bar”'
+    >>> session.update('"foo"\n\n"baz"')
+    '“foo”\n\n“baz”'
+    >>> session.processed, session.reused
+    (1, 1)
+    """
+
+    def __init__(self, typus, debug=False, *args, **kwargs):
+        if kwargs.get('escape_phrases'):
+            kwargs['escape_phrases'] = PhraseSet(kwargs['escape_phrases'])
+
+        self.typus = typus
+        self.debug, self.args, self.kwargs = debug, args, kwargs
+        self.results = {}
+
+        # Stats of the last update
+        self.processed = self.reused = 0
+
+    def update(self, text):
+        """
+        Returns typeset text.
+        """
+
+        parts = list(split_parts(
+            [text], phrases=self.kwargs.get('escape_phrases') or ()))
+        results = {}
+        self.processed = self.reused = 0
+        for part in parts:
+            if part in results:
+                self.reused += 1
+            elif part in self.results:
+                results[part] = self.results[part]
+                self.reused += 1
+            else:
+                results[part] = self.typus._process_part(
+                    part, self.debug, self.args, self.kwargs)
+                self.processed += 1
+
+        # Drops paragraphs which are not in the text anymore
+        self.results = results
+        return ''.join(results[part] for part in parts)
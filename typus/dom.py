@@ -0,0 +1,189 @@
+# coding: utf-8
+"""
+Html mode: a streaming parser splits html into runs of text, which are
+typeset one by one, while markup is written as it is. A run of text ends
+at block tags like ``<p>`` or ``<li>``, so quotes are paired within
+a paragraph, and inline tags like ``<b>`` or ``<a>`` don't break it.
+Content of tags like ``<pre>``, ``<code>`` or ``<script>`` is never
+typeset.
+
+Results are written once a run ends, so memory is taken by the largest
+run of text rather than the whole page. See
+:meth:`typus.core.TypusCore.stream_html`.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import re
+from builtins import *  # noqa
+from html.parser import HTMLParser
+
+from .processors import EscapeHtml
+from .utils import re_compile
+
+__all__ = ('HtmlTypesetter', )
+
+
+class HtmlTypesetter(HTMLParser):
+    """
+    Feed it with html chunks, :meth:`read` what is typeset so far and
+    :meth:`close` it at the end.
+
+    Tokens are passed through as they are in the source: the parser only
+    tells what kind of token it is. Inline tags, comments and skipped
+    inline tags like ``<code>`` with their content are replaced with keys
+    in a run, the same way :class:`typus.processors.EscapeHtml` does.
+
+    >>> from typus.dom import HtmlTypesetter
+    >>> parser = HtmlTypesetter(en_typus)
+    >>> parser.feed('<p>"foo <b>bar</b>" -- baz</p><pre>"')
+    >>> parser.read()
+    '<p>“foo <b>bar</b>”\\xa0— baz</p><pre>"'
+    >>> parser.close()
+    >>> parser.read()
+    ''
+    """
+
+    skiptags = frozenset(EscapeHtml.skiptags.split('|'))
+    # Tags which end a run of text, skipped ones are written at once
+    blocktags = frozenset((
+        'address', 'article', 'aside', 'blockquote', 'body', 'caption',
+        'dd', 'details', 'dialog', 'div', 'dl', 'dt', 'fieldset',
+        'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+        'h5', 'h6', 'head', 'header', 'hgroup', 'hr', 'html', 'li', 'main',
+        'nav', 'noscript', 'ol', 'option', 'p', 'pre', 'script', 'section',
+        'select', 'style', 'summary', 'table', 'tbody', 'td', 'template',
+        'textarea', 'tfoot', 'th', 'thead', 'title', 'tr', 'ul',
+    ))
+
+    # Text which could be taken for keys
+    re_private = re_compile('[{0}{1}\ue100-\uf0ff]+'.format(
+        EscapeHtml.blocks_sentinel, EscapeHtml.terminator), re.U, lazy=True)
+
+    def __init__(self, typus, debug=False, *args, **kwargs):
+        # Entities are left as they are, the same as in any text
+        HTMLParser.__init__(self, convert_charrefs=False)
+        self.typus = typus
+        self.debug, self.args, self.kwargs = debug, args, kwargs
+        self.escaper = EscapeHtml(typus)
+
+        self.output = []
+        # Text and keys of the current run
+        self.run = []
+        self.storage = []
+        # Open skipped tags and the source of an inline one
+        self.skipped = []
+        self.block = None
+        self.event = None
+
+    def read(self):
+        """
+        Returns what is typeset since the last call.
+        """
+
+        output = ''.join(self.output)
+        self.output = []
+        return output
+
+    def close(self):
+        HTMLParser.close(self)
+        # Unclosed <script> or <style> is left in there
+        if self.rawdata:
+            self.token(self.rawdata, None, None)
+            self.rawdata = ''
+        if self.block is not None:
+            self.run.append(self.store(''.join(self.block)))
+            self.skipped, self.block = [], None
+        self.flush()
+
+    def handle_starttag(self, tag, attrs):
+        self.event = 'start', tag
+
+    def handle_startendtag(self, tag, attrs):
+        self.event = 'startend', tag
+
+    def handle_endtag(self, tag):
+        self.event = 'end', tag
+
+    def handle_comment(self, data):
+        self.event = 'markup', None
+
+    handle_decl = handle_pi = unknown_decl = handle_comment
+
+    def updatepos(self, i, j):
+        # Every token the parser has taken from the source goes through
+        # here, it's passed to handlers just before. Text has no events
+        if i < j:
+            event, self.event = self.event, None
+            self.token(self.rawdata[i:j], *(event or (None, None)))
+        return HTMLParser.updatepos(self, i, j)
+
+    def token(self, source, kind, tag):
+        if self.skipped:
+            if kind == 'start' and tag in self.skiptags:
+                self.skipped.append(tag)
+            elif kind == 'end' and tag in self.skipped:
+                # Closes tags left open within the skipped one too
+                index = self.skipped[::-1].index(tag)
+                del self.skipped[len(self.skipped) - index - 1:]
+
+            if self.block is None:
+                self.output.append(source)
+                return
+            self.block.append(source)
+            if not self.skipped:
+                self.run.append(self.store(''.join(self.block)))
+                self.block = None
+            return
+
+        if kind is None:
+            # Text which looks like keys is escaped too
+            self.run.append(self.re_private.sub(
+                lambda match: self.store(match.group()), source))
+        elif kind == 'start' and tag in self.skiptags:
+            self.skipped.append(tag)
+            if tag in self.blocktags:
+                self.flush()
+                self.output.append(source)
+            else:
+                self.block = [source]
+        elif tag in self.blocktags:
+            self.flush()
+            self.output.append(source)
+        else:
+            self.run.append(self.store(source))
+
+    def store(self, html):
+        key = self.escaper._key(len(self.storage),
+                                self.escaper.blocks_sentinel)
+        self.storage.append((key, html))
+        return key
+
+    def flush(self):
+        """
+        Typesets the current run of text.
+        """
+
+        if not self.run:
+            return
+
+        text = ''.join(self.run)
+        values = dict(self.storage)
+        self.run, self.storage = [], []
+
+        # Spaces around are left as they are
+        stripped = text.strip()
+        if stripped:
+            start = len(text) - len(text.lstrip())
+            text = ''.join((
+                text[:start],
+                self.typus._process_part(stripped, self.debug, self.args,
+                                         self.kwargs),
+                text[start + len(stripped):],
+            ))
+        if values:
+            text = self.escaper.re_blocks_keys.sub(
+                lambda match: values.get(match.group(), match.group()),
+                text)
+        self.output.append(text)
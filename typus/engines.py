@@ -0,0 +1,329 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import re
+from builtins import *  # noqa
+from importlib import import_module
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+__all__ = ('Engine', 'RegexEngine', 'Re2Engine', 'Unsupported', 'engines',
+           'get_engine', 'available_engines', 'fallbacks')
+
+# Python 2 patterns are ascii unless re.U is given
+ASCII = getattr(re, 'ASCII', 0)
+
+
+class Unsupported(ValueError):
+    """
+    Raised by :meth:`Engine.check` for a pattern the engine can't run
+    the same way :mod:`re` does.
+    """
+
+
+class Engine(object):
+    """
+    Regex engine for :func:`typus.utils.re_compile`, which runs
+    expressions and processor patterns of Typus. Set ``regex_engine``
+    in Typus to the engine name or instance to use it:
+
+    >>> from typus.engines import Engine
+    >>> class MyTypus(EnTypus):
+    ...     regex_engine = Engine()
+    >>> MyTypus()('"foo" (c)')
+    '“foo” ©'
+
+    Patterns the engine can't run the same way are compiled with
+    :mod:`re`, see :func:`fallbacks`. This one is :mod:`re` itself,
+    subclasses adapt other modules with the same interface.
+    """
+
+    name = module_name = 're'
+
+    # Regex operations the engine doesn't have by their parser names
+    unsupported = {}
+    # Whether unicode \w, \d, \s and \b match the same characters
+    # they do in :mod:`re`
+    unicode_classes = True
+
+    def __init__(self):
+        # Raises ImportError if the engine is not installed
+        self.module = import_module(self.module_name)
+
+    def __repr__(self):
+        return '{0}()'.format(self.__class__.__name__)
+
+    def check(self, pattern, flags):
+        """
+        Compiles the pattern with the engine.
+
+        :raises Unsupported: If the engine can't run it, with the reason.
+        """
+
+        if self.unsupported or not self.unicode_classes:
+            try:
+                parsed = sre_parse.parse(pattern, flags)
+            except re.error as e:
+                raise Unsupported(str(e))
+            self._walk(parsed, flags)
+
+        try:
+            return self._compile(pattern, flags)
+        except self.module.error as e:
+            raise Unsupported(str(e))
+
+    def compile(self, pattern, flags):
+        """
+        Compiles the pattern with the engine, if it can run it,
+        or with :mod:`re` otherwise.
+        """
+
+        try:
+            return self.check(pattern, flags)
+        except Unsupported:
+            return re.compile(pattern, flags)
+
+    def reason(self, pattern, flags):
+        """
+        Returns why the engine can't run the pattern, ``None`` if it can.
+        """
+
+        try:
+            self.check(pattern, flags)
+        except Unsupported as e:
+            return str(e)
+        return None
+
+    def _compile(self, pattern, flags):
+        return self.module.compile(pattern, flags)
+
+    def _walk(self, parsed, flags):
+        for op, av in parsed:
+            name = str(op).upper()
+            self._check_op(name, av, flags)
+            if name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT',
+                        'SUBPATTERN', 'ASSERT', 'ASSERT_NOT'):
+                self._walk(av[-1], flags)
+            elif name == 'ATOMIC_GROUP':
+                self._walk(av, flags)
+            elif name == 'BRANCH':
+                for branch in av[1]:
+                    self._walk(branch, flags)
+            elif name == 'GROUPREF_EXISTS':
+                for branch in av[1:]:
+                    if branch is not None:
+                        self._walk(branch, flags)
+
+    def _check_op(self, name, av, flags):
+        if name in self.unsupported:
+            raise Unsupported(self.unsupported[name])
+        if self.unicode_classes:
+            return
+        unicode = not flags & ASCII if ASCII else flags & re.U
+        if not unicode:
+            return
+        if name == 'IN' and any(str(x).upper() == 'CATEGORY' for x, _ in av):
+            raise Unsupported('unicode \\w, \\d or \\s')
+        if name == 'AT' and 'BOUNDARY' in str(av).upper():
+            raise Unsupported('unicode \\b')
+
+
+class RegexEngine(Engine):
+    """
+    Adapts `regex <https://pypi.org/project/regex/>`_ module, which is
+    compatible with :mod:`re` in ``VERSION0`` mode. But its unicode
+    ``\\w`` takes marks and not numerals like ``½``, ``\\s`` doesn't take
+    ``\\x1c-\\x1f`` and unicode versions differ, so patterns with them
+    run with :mod:`re`. Set ``unicode_classes = True`` in a subclass
+    if that's fine. Dotless ``ı`` is the only character it matches
+    ignoring case differently.
+    """
+
+    name = module_name = 'regex'
+    unicode_classes = False
+
+    def _compile(self, pattern, flags):
+        # Some of the flags have other values in there
+        native = self.module.VERSION0
+        for name in ('I', 'L', 'M', 'S', 'U', 'X', 'A'):
+            if flags & getattr(re, name, 0):
+                native |= getattr(self.module, name)
+        return self.module.compile(pattern, native)
+
+
+class Re2Match(object):
+    """
+    RE2 match, which expands templates the way :mod:`re` does: RE2 mixes
+    up non-ascii characters of templates.
+    """
+
+    re_template = re.compile(r'\\(?:g<([^>]*)>|(\d\d?)|(.))', re.S)
+    escapes = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r',
+               't': '\t', 'v': '\v', '\\': '\\'}
+
+    def __init__(self, match):
+        self.match = match
+
+    def __getattr__(self, name):
+        return getattr(self.match, name)
+
+    def expand(self, template):
+        def replace(match):
+            name, number, char = match.groups()
+            if char is not None:
+                return self.escapes.get(char, match.group())
+            group = name or number
+            group = int(group) if group.isdigit() else group
+            return self.match.group(group) or ''
+        return self.re_template.sub(replace, template)
+
+
+class Re2Pattern(object):
+    """
+    RE2 compiled pattern with ``pattern`` and ``flags`` it was made of,
+    as :mod:`re` has them.
+    """
+
+    def __init__(self, compiled, pattern, flags):
+        self.compiled, self.pattern, self.flags = compiled, pattern, flags
+        self.groups = compiled.groups
+        self.groupindex = compiled.groupindex
+        self.split = compiled.split
+
+    def __repr__(self):
+        return 'Re2Pattern({0!r}, {1})'.format(self.pattern, self.flags)
+
+    def search(self, *args):
+        match = self.compiled.search(*args)
+        return match and Re2Match(match)
+
+    def match(self, *args):
+        match = self.compiled.match(*args)
+        return match and Re2Match(match)
+
+    def finditer(self, *args):
+        return (Re2Match(x) for x in self.compiled.finditer(*args))
+
+    def sub(self, repl, string, count=0):
+        return self.subn(repl, string, count)[0]
+
+    def subn(self, repl, string, count=0):
+        if not callable(repl):
+            template = repl
+
+            def repl(match):
+                return Re2Match(match).expand(template)
+        return self.compiled.subn(repl, string, count)
+
+
+class Re2Engine(Engine):
+    """
+    Adapts `google-re2 <https://pypi.org/project/google-re2/>`_, which runs
+    in linear time. RE2 has no lookarounds and back references, its
+    ``\\w``, ``\\d``, ``\\s`` and ``\\b`` are ascii only, so most of built-in
+    expressions run with :mod:`re`.
+    """
+
+    name = module_name = 're2'
+    unsupported = {
+        'ASSERT': 'lookaround',
+        'ASSERT_NOT': 'lookaround',
+        'GROUPREF': 'back reference',
+        'GROUPREF_EXISTS': 'conditional group',
+        'ATOMIC_GROUP': 'atomic group',
+        'POSSESSIVE_REPEAT': 'possessive repeat',
+    }
+    unicode_classes = False
+
+    def check(self, pattern, flags):
+        if flags & re.X:
+            raise Unsupported('verbose flag')
+        return super(Re2Engine, self).check(pattern, flags)
+
+    def _compile(self, pattern, flags):
+        # Flags go inline, so the pattern is kept as is
+        inline = ''.join(x for x, y in (('i', re.I), ('m', re.M), ('s', re.S))
+                         if flags & y)
+        options = self.module.Options()
+        options.log_errors = False
+        compiled = self.module.compile(
+            '(?{0}){1}'.format(inline, pattern) if inline else pattern,
+            options)
+        return Re2Pattern(compiled, pattern, flags)
+
+    def _check_op(self, name, av, flags):
+        super(Re2Engine, self)._check_op(name, av, flags)
+        at = str(av).upper()
+        if name == 'AT' and (at == 'AT_END_STRING' or (
+                at == 'AT_END' and not flags & re.M)):
+            # Python matches them before the last line break too
+            raise Unsupported('end of text')
+
+
+#: Engines by name, for ``regex_engine`` Typus attribute
+engines = {
+    Engine.name: Engine,
+    RegexEngine.name: RegexEngine,
+    Re2Engine.name: Re2Engine,
+}
+
+
+def get_engine(engine):
+    """
+    Returns engine instance by name, instances are returned as they are.
+    ``None`` is for :mod:`re` as is, with no engine at all.
+
+    :raises ImportError: If the engine is not installed.
+    :raises KeyError: If there is no engine of the name.
+    """
+
+    if engine is None or isinstance(engine, Engine):
+        return engine
+    return engines[engine]()
+
+
+def available_engines():
+    """
+    Returns names of engines which are installed.
+
+    >>> from typus.engines import available_engines
+    >>> 're' in available_engines()
+    True
+    """
+
+    names = []
+    for name, engine in sorted(engines.items()):
+        try:
+            engine()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def fallbacks(typus):
+    """
+    Lists patterns of Typus its engine can't run, those run with :mod:`re`:
+    pairs of expression or processor pattern name and the reason.
+
+    >>> from typus.engines import fallbacks
+    >>> fallbacks(en_typus)  # no engine at all
+    []
+    """
+
+    engine = typus.engine
+    if engine is None:
+        return []
+
+    result = []
+    for processor in typus.processors:
+        for name, expr in processor(typus).patterns():
+            reason = engine.reason(expr.pattern, expr.flags)
+            if reason is not None:
+                result.append((name, reason))
+    return result
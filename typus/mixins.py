@@ -129,7 +129,9 @@ class EnRuExpressions(object):
 
         expr = (
             (r'{0}{{2,}}'.format(ANYSP), WHSP),
-            (r'(?:^{0}+|{0}+$)'.format(ANYSP), ''),
+            # Runs of spaces are matched from the first one, otherwise
+            # every space of a run is tried and each one scans to its end
+            (r'(?:^{0}+|(?<!{0}){0}+$)'.format(ANYSP), ''),
         )
         return expr
 
@@ -198,11 +200,16 @@ class EnRuExpressions(object):
 
             # Dash can be between anything except digits
             # because in that case it's not obvious
-            (r'{0}+[\-|{1}]{0}+(?!\d\b)'.format(ANYSP, NDASH), MDASH_PAIR),
+            (r'(?<!{0}){0}+[\-|{1}]{0}+(?!\d\b)'.format(ANYSP, NDASH),
+             MDASH_PAIR),
 
             # Same but backwards
-            # It joins non-digit with digit or word
-            (r'(\b\D+){0}+[\-|{1}]{0}+'.format(ANYSP, NDASH),
+            # It joins non-digit with digit or word.
+            # Non-digits start at the first word boundary of text or after
+            # a digit, any other start would scan the same ones again.
+            # Escaped html and phrases end like a word after a digit
+            (r'((?:\A\W*|(?<=\d)[^\W\d]*)\b[^\d{2}]+|(?<={2})[^\d{2}]*)'
+             r'{0}[\-|{1}]{0}+'.format(ANYSP, NDASH, KEY_END),
              r'\1{0}'.format(MDASH_PAIR)),
 
             # Line beginning adds nbsp after dash
@@ -210,7 +217,7 @@ class EnRuExpressions(object):
              r'{0}{1}'.format(MDASH, NBSP)),
 
             # Also mdash can be at the end of the line in poems
-            (r'{0}+\-{{1,2}}{0}*(?=$|<br/?>)'.format(ANYSP),
+            (r'(?<!{0}){0}+\-{{1,2}}{0}*(?=$|<br/?>)'.format(ANYSP),
              r'{0}{1}'.format(NBSP, MDASH)),
         )
         return expr
@@ -314,7 +321,8 @@ class EnRuExpressions(object):
             return '{0}{1}{2}'.format(left, dash, right)
 
         expr = (
-            (r'(-?(?:[0-9]+[\.,][0-9]+|[0-9]+))(-)'
+            # Numbers are matched from the first digit
+            (r'(-?(?<![0-9])(?:[0-9]+[\.,][0-9]+|[0-9]+))(-)'
              r'([0-9]+[\.,][0-9]+|[0-9]+)'
              r'(?!{0}+{1}|{2})'
              .format(ANYSP, self.math_operators, self.words),
@@ -405,7 +413,8 @@ class EnRuExpressions(object):
         after = re.escape(data.get('after', '') + both)
         expr = []
         if before:
-            expr.append((r'{0}+(?=[{1}])'.format(find, before), replace))
+            expr.append((r'(?<!{0}){0}+(?=[{1}])'.format(find, before),
+                         replace))
         if after:
             expr.append((r'(?<=[{1}]){0}+'.format(find, after), replace))
         return expr
@@ -0,0 +1,171 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from builtins import *  # noqa
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import cpu_count
+
+from .utils import PhraseSet
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8
+    resource_tracker = shared_memory = None
+
+__all__ = ('TypusPool', )
+
+# Worker's own Typus instance, see :func:`_init_worker`
+_typus = None
+
+
+class SharedText(object):
+    """
+    A handle to utf-8 encoded text put into shared memory. Only the handle
+    is pickled while the text itself is read right from the memory block.
+    """
+
+    def __init__(self, text):
+        data = text.encode('utf-8')
+        self.size = len(data)
+        memory = shared_memory.SharedMemory(create=True, size=self.size or 1)
+        memory.buf[:self.size] = data
+        self.name = memory.name
+        memory.close()
+
+    def read(self, unlink=False):
+        memory = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(memory.buf[:self.size]).decode('utf-8')
+        finally:
+            memory.close()
+            if unlink:
+                memory.unlink()
+
+    def unlink(self):
+        memory = shared_memory.SharedMemory(name=self.name)
+        memory.close()
+        memory.unlink()
+
+
+def _init_worker(typus_class):
+    global _typus
+    _typus = typus_class()
+
+
+def _process_chunk(chunk, threshold, args, kwargs):
+    results = []
+    try:
+        for text in chunk:
+            if isinstance(text, SharedText):
+                text = text.read()
+            processed = _typus(text, *args, **kwargs)
+            if threshold and len(processed) >= threshold:
+                processed = SharedText(processed)
+            results.append(processed)
+    except BaseException:
+        # The parent never gets results of a failed chunk to unlink them
+        for result in results:
+            if isinstance(result, SharedText):
+                result.unlink()
+        raise
+    return results
+
+
+class TypusPool(object):
+    """
+    Spreads texts over a pool of processes and yields results in the same
+    order as texts were given.
+
+    :param typus: :class:`typus.core.TypusCore` subclass or it's instance.
+        Every worker makes it's own instance, so the class must be importable,
+        i.e. can't be defined in a function or interactive session.
+    :param int workers: Number of processes, defaults to the number of CPUs.
+    :param int chunksize: Number of texts sent to a worker at once.
+    :param int threshold: Texts of that length and longer are passed through
+        :mod:`multiprocessing.shared_memory` instead of pickling.
+        Set ``0`` to disable. Not available before Python 3.8.
+
+    >>> from typus import EnTypus
+    >>> from typus.parallel import TypusPool
+    >>> with TypusPool(EnTypus, workers=2) as pool:
+    ...     list(pool.map(['"foo"', '(c)']))
+    ['“foo”', '©']
+    """
+
+    def __init__(self, typus, workers=None, chunksize=32, threshold=1 << 20):
+        typus_class = typus if isinstance(typus, type) else type(typus)
+        self.chunksize = chunksize
+        self.threshold = threshold if shared_memory else 0
+        if self.threshold:
+            # Workers must share the tracker with the parent, otherwise
+            # they unlink blocks the parent still owns on exit
+            resource_tracker.ensure_running()
+        self.workers = workers or cpu_count()
+        self.executor = ProcessPoolExecutor(
+            self.workers, initializer=_init_worker,
+            initargs=(typus_class, ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def map(self, texts, *args, **kwargs):
+        """
+        Typesets texts with the given arguments.
+        Keeps only a couple of chunks per worker in flight, so texts can be
+        a lazy iterable of any size.
+        """
+
+        # Phrases may come as a generator
+        if kwargs.get('escape_phrases'):
+            kwargs['escape_phrases'] = PhraseSet(kwargs['escape_phrases'])
+
+        texts = iter(texts)
+        pending = deque()
+        try:
+            while True:
+                while len(pending) < self.workers * 2:
+                    chunk = [self._pack(text) for text in
+                             islice(texts, self.chunksize)]
+                    if not chunk:
+                        break
+                    future = self.executor.submit(
+                        _process_chunk, chunk, self.threshold, args, kwargs)
+                    pending.append((future, chunk))
+
+                if not pending:
+                    return
+
+                for result in self._collect(*pending.popleft()):
+                    yield result
+        finally:
+            # Cleans up shared memory if iteration has been stopped
+            while pending:
+                future, chunk = pending.popleft()
+                future.cancel()
+                self._collect(future, chunk)
+
+    def _collect(self, future, chunk):
+        try:
+            results = [] if future.cancelled() else future.result()
+        finally:
+            for text in chunk:
+                if isinstance(text, SharedText):
+                    text.unlink()
+
+        # Reads all shared results at once, so none of them is left behind
+        # if iteration stops in the middle of the chunk
+        return [result.read(unlink=True) if isinstance(result, SharedText)
+                else result for result in results]
+
+    def _pack(self, text):
+        if self.threshold and len(text) >= self.threshold:
+            return SharedText(text)
+        return text
@@ -3,25 +3,67 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import re
 from builtins import *  # noqa
+from collections import deque
 from functools import update_wrapper, wraps
-from itertools import count, cycle
+from itertools import chain, count, cycle
+from threading import local
+from timeit import default_timer
 
-from .chars import DLQUO, LAQUO, LDQUO, LSQUO, RAQUO, RDQUO, RSQUO
-from .utils import re_compile
+from .chars import (DLQUO, KEY_END, LAQUO, LDQUO, LSQUO, RAQUO, RDQUO,
+                    RSQUO)
+from .rules import Rule, TextChars
+from .trace import apply_edits
+from .utils import PhraseSet, cached_property, re_compile
 
-__all__ = ('EscapePhrases', 'EscapeHtml', 'Quotes', 'Expressions')
+__all__ = ('EscapePhrases', 'EscapeHtml', 'Quotes', 'Expressions', 'Record')
 
 
 def tail_processor(text, *args, **kwargs):
     return text
 
 
+class TextChanged(Exception):
+    """
+    Raised by :class:`Expressions` once text is changed while Typus checks
+    if it needs typesetting at all.
+    """
+
+
+class Record(object):
+    """
+    What a processor or an expression has done to the text, when Typus is
+    profiled: its own wall time in seconds, the number of replacements,
+    the size of the text it has got and has passed further.
+    Expressions are named like ``expr_mdash[2]``, the third one of
+    ``expr_mdash``.
+    """
+
+    __slots__ = ('name', 'time', 'replaced', 'input_size', 'output_size')
+
+    def __init__(self, name, input_size):
+        self.name, self.input_size = name, input_size
+        self.output_size = input_size
+        self.time = 0.0
+        self.replaced = 0
+
+    def __repr__(self):
+        return ('Record(name={0!r}, time={1:.6f}, replaced={2}, '
+                'input_size={3}, output_size={4})').format(
+            str(self.name), self.time, self.replaced, self.input_size,
+            self.output_size)
+
+
 class BaseProcessor(object):
     """
     Processors are the core of Typus. See subclasses for examples.
     """
 
+    # Characters the processor needs in text to change anything.
+    # It's skipped for text with none of them, ``None`` runs it always
+    triggers = None
+
     def __init__(self, typus):
         # Makes possible to decorate processor
         update_wrapper(self, self.__class__, updated=())
@@ -29,11 +71,74 @@ class BaseProcessor(object):
         # Stores Typus to access it's configuration
         self.typus = typus
 
+        if typus.engine is not None:
+            # Class level patterns are compiled with the engine of Typus,
+            # Expressions compile their own ones once they run
+            for name, expr in BaseProcessor.patterns(self):
+                setattr(self, name, re_compile(expr.pattern, expr.flags,
+                                               lazy=True, engine=typus.engine))
+
     def __call__(self, typus):
         raise NotImplementedError
 
+    def patterns(self):
+        """
+        Yields names and compiled patterns the processor runs.
+        """
+
+        for name in dir(self):
+            if name.startswith('re_'):
+                yield name, getattr(self, name)
+
     def __radd__(self, other):
-        return self(other or tail_processor)
+        func = other or tail_processor
+        if self.typus.profile:
+            processor = self._profile(func)
+        else:
+            processor = self(func)
+        if self.triggers is None:
+            return processor
+
+        @wraps(processor, updated=())
+        def inner(text, *args, **kwargs):
+            stats = self.typus.stats
+            if any(x in text for x in self.triggers):
+                stats.run += 1
+                return processor(text, *args, **kwargs)
+            stats.skipped += 1
+            return func(text, *args, **kwargs)
+        return inner
+
+    def _profile(self, func):
+        # The time of the processors it passes text to is not its own
+        self.local = local()
+
+        def further(text, *args, **kwargs):
+            record = self.local.record
+            record.output_size = len(text)
+            start = default_timer()
+            try:
+                return func(text, *args, **kwargs)
+            finally:
+                record.time -= default_timer() - start
+        processor = self(further)
+
+        @wraps(processor, updated=())
+        def inner(text, *args, **kwargs):
+            record = self.local.record = Record(self.__class__.__name__,
+                                                len(text))
+            start = default_timer()
+            try:
+                return processor(text, *args, **kwargs)
+            finally:
+                record.time += default_timer() - start
+                self.typus.record(record)
+        return inner
+
+    def _replaced(self, count):
+        # Counts replacements, when Typus is profiled
+        if self.typus.profile:
+            self.local.record.replaced += count
 
 
 class EscapePhrases(BaseProcessor):
@@ -44,10 +149,21 @@ class EscapePhrases(BaseProcessor):
     'Typus turns `(c)` into “©”'
 
     Also there is a little helper :func:`typus.utils.splinter` which should
-    help you to split string into the phrases.
+    help you to split string into the phrases. Phrases are compiled on every
+    call, so compile a large set once with :class:`typus.utils.PhraseSet`.
     """
 
-    placeholder = '{{#phrase{0}#}}'
+    # Keys are made of private use code points: the sentinel, the index
+    # written in base 4096 and the terminator. They are short and never
+    # matched by expressions. The terminator keeps private use characters
+    # of the text, like icon fonts, out of the key which precedes them.
+    # Keys have no case, so they are matched case-sensitively, which
+    # compiles much faster for a range that large.
+    sentinel = '\ue000'
+    terminator = KEY_END
+    digits = 0xE100, 0x1000
+    keys_pattern = '{0}[\ue100-\uf0ff]+\ue0ff'
+    re_keys = re_compile(keys_pattern.format(sentinel), re.U, lazy=True)
 
     def __call__(self, func):
         @wraps(self, updated=())
@@ -55,69 +171,268 @@ class EscapePhrases(BaseProcessor):
             storage = []
             counter = count()
             escaped = self._save_values(text, storage, counter, **kwargs)
+            self._replaced(len(storage))
+            trace = self.typus.trace
+            if trace is not None and storage:
+                trace.apply(self._escape_edits(escaped, storage))
 
             # Runs typus
             processed = func(escaped, *args, **kwargs)
             if not storage:
                 return processed
 
+            if trace is not None:
+                trace.apply(self._restore_edits(processed, storage))
             restored = self._restore_values(processed, storage, **kwargs)
             return restored
         return inner
 
+    def _key(self, index, sentinel=None):
+        start, base = self.digits
+        key = [sentinel or self.sentinel]
+        while True:
+            index, digit = divmod(index, base)
+            key.append(chr(start + digit))
+            if not index:
+                key.append(self.terminator)
+                return ''.join(key)
+
     def _save_values(self, text, storage, counter, escape_phrases=(), **kwargs):
-        for phrase in escape_phrases:
-            if not phrase.strip():
-                continue
-            key = self.placeholder.format(next(counter))
-            text = text.replace(phrase, key)
-            storage.append((key, phrase))
-        return text
+        keys = {}
+
+        def replace(match):
+            phrase = match.group()
+            if phrase not in keys:
+                keys[phrase] = self._key(next(counter))
+                storage.append((keys[phrase], phrase))
+            return keys[phrase]
+
+        # Finds all phrases in one pass
+        return PhraseSet(escape_phrases).sub(replace, text)
 
     def _restore_values(self, text, storage, **kwargs):
         """
-        Puts data into the text in reversed order.
-        It's important to loop over and restore text step by step
-        because some 'stored' chunks may contain keys to other ones.
+        Puts data back into the text in one pass. Stored chunks may
+        contain keys to other ones, those are restored once when met.
         """
-        for key, value in reversed(storage):
-            text = text.replace(key, value)
-        return text
+        return self.re_keys.sub(self._restorer(storage), text)
+
+    def _restorer(self, storage):
+        values = dict(storage)
+        restored = {}
+
+        def replace(match):
+            key = match.group()
+            if key not in values:
+                # Looks like a key, but it's a part of the text itself
+                return key
+            if key not in restored:
+                restored[key] = self.re_keys.sub(replace, values[key])
+            return restored[key]
+        return replace
+
+    def _escape_edits(self, text, storage):
+        # Keys are where restored values were, see Trace
+        replace = self._restorer(storage)
+        edits = []
+        shift = 0
+        for match in self.re_keys.finditer(text):
+            value = replace(match)
+            if value != match.group():
+                start = match.start() + shift
+                edits.append((start, start + len(value), match.group(), None))
+                shift += len(value) - len(match.group())
+        return edits
+
+    def _restore_edits(self, text, storage):
+        replace = self._restorer(storage)
+        edits = []
+        for match in self.re_keys.finditer(text):
+            value = replace(match)
+            if value != match.group():
+                edits.append((match.start(), match.end(), value, None))
+        return edits
 
 
 class EscapeHtml(EscapePhrases):
     """
     Extracts html tags and puts them back after.
+    Skips the whole content of tags like ``<code>`` or ``<script>``,
+    nested ones too.
 
     >>> en_typus('Typus turns <code>(c)</code> into "(c)"')
     'Typus turns <code>(c)</code> into “©”'
 
-    .. caution::
-        Doesn't support nested ``<code>`` tags.
+    Opening and closing tags are paired from the innermost ones. A tag
+    which is never closed skips the rest of text, the way browsers show
+    it, unless it's within a closed block:
+
+    >>> en_typus('"a" <code>"b" <code>"c"</code> "d"')
+    '“a” <code>"b" <code>"c"</code> "d"'
     """
 
-    placeholder = '{{#html{0}#}}'
+    triggers = '<'
+    sentinel = '\ue001'
+    re_keys = re_compile(EscapePhrases.keys_pattern.format(sentinel), re.U,
+                         lazy=True)
     skiptags = 'head|iframe|pre|code|script|style|video|audio|canvas'
-    patterns = (
-        re_compile(r'(<)({0})(.*?>.*?</\2>)'.format(skiptags)),
-        # Doctype, xml, closing tag, any tag
-        re_compile(r'(<[\!\?/]?[a-z]+.*?>)'),
-        # Comments
-        re_compile(r'(<\!\-\-.*?\-\->)'),
-    )
+    # Markup is ascii, that makes case insensitive matching much faster.
+    # Python 2 patterns are ascii unless re.U is given
+    flags = re.I | re.S | getattr(re, 'ASCII', 0)
+    # Comment or doctype, xml, closing tag, any tag
+    re_tags = re_compile(r'<(?:!\-\-.*?\-\->|[\!\?/]?[a-z][^>]*>)', flags,
+                         lazy=True)
+    re_skiptags = re_compile(
+        r'<(?:(!\-\-.*?\-\->)|(/?)({0})\b)'.format(skiptags), flags,
+        lazy=True)
+    # The same for text past the last closed comment
+    re_skiptags_tail = re_compile(r'<()(/?)({0})\b'.format(skiptags), flags,
+                                  lazy=True)
+    # Keys of html escaped before processing: blocks of bytes, see
+    # escape_blocks(), and markup of :mod:`typus.dom`
+    blocks_sentinel = '\ue002'
+    re_blocks_keys = re_compile(
+        EscapePhrases.keys_pattern.format(blocks_sentinel), re.U, lazy=True)
+
+    @cached_property
+    def bytes_skiptags(self):
+        # Markup is ascii, so utf-8 is scanned the same way as text.
+        # Engines may not support bytes, those are matched with re
+        return tuple(re_compile(x.pattern.encode('ascii'), x.flags, lazy=True)
+                     for x in (self.__class__.re_skiptags,
+                               self.__class__.re_skiptags_tail))
 
     def _save_values(self, text, storage, counter, **kwargs):
-        for pattern in self.patterns:
-            text = pattern.sub(self._replace(storage, counter), text)
-        return text
-
-    def _replace(self, storage, counter):
-        def inner(match):
-            key = self.placeholder.format(next(counter))
-            html = ''.join(match.groups())
+        def store(html):
+            key = self._key(next(counter))
             storage.append((key, html))
             return key
-        return inner
+
+        # Skipped blocks go first, so their content is never scanned
+        # for tags
+        blocks = self._find_blocks(text)
+        if blocks:
+            chunks = []
+            position = 0
+            for start, end in blocks:
+                chunks.append(text[position:start])
+                chunks.append(store(text[start:end]))
+                position = end
+            chunks.append(text[position:])
+            text = ''.join(chunks)
+        return self._escape_tags(text, lambda match: store(match.group()))
+
+    def _escape_tags(self, text, replace):
+        # Nothing is closed after the last '-->' and '>', so there is no
+        # need to look for comments and tags in there. Otherwise every
+        # unclosed one is scanned to the end of text.
+        comments = text.rfind('-->') + 3 if '-->' in text else 0
+        tags = text.rfind('>') + 1
+        if not tags:
+            return text
+        return ''.join((
+            self.re_tags.sub(replace, text[:comments]),
+            self.re_tags.sub(replace, text[comments:tags]),
+            text[tags:],
+        ))
+
+    def escape_blocks(self, data):
+        """
+        Escapes skipped blocks of utf-8 bytes and decodes the rest of them.
+        Blocks are kept as memoryviews of the bytes, so they are never
+        copied or decoded. Returns the text and the blocks by keys.
+        """
+
+        view = memoryview(data)
+        storage = []
+        chunks = []
+        position = 0
+        for start, end in self._find_blocks(data):
+            key = self._key(len(storage), self.blocks_sentinel)
+            storage.append((key, view[start:end]))
+            chunks.append(view[position:start])
+            chunks.append(key.encode('utf-8'))
+            position = end
+        if not storage:
+            return data.decode('utf-8'), storage
+        chunks.append(view[position:])
+        return b''.join(chunks).decode('utf-8'), storage
+
+    def restore_blocks(self, text, storage):
+        """
+        Encodes the typeset text into utf-8 putting back blocks escaped
+        with :meth:`escape_blocks`.
+        """
+
+        values = dict(storage)
+        chunks = []
+        position = 0
+        for match in self.re_blocks_keys.finditer(text):
+            value = values.get(match.group())
+            if value is None:
+                # Looks like a key, but it's a part of the text itself
+                continue
+            chunks.append(text[position:match.start()].encode('utf-8'))
+            chunks.append(value)
+            position = match.end()
+        chunks.append(text[position:].encode('utf-8'))
+        return b''.join(chunks)
+
+    def _find_blocks(self, text):
+        """
+        Pairs opening and closing skipped tags, nested ones too.
+        Returns ordered (start, end) positions of the outermost blocks.
+        Finds them in utf-8 bytes too.
+        """
+
+        if isinstance(text, bytes):
+            comment, close = b'-->', b'>'
+            re_skiptags, re_skiptags_tail = self.bytes_skiptags
+        else:
+            comment, close = '-->', '>'
+            re_skiptags, re_skiptags_tail = (self.re_skiptags,
+                                             self.re_skiptags_tail)
+
+        comments = text.rfind(comment) + 3 if comment in text else 0
+        matches = chain(re_skiptags.finditer(text, 0, comments),
+                        re_skiptags_tail.finditer(text, comments))
+        opened = {}
+        blocks = []
+        position = 0
+        for match in matches:
+            comment, closing, name = match.groups()
+            if comment or match.start() < position:
+                continue
+
+            stack = opened.setdefault(name.lower(), [])
+            if not closing:
+                stack.append(match.start())
+                continue
+
+            end = text.find(close, match.end()) + 1
+            if not end:
+                break
+            position = end
+            if stack:
+                blocks.append((stack.pop(), end))
+
+        # Tags which are never closed have no end yet
+        blocks.extend((start, None) for stack in opened.values()
+                      for start in stack)
+
+        # Drops nested blocks and joins overlapping ones
+        merged = []
+        for start, end in sorted(blocks):
+            if merged and start < merged[-1][1]:
+                if end is not None:
+                    merged[-1][1] = max(merged[-1][1], end)
+            elif end is None:
+                # Not closed one skips the rest of text, like in browsers
+                merged.append([start, len(text)])
+                break
+            else:
+                merged.append([start, end])
+        return merged
 
 
 class Quotes(BaseProcessor):
@@ -125,6 +440,8 @@ class Quotes(BaseProcessor):
     Replaces regular quotes with typographic ones.
     Supports any level nesting, but doesn't work well with minutes ``1'``
     and inches ``1"`` within the quotes, that kind of cases are ignored.
+    Quotes are paired in a single pass, so it takes linear time whatever
+    the nesting is, unbalanced quotes too.
     Use it with :class:`typus.mixins.RuQuotes` or
     :class:`typus.mixins.EnQuotes` or provide Typus attributes
     ``loq, roq, leq, req`` with custom quotes.
@@ -133,6 +450,17 @@ class Quotes(BaseProcessor):
     'Say “what” again!'
     """
 
+    triggers = '"\'' + LSQUO + RSQUO + LDQUO + RDQUO + DLQUO + LAQUO + RAQUO
+
+    # Replaces all quotes with `'`
+    re_normalize = re_compile(r'[{0}]'.format(
+        ''.join((LSQUO, RSQUO, LDQUO, RDQUO, DLQUO, LAQUO, RAQUO))), lazy=True)
+
+    # Matches quote and tells if it can open: no words before it and
+    # no space after, and if it can close: no words after it
+    re_quotes = re_compile(r'(["\'])(?:(?<!\w.)(?=\S)())?(?:(?!\w)())?',
+                           lazy=True)
+
     def __init__(self, *args, **kwargs):
         super(Quotes, self).__init__(*args, **kwargs)
 
@@ -144,30 +472,9 @@ class Quotes(BaseProcessor):
         # See :meth:`_switch_nested` for more help.
         self.switch = (self.loq + self.req, self.leq + self.roq)
 
-        # Replaces all quotes with `'`
-        quotes = ''.join((LSQUO, RSQUO, LDQUO, RDQUO, DLQUO, LAQUO, RAQUO))
-        self.re_normalize = re_compile(r'[{0}]'.format(quotes))
-
-        # Matches nested quotes (with no quotes within)
-        # and replaces with odd level quotes
-        self.re_normal = re_compile(
-            # No words before
-            r'(?<!\w)'
-            # Starts with quote
-            r'(["\'])'
-            r'(?!\s)'
-            # Everything but quote inside
-            r'((?!\1).+?)'
-            r'(?!\s)'
-            # Ends with same quote from the beginning
-            r'\1'
-            # No words afterwards
-            r'(?!\w)'
-        )
-        self.re_normal_replace = r'{0}\2{1}'.format(self.loq, self.roq)
-
         # Matches with typo quotes
-        self.re_nested = re_compile(r'({0}|{1})'.format(self.loq, self.roq))
+        self.re_nested = re_compile(r'({0}|{1})'.format(self.loq, self.roq),
+                                    lazy=True, engine=self.typus.engine)
 
     def __call__(self, func):
         @wraps(self, updated=())
@@ -175,19 +482,28 @@ class Quotes(BaseProcessor):
             # Normalizes editor's quotes to double one
             normalized = self.re_normalize.sub('\'', text)
 
-            # Replaces normalized quotes with first level ones, starting
-            # from inner pairs, moves to sides
-            nested = 0
-            while True:
-                normalized, replaced = self.re_normal.subn(
-                    self.re_normal_replace, normalized)
-                if not replaced:
-                    break
-                nested += 1
+            # Text goes with every quote and what it can do:
+            # [text, quote, opens, closes, text, ...]
+            parts = self.re_quotes.split(normalized)
+            marks, nested = self._pair(parts)
+            self._replaced(len(marks))
+            if not marks:
+                if self.typus.trace is not None:
+                    self.typus.trace.apply(self._edits(text, parts, marks))
+                return func(normalized, *args, **kwargs)
+
+            # Replaces paired quotes with first level ones
+            parts[2::4] = parts[3::4] = [''] * (len(parts) // 4)
+            for number, left in marks.items():
+                parts[number * 4 + 1] = self.loq if left else self.roq
+            if self.typus.trace is not None:
+                self.typus.trace.apply(
+                    self._edits(text, parts, marks, nested))
+            normalized = ''.join(parts)
 
             # Saves some cpu :)
             # Most cases are about just one level quoting
-            if nested < 2:
+            if not nested:
                 return func(normalized, *args, **kwargs)
 
             # At this point all quotes are of odd type, have to fix it
@@ -195,6 +511,89 @@ class Quotes(BaseProcessor):
             return func(switched, *args, **kwargs)
         return inner
 
+    def _pair(self, parts):
+        """
+        Pairs quotes in one pass, ``"`` and ``'`` are paired separately.
+        Returns numbers of paired quotes mapped to ``True`` for left ones,
+        and whether some pairs are nested.
+        """
+
+        queues = {'"': deque(), "'": deque()}
+        marks = {}
+        nested = False
+        last = -1
+        for number, index in enumerate(range(1, len(parts), 4)):
+            left = self._pair_quote(
+                queues[parts[index]], number, parts[index + 1] is not None,
+                parts[index + 2] is not None, not parts[index - 1])
+            if left is not None:
+                marks[left] = True
+                marks[number] = False
+                # Some quote was closed within this pair
+                nested = nested or last > left
+                last = number
+        return marks, nested
+
+    @staticmethod
+    def _pair_quote(queue, index, opens, closes, adjacent=True):
+        """
+        Takes the next quote of the type and returns the index of the left
+        quote it closes, if any.
+
+        A quote closes the earliest open one, if there is something in
+        between, so unbalanced quotes are left the same way as if the
+        leftmost pair wins. Quotes which go in a row, like ``""foo""``,
+        are kept in a run and closed from the inner one: a quote followed
+        by the same one opens only if the latter does.
+
+        :param deque queue: Runs of open quotes of the type, which is
+            the whole pairing state.
+        :param int index: Position of the quote, or it's number along with
+            ``adjacent``.
+        :param bool opens: Whether the quote can open, see ``re_quotes``.
+        :param bool closes: Whether the quote can close.
+        :param bool adjacent: Whether the previous quote goes right before
+            this one, if it's ``index - 1``.
+        """
+
+        if closes and queue:
+            run = queue[0]
+            if not (adjacent and run[-1] == index - 1):
+                left = run.pop()
+                if not run:
+                    queue.popleft()
+                return left
+
+        # The last run waits for this quote to open or to be dropped
+        waits = adjacent and queue and queue[-1][-1] == index - 1
+        if opens:
+            if waits:
+                queue[-1].append(index)
+            else:
+                queue.append([index])
+        elif waits:
+            queue.pop()
+        return None
+
+    def _edits(self, text, parts, marks, nested=False):
+        """
+        Lists quotes which are replaced, see :class:`typus.trace.Trace`.
+        Nested ones are switched the same way :meth:`_switch_nested` does.
+        """
+
+        quotes = cycle(self.switch)
+        edits = []
+        position = 0
+        for number, index in enumerate(range(1, len(parts), 4)):
+            position += len(parts[index - 1])
+            quote = parts[index]
+            if nested and number in marks:
+                quote = next(quotes)[quote != self.loq]
+            if quote != text[position]:
+                edits.append((position, position + 1, quote, 'Quotes'))
+            position += 1
+        return edits
+
     def _switch_nested(self, text):
         """
         Switches nested quotes to another type.
@@ -218,8 +617,8 @@ class Quotes(BaseProcessor):
 class Expressions(BaseProcessor):
     r"""
     Provides regular expressions support. Looks for ``expressions`` list
-    attribute in Typus with expressions name, compiles and runs them on every
-    Typus call.
+    attribute in Typus with expressions name, compiles every one the first
+    time it runs and runs them on every Typus call.
 
     >>> from typus.core import TypusCore
     >>> from typus.processors import Expressions
@@ -235,7 +634,7 @@ class Expressions(BaseProcessor):
     ...     expressions = ('bold_price', )  # no prefix `expr_`!
     ...     processors = (Expressions, )
     ...
-    >>> my_typus = MyTypus()  # `expr_bold_price` is compiled and stored
+    >>> my_typus = MyTypus()
     >>> my_typus('Get now just for $1000!')
     'Get now just for <b>$1000</b>!'
 
@@ -244,24 +643,147 @@ class Expressions(BaseProcessor):
         compiled with :func:`typus.utils.re_compile` with a bunch of flags:
         unicode, case-insensitive, etc. If that doesn't suit for you pass your
         own flags as a third member of the tuple: ``(regex, replace, re.I)``.
-    """
 
-    def __init__(self, *args, **kwargs):
-        super(Expressions, self).__init__(*args, **kwargs)
+    Expressions which need characters the text doesn't have are skipped,
+    see :class:`typus.rules.Rule`.
+    """
 
-        # Compiles expressions
-        self.compiled_exprs = [
-            (re_compile(*group[::2]), group[1])
+    @cached_property
+    def compiled_exprs(self):
+        # Expressions are collected on the first call and every one is
+        # compiled once it runs, so Typus instances are cheap to create
+        return [
+            (re_compile(*group[::2], lazy=True, engine=self.typus.engine),
+             group[1])
             for name in self.typus.expressions
             for group in getattr(self.typus, 'expr_' + name)()
         ]
 
+    @cached_property
+    def rules(self):
+        # Tells which characters every expression needs to match
+        return [Rule.shared(*x) for x in self.compiled_exprs]
+
+    @cached_property
+    def named_rules(self):
+        names = [
+            'expr_{0}[{1}]'.format(name, index)
+            for name in self.typus.expressions
+            for index, _ in enumerate(getattr(self.typus, 'expr_' + name)())
+        ]
+        return list(zip(names, self.rules))
+
+    def patterns(self):
+        for name, rule in self.named_rules:
+            yield name, rule.expr
+
     def __call__(self, func):
         @wraps(self, updated=())
         def inner(text, *args, **kwargs):
-            # Applies expressions
-            for expr, repl in self.compiled_exprs:
-                text = expr.sub(repl, text)
-            text = func(text, *args, **kwargs)
-            return text
+            if self.typus.probing:
+                return func(self._probe(text), *args, **kwargs)
+            if self.typus.trace is not None:
+                return func(self._trace_rules(text), *args, **kwargs)
+            if self.typus.profile:
+                return func(self._profile_rules(text), *args, **kwargs)
+
+            text = self._apply(text, TextChars(text), self.rules)
+            return func(text, *args, **kwargs)
         return inner
+
+    def _apply(self, text, chars, rules):
+        """
+        Applies expressions, skips ones which can't match.
+        """
+
+        stats = self.typus.stats
+        for rule in rules:
+            if not chars.has(rule.requires):
+                stats.skipped += 1
+                continue
+            stats.run += 1
+            text, replaced = rule.expr.subn(rule.repl, text)
+            if replaced:
+                chars.add(rule.writes)
+        return text
+
+    def _profile_rules(self, text):
+        """
+        Applies expressions the same way and records every one that runs.
+        """
+
+        stats = self.typus.stats
+        chars = TextChars(text)
+        for name, rule in self.named_rules:
+            if not chars.has(rule.requires):
+                stats.skipped += 1
+                continue
+            stats.run += 1
+            record = Record(name, len(text))
+            start = default_timer()
+            text, record.replaced = rule.expr.subn(rule.repl, text)
+            record.time = default_timer() - start
+            record.output_size = len(text)
+            self._replaced(record.replaced)
+            self.typus.record(record)
+            if record.replaced:
+                chars.add(rule.writes)
+        return text
+
+    def _trace_rules(self, text):
+        """
+        Applies expressions one by one and reports what every one has
+        replaced to :class:`typus.trace.Trace`.
+        """
+
+        trace = self.typus.trace
+        stats = self.typus.stats
+        chars = TextChars(text)
+        for name, rule in self.named_rules:
+            if not chars.has(rule.requires):
+                stats.skipped += 1
+                continue
+            stats.run += 1
+            edits = []
+            matched = False
+            for match in rule.expr.finditer(text):
+                matched = True
+                replacement = (rule.repl(match) if callable(rule.repl)
+                               else match.expand(rule.repl))
+                # Some of them replace a match with the same text
+                if replacement != match.group():
+                    edits.append(
+                        (match.start(), match.end(), replacement, name))
+            if edits:
+                trace.apply(edits)
+                text = apply_edits(text, edits)
+            if matched:
+                chars.add(rule.writes)
+        return text
+
+    def _probe(self, text):
+        """
+        Looks for the first expression which changes the text, ones which
+        need characters the text doesn't have are skipped. Raises
+        :class:`TextChanged` then, or applies the rest of expressions if
+        Typus typesets text it assumes to be typeset already.
+        """
+
+        stats = self.typus.stats
+        chars = TextChars(text)
+        for index, rule in enumerate(self.rules):
+            if not chars.has(rule.requires):
+                stats.skipped += 1
+                continue
+            stats.run += 1
+            if not rule.expr.search(text):
+                continue
+            chars.add(rule.writes)
+            # Some of them replace a match with the same text
+            changed = rule.expr.sub(rule.repl, text)
+            if changed == text:
+                continue
+            if self.typus.probing != 'apply':
+                raise TextChanged
+            return self._apply(changed, chars, self.rules[index + 1:])
+        return text
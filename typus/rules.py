@@ -0,0 +1,238 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import re
+from builtins import *  # noqa
+from copy import copy
+
+from .utils import pattern_cache
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+__all__ = ('Rule', 'TextChars')
+
+# Longer ranges are not listed char by char
+MAX_RANGE = 256
+
+
+def _opname(op):
+    # Python 2 opcodes are lowercase strings
+    return str(op).upper()
+
+
+def _iscased(char):
+    return char.lower() != char.upper()
+
+
+def _fold(char):
+    # Characters matched by each other ignoring case have a key in common
+    return set((char.lower()[:1], char.upper()[:1], char.upper().lower()[:1]))
+
+
+class CharSet(object):
+    """
+    Characters a regex needs or a replacement may write, an upper bound
+    of them: literal characters, cased characters matched ignoring case,
+    categories and the ``any`` flag.
+    """
+
+    # The same as unicode \w, \d and \s
+    categories = {
+        'WORD': lambda x: x.isalnum() or x == '_',
+        'DIGIT': lambda x: x.isdecimal(),
+        'SPACE': lambda x: x.isspace(),
+        'NOT_WORD': lambda x: not (x.isalnum() or x == '_'),
+        'NOT_DIGIT': lambda x: not x.isdecimal(),
+        'NOT_SPACE': lambda x: not x.isspace(),
+    }
+
+    def __init__(self, chars=(), cats=(), any=False):
+        self.chars = set(chars)
+        self.folded = set()
+        self.cats = set(cats)
+        self.any = any
+
+    @property
+    def key(self):
+        return (frozenset(self.chars), frozenset(self.folded),
+                frozenset(self.cats), self.any)
+
+    def update(self, other):
+        self.chars |= other.chars
+        self.folded |= other.folded
+        self.cats |= other.cats
+        self.any |= other.any
+
+    def add(self, char, ignorecase=False):
+        if ignorecase and _iscased(char):
+            self.folded |= _fold(char)
+        else:
+            self.chars.add(char)
+
+
+class TextChars(object):
+    """
+    Characters of a text to tell with no regex run that a rule can't match
+    it, see :attr:`Rule.requires`. Characters written by replacements are
+    added, so it keeps being an upper bound of the text changed.
+
+    >>> import re
+    >>> from typus.rules import Rule, TextChars
+    >>> percent = Rule(re.compile(r'\d+ ?%'), '')
+    >>> TextChars('foo 42').has(percent.requires)
+    False
+    >>> TextChars('foo 42%').has(percent.requires)
+    True
+    """
+
+    def __init__(self, text):
+        self.chars = set(text)
+        self.any = False
+        # Looked up once needed
+        self.folded = None
+        self.cats = {}
+
+    def add(self, chars):
+        self.chars |= chars.chars
+        self.any |= chars.any
+        self.folded = None
+        self.cats.clear()
+
+    def has(self, requires):
+        return self.any or all(self._has(x) for x in requires)
+
+    def _has(self, chars):
+        if not self.chars.isdisjoint(chars.chars):
+            return True
+        if chars.folded:
+            if self.folded is None:
+                self.folded = set()
+                for char in self.chars:
+                    if _iscased(char):
+                        self.folded |= _fold(char)
+            if not self.folded.isdisjoint(chars.folded):
+                return True
+        return any(self._category(x) for x in chars.cats)
+
+    def _category(self, name):
+        if name not in self.cats:
+            test = CharSet.categories[name]
+            self.cats[name] = any(test(x) for x in self.chars)
+        return self.cats[name]
+
+
+class Rule(object):
+    """
+    Compiled expression with what it needs in text to match and what it
+    may write, so expressions which can't match text are skipped, see
+    :class:`typus.processors.Expressions`.
+
+    :param expr: Compiled pattern
+    :param repl: Replace string or function
+    """
+
+    def __init__(self, expr, repl):
+        self.expr, self.repl = expr, repl
+        self.ignorecase = bool(expr.flags & re.I)
+        self.writes = CharSet()
+        # Text must have a character of every set for the rule to match
+        self.requires = []
+        try:
+            parsed = sre_parse.parse(expr.pattern, expr.flags)
+            self.requires = self._requires(parsed)
+        except (ValueError, TypeError, re.error):
+            # Say, syntax of another engine, it runs always
+            pass
+
+        if callable(repl):
+            self.writes.any = True
+            return
+
+        # Group references copy characters from the match, and escapes
+        # are counted as they are: it's an upper bound
+        literal = re.sub(r'\\(?:g<\w+>|\d+)', '', repl)
+        for char in literal:
+            self.writes.add(char)
+        if '\\' in literal:
+            self.writes.chars.update('\a\b\f\n\r\t\v')
+        # Deleted text joins its neighbours
+        self.writes.any = not literal
+
+    @classmethod
+    def shared(cls, expr, repl):
+        """
+        Returns the rule analyzed once for all Typus instances, see
+        :data:`typus.utils.pattern_cache`. Every replace function is
+        the same for the analysis, so the rule gets its own one.
+        """
+
+        key = ('rule', expr.pattern, expr.flags,
+               None if callable(repl) else repl)
+        rule = pattern_cache.get(key)
+        if rule is None:
+            rule = cls(expr, repl)
+            pattern_cache.set(key, rule)
+        # Replace strings are the same as of the key
+        if rule.expr is not expr or callable(repl) and rule.repl is not repl:
+            rule = copy(rule)
+            rule.expr, rule.repl = expr, repl
+        return rule
+
+    def _requires(self, parsed):
+        requires = {}
+        for op, av in parsed:
+            name = _opname(op)
+            if name == 'LITERAL':
+                chars = CharSet()
+                chars.add(chr(av), self.ignorecase)
+                found = [chars]
+            elif name == 'IN':
+                found = [self._walk_in(av)]
+            elif name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+                found = self._requires(av[-1]) if av[0] else []
+            elif name in ('SUBPATTERN', 'ASSERT'):
+                found = self._requires(av[-1])
+            elif name == 'ATOMIC_GROUP':
+                found = self._requires(av)
+            elif name == 'BRANCH':
+                # The first set of any branch
+                branches = [self._requires(x) for x in av[1]]
+                found = []
+                if all(branches):
+                    found = [CharSet()]
+                    for branch in branches:
+                        found[0].update(branch[0])
+            else:
+                # Empty or almost any text matches the rest
+                found = []
+            for chars in found:
+                if not chars.any:
+                    requires.setdefault(chars.key, chars)
+        return list(requires.values())
+
+    def _walk_in(self, items):
+        chars = CharSet()
+        negate = False
+        for op, av in items:
+            name = _opname(op)
+            if name == 'NEGATE':
+                negate = True
+            elif name == 'LITERAL':
+                chars.add(chr(av), self.ignorecase)
+            elif name == 'RANGE' and av[1] - av[0] < MAX_RANGE:
+                for code in range(av[0], av[1] + 1):
+                    chars.add(chr(code), self.ignorecase)
+            elif name == 'CATEGORY':
+                chars.cats.add(_opname(av).replace('CATEGORY_', '')
+                                          .replace('UNI_', ''))
+            else:
+                chars.any = True
+
+        if negate:
+            # Everything but the listed ones: [^\W\d] is a word char
+            cats = set(x[4:] for x in chars.cats if x.startswith('NOT_'))
+            return CharSet(cats=cats) if cats else CharSet(any=True)
+        return chars
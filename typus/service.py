@@ -0,0 +1,583 @@
+# coding: utf-8
+"""
+HTTP service which typesets texts, runs with the standard library only:
+
+    $ python -m typus.service --port 8000 --workers 4
+    $ curl -d '{"text": "\\"foo\\" -- bar"}' localhost:8000/typeset
+    {"text": "“foo” — bar"}
+
+Endpoints:
+
+- ``POST /typeset`` takes a json object ``{"text": ..., "lang": "en",
+  "escape_phrases": [...], "debug": false}`` and returns ``{"text": ...}``.
+  A ``text/plain`` body is typeset as is and returned as text, see
+  :meth:`typus.core.TypusCore.process_bytes`, its chars are counted
+  in bytes.
+- ``POST /batch`` takes json lines of the same objects, or just strings,
+  and streams results as json lines in the same order. A line which
+  can't be typeset gets ``{"error": ...}``.
+- ``GET /stats`` returns counters of all workers, see :class:`Counters`.
+- ``GET /health`` returns ``ok``.
+
+``lang`` is ``en`` or ``ru``, it can be given in the query string for all
+texts of a request: ``/batch?lang=ru``.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from builtins import *  # noqa
+from multiprocessing import Lock, RawArray
+from timeit import default_timer
+from wsgiref.simple_server import (ServerHandler, WSGIRequestHandler,
+                                   WSGIServer)
+
+from . import en_typus, ru_typus
+
+try:
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs
+except ImportError:  # Python 2
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs
+
+__all__ = ('Service', 'Counters', 'HTTPError', 'Server', 'RequestHandler',
+           'make_server', 'serve_forever')
+
+# Typeset by workers before they are forked, see :meth:`Service.warm_up`
+SAMPLE = (
+    '<p>"I don\'t feel very much like Pooh today..." said Pooh. '
+    '"There there," said Piglet. - A.A. Milne (c) 1926, 3-5 pages, '
+    '10 mm, 1/2 x 2. Он сказал: "\'Винни-Пух\' -- моя любимая книга!" '
+    '1000 р. и т.д.</p>'
+)
+
+
+class HTTPError(Exception):
+    """
+    Makes :class:`Service` reply with the status and the message.
+    """
+
+    def __init__(self, status, message):
+        super(HTTPError, self).__init__(message)
+        self.status = status
+
+
+class Counters(object):
+    """
+    Request counters in shared memory, so worker processes forked off
+    the one which has made them count together. Latency is counted in
+    buckets of milliseconds: percentiles are the upper bounds of buckets
+    they fall into, ``None`` for the slowest one.
+
+    >>> from typus.service import Counters
+    >>> counters = Counters()
+    >>> counters.add(texts=2, chars=1000, seconds=0.003)
+    >>> stats = counters.snapshot()
+    >>> stats['texts'], stats['chars'], stats['latency']['p50']
+    (2, 1000, 5)
+    """
+
+    fields = ('requests', 'texts', 'chars', 'errors', 'seconds')
+    buckets = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        # The last bucket is for anything slower
+        self.values = RawArray('d', len(self.fields) + len(self.buckets) + 1)
+        self.lock = Lock()
+        self.started = time.time()
+
+    def add(self, texts=0, chars=0, seconds=0.0, error=False):
+        """
+        Counts a request.
+        """
+
+        bucket = len(self.buckets)
+        for index, bound in enumerate(self.buckets):
+            if seconds * 1000 <= bound:
+                bucket = index
+                break
+
+        values, offset = self.values, len(self.fields)
+        with self.lock:
+            values[0] += 1
+            values[1] += texts
+            values[2] += chars
+            values[3] += bool(error)
+            values[4] += seconds
+            values[offset + bucket] += 1
+
+    def snapshot(self):
+        """
+        Returns counters as a dict: totals, throughput over uptime and
+        over the time spent on requests, latency percentiles and
+        the histogram.
+        """
+
+        with self.lock:
+            values = list(self.values)
+
+        offset = len(self.fields)
+        totals = dict(zip(self.fields, values))
+        counts = [int(x) for x in values[offset:]]
+        requests = int(totals['requests'])
+        uptime = time.time() - self.started
+        seconds = totals['seconds']
+
+        percentiles = {}
+        for name, share in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+            bound, seen = None, 0
+            for index, count in enumerate(counts):
+                seen += count
+                if requests and seen >= requests * share:
+                    bound = (self.buckets[index]
+                             if index < len(self.buckets) else None)
+                    break
+            percentiles[name] = bound
+
+        histogram = dict(('<={0}'.format(x), y)
+                         for x, y in zip(self.buckets, counts))
+        histogram['>{0}'.format(self.buckets[-1])] = counts[-1]
+        percentiles.update(
+            mean=seconds * 1000 / requests if requests else None,
+            histogram=histogram)
+
+        return {
+            'requests': requests,
+            'texts': int(totals['texts']),
+            'chars': int(totals['chars']),
+            'errors': int(totals['errors']),
+            'uptime': uptime,
+            'requests_per_second': requests / uptime,
+            'chars_per_second': totals['chars'] / uptime,
+            # How fast texts are typeset while there is work to do
+            'busy_chars_per_second': (
+                totals['chars'] / seconds if seconds else None),
+            'latency': percentiles,
+        }
+
+
+class Service(object):
+    """
+    WSGI application, see the endpoints above. Works with any WSGI server,
+    :func:`make_server` and :func:`serve_forever` make a stdlib one.
+
+    :param dict typuses: Typus instances by ``lang``, ``en_typus`` and
+        ``ru_typus`` by default. Instances are shared by all requests.
+    :param int max_size: Longest text or request body in bytes.
+    :param counters: :class:`Counters` to count requests with.
+    """
+
+    routes = {
+        '/typeset': ('POST', 'typeset'),
+        '/batch': ('POST', 'batch'),
+        '/stats': ('GET', 'stats'),
+        '/health': ('GET', 'health'),
+    }
+    options = ('escape_phrases', 'debug')
+
+    def __init__(self, typuses=None, max_size=1 << 24, counters=None):
+        self.typuses = typuses or {'en': en_typus, 'ru': ru_typus}
+        self.max_size = max_size
+        self.counters = counters or Counters()
+
+    def __call__(self, environ, start_response):
+        try:
+            method, name = self.routes.get(
+                environ.get('PATH_INFO') or '/', (None, None))
+            if name is None:
+                raise HTTPError('404 Not Found', 'no such endpoint')
+            if environ['REQUEST_METHOD'] != method:
+                raise HTTPError('405 Method Not Allowed',
+                                'use {0}'.format(method))
+            status, content_type, body = getattr(self, name)(environ)
+        except HTTPError as e:
+            self.counters.add(error=True)
+            status, content_type = e.status, 'application/json'
+            body = [self.dumps({'error': str(e)})]
+        except Exception:
+            # The server replies and logs it
+            self.counters.add(error=True)
+            raise
+
+        headers = [('Content-Type', content_type)]
+        if isinstance(body, list):
+            headers.append(
+                ('Content-Length', str(sum(len(x) for x in body))))
+        start_response(str(status), [(str(x), str(y)) for x, y in headers])
+        return body
+
+    def warm_up(self):
+        """
+        Compiles lazy patterns of every Typus, so workers forked off
+        afterwards share them.
+        """
+
+        for typus in self.typuses.values():
+            typus(SAMPLE)
+
+    def health(self, environ):
+        return '200 OK', 'text/plain; charset=utf-8', [b'ok\n']
+
+    def stats(self, environ):
+        return ('200 OK', 'application/json',
+                [self.dumps(self.counters.snapshot())])
+
+    def typeset(self, environ):
+        start = default_timer()
+        length = self._content_length(environ)
+        if length > self.max_size:
+            raise HTTPError('413 Request Entity Too Large',
+                            'longer than {0} bytes'.format(self.max_size))
+        body = environ['wsgi.input'].read(length)
+        query = self._query(environ)
+
+        if environ.get('CONTENT_TYPE', '').startswith('text/plain'):
+            try:
+                reply = [self._typus(query.get('lang')).process_bytes(body)]
+            except UnicodeDecodeError:
+                raise HTTPError('400 Bad Request', 'body is not utf-8')
+            size = len(body)
+            content_type = 'text/plain; charset=utf-8'
+        else:
+            typus, text, kwargs = self._request(body, query)
+            result = typus(text, **kwargs)
+            reply = [self.dumps({'text': result})]
+            size = len(text)
+            content_type = 'application/json'
+
+        self.counters.add(1, size, default_timer() - start)
+        return '200 OK', content_type, reply
+
+    def batch(self, environ):
+        # Content-Length is checked before the response is started
+        lines = self._lines(environ['wsgi.input'],
+                            self._content_length(environ))
+        return ('200 OK', 'application/x-ndjson',
+                self._batch(lines, self._query(environ)))
+
+    def dumps(self, data):
+        return json.dumps(data, ensure_ascii=False).encode('utf-8') + b'\n'
+
+    def _batch(self, lines, query):
+        start = default_timer()
+        texts = chars = 0
+        try:
+            for line in lines:
+                if line is not None and not line.strip():
+                    continue
+                try:
+                    if line is None:
+                        raise HTTPError('413 Request Entity Too Large',
+                                        'longer than {0} bytes'.format(
+                                            self.max_size))
+                    typus, text, kwargs = self._request(line, query)
+                    result = {'text': typus(text, **kwargs)}
+                    texts += 1
+                    chars += len(text)
+                except HTTPError as e:
+                    result = {'error': str(e)}
+                yield self.dumps(result)
+        finally:
+            self.counters.add(texts, chars, default_timer() - start)
+
+    def _lines(self, stream, length):
+        # Yields None for lines which are too long
+        limit = self.max_size + 1
+        while length > 0:
+            line = stream.readline(min(length, limit))
+            if not line:
+                break
+            length -= len(line)
+            if len(line) < limit:
+                yield line
+                continue
+
+            # Skips the rest of it
+            while length > 0 and not line.endswith(b'\n'):
+                line = stream.readline(min(length, 1 << 16))
+                if not line:
+                    break
+                length -= len(line)
+            yield None
+
+    def _request(self, body, query):
+        try:
+            data = json.loads(self._decode(body))
+        except ValueError as e:
+            raise HTTPError('400 Bad Request', 'invalid json: {0}'.format(e))
+
+        if not isinstance(data, dict):
+            data = {'text': data}
+        text = data.pop('text', None)
+        if not isinstance(text, str):
+            raise HTTPError('400 Bad Request', '"text" must be a string')
+
+        typus = self._typus(data.pop('lang', query.get('lang')))
+        unknown = set(data) - set(self.options)
+        if unknown:
+            raise HTTPError('400 Bad Request', 'unknown options: {0}'.format(
+                ', '.join(sorted(unknown))))
+        phrases = data.get('escape_phrases')
+        if phrases is not None and (
+                not isinstance(phrases, list) or
+                not all(isinstance(x, str) for x in phrases)):
+            raise HTTPError('400 Bad Request',
+                            '"escape_phrases" must be a list of strings')
+        if not isinstance(data.get('debug', False), bool):
+            raise HTTPError('400 Bad Request', '"debug" must be a boolean')
+        return typus, text, data
+
+    def _typus(self, lang):
+        typus = self.typuses.get(lang or 'en')
+        if typus is None:
+            raise HTTPError('400 Bad Request', 'unknown lang: {0}'.format(
+                lang))
+        return typus
+
+    def _query(self, environ):
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+        return dict((x, y[-1]) for x, y in query.items())
+
+    def _content_length(self, environ):
+        try:
+            return int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            raise HTTPError('400 Bad Request', 'invalid Content-Length')
+
+    def _decode(self, body):
+        try:
+            return body.decode('utf-8')
+        except UnicodeDecodeError:
+            raise HTTPError('400 Bad Request', 'body is not utf-8')
+
+
+class _Input(object):
+    """
+    Request body, which is read up to its Content-Length only, so the next
+    request of the connection is left in the socket.
+    """
+
+    def __init__(self, stream, length):
+        self.stream, self.remaining = stream, length
+
+    def read(self, size=-1):
+        return self._read(self.stream.read, size)
+
+    def readline(self, size=-1):
+        return self._read(self.stream.readline, size)
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+    def _read(self, read, size):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+
+class _ServerHandler(ServerHandler):
+    http_version = '1.1'
+
+    def cleanup_headers(self):
+        ServerHandler.cleanup_headers(self)
+        # Streamed responses have no length, so the connection tells
+        # where they end
+        self.request_handler.keep_alive = 'Content-Length' in self.headers
+
+
+class RequestHandler(WSGIRequestHandler):
+    """
+    HTTP/1.1 handler which keeps connections alive between requests.
+    Requests are logged with ``--verbose`` only.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Seconds an idle connection is kept for
+    timeout = 30
+    # Headers and body are written apart, which is slow with Nagle's
+    # algorithm and delayed ACK of keep-alive connections
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            self.handle_one_request()
+
+    def handle_one_request(self):
+        self.close_connection = True
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+        except (socket.timeout, socket.error):
+            return
+        if not self.raw_requestline:
+            return
+        if len(self.raw_requestline) > 65536:
+            self.send_error(414)
+            return
+        if not self.parse_request():
+            return
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            self.send_error(411)
+            return
+
+        try:
+            length = max(int(self.headers.get('Content-Length') or 0), 0)
+        except ValueError:
+            self.send_error(400, 'Invalid Content-Length')
+            return
+
+        keep_alive = not self.close_connection
+        self.keep_alive = False
+        body = _Input(self.rfile, length)
+        handler = _ServerHandler(body, self.wfile, self.get_stderr(),
+                                 self.get_environ(), multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+        self.wfile.flush()
+        self.close_connection = not (
+            keep_alive and self.keep_alive and not body.remaining)
+
+    def get_environ(self):
+        environ = WSGIRequestHandler.get_environ(self)
+        # It's text/plain otherwise, which is typeset as is
+        if 'Content-Type' not in self.headers:
+            environ.pop('CONTENT_TYPE', None)
+        return environ
+
+    def log_request(self, *args, **kwargs):
+        if self.server.verbose:
+            WSGIRequestHandler.log_request(self, *args, **kwargs)
+
+
+class Server(ThreadingMixIn, WSGIServer):
+    """
+    WSGI server which handles every connection in a thread.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+    verbose = False
+
+
+def make_server(host='127.0.0.1', port=8000, app=None, verbose=False):
+    """
+    Makes :class:`Server` listening on the address, ``port=0`` picks
+    a free one, see ``server.server_address``. The app is
+    :class:`Service` by default.
+    """
+
+    server = Server((host, port), RequestHandler)
+    server.verbose = verbose
+    server.set_app(app or Service())
+    return server
+
+
+def serve_forever(server, workers=1):
+    """
+    Serves requests until interrupted or terminated. More than one worker
+    are processes forked off this one after Typus is warmed up, so they
+    share its compiled patterns, :class:`Counters` and the socket.
+    Workers which die are replaced. Unix only.
+    """
+
+    app = server.get_app()
+    if hasattr(app, 'warm_up'):
+        app.warm_up()
+
+    if workers <= 1:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    # Workers which have lost the race for a connection go on
+    server.socket.setblocking(False)
+    children = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid:
+            children.add(pid)
+            return
+
+        code = 0
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    # Workers inherit it and stop the same way
+    previous = signal.signal(signal.SIGTERM, terminate)
+    try:
+        for _ in range(workers):
+            spawn()
+        while True:
+            pid, status = os.wait()
+            children.discard(pid)
+            # Doesn't spin if workers can't start at all
+            time.sleep(0.1)
+            spawn()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        server.server_close()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Typus HTTP service, see typus.service module.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='0 picks a free one')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes')
+    parser.add_argument('--max-size', type=int, default=1 << 24,
+                        help='longest text or request in bytes')
+    parser.add_argument('--verbose', action='store_true',
+                        help='logs every request')
+    options = parser.parse_args(args)
+
+    server = make_server(options.host, options.port,
+                         Service(max_size=options.max_size),
+                         verbose=options.verbose)
+    print('Serving on http://{0}:{1}/'.format(*server.server_address[:2]))
+    sys.stdout.flush()
+    serve_forever(server, options.workers)
+
+
+if __name__ == '__main__':
+    main()
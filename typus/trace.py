@@ -0,0 +1,276 @@
+# coding: utf-8
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from array import array
+from bisect import bisect_right
+from builtins import *  # noqa
+from collections import namedtuple
+from os.path import commonprefix
+
+__all__ = ('Edit', 'EditList', 'OffsetMap', 'Trace', 'apply_edits')
+
+
+class Edit(namedtuple('Edit', 'start end replacement rule')):
+    """
+    Replacement of ``text[start:end]`` of the original text. ``rule`` is
+    the name of the expression, like ``expr_mdash[2]``, or the processor
+    which has made it, names are joined with ``+`` if several of them have
+    changed the same place. ``strip`` and ``debug`` are made by Typus
+    itself.
+    """
+
+    __slots__ = ()
+
+
+class EditList(list):
+    """
+    Sorted non-overlapping :class:`Edit` list, which turns the original
+    text into the typeset ``text``.
+    """
+
+    def __init__(self, edits=(), text=''):
+        super(EditList, self).__init__(edits)
+        self.text = text
+
+    @property
+    def changed(self):
+        """
+        Whether typesetting changes the text at all.
+        """
+
+        return bool(self)
+
+    def offsets(self):
+        """
+        Returns :class:`OffsetMap` of the original text to the typeset one.
+        """
+
+        return OffsetMap(self, self.text)
+
+
+class OffsetMap(object):
+    """
+    Maps positions of the original text to the typeset one and back.
+    Text between edits is the same in both, so only edited runs are kept:
+    their bounds in the original and the typeset text, in arrays. Lookups
+    are binary searches in them.
+
+    A position inside a replaced run maps to the start of its
+    replacement, inserted text maps to the position it's inserted at.
+
+    >>> from typus import en_typus
+    >>> offsets = en_typus.edits('"foo"... bar').offsets()
+    >>> offsets.text
+    '“foo”… bar'
+    >>> offsets.to_output(9), offsets.to_original(7)
+    (7, 9)
+    >>> offsets.to_output(6)  # The second dot of "..."
+    5
+    """
+
+    def __init__(self, edits, text):
+        self.text = text
+        self.original_starts = array('l')
+        self.original_ends = array('l')
+        self.output_starts = array('l')
+        self.output_ends = array('l')
+
+        shift = 0
+        for start, end, replacement, _ in edits:
+            self.original_starts.append(start)
+            self.original_ends.append(end)
+            self.output_starts.append(start + shift)
+            shift += len(replacement) - end + start
+            self.output_ends.append(end + shift)
+
+    def __len__(self):
+        return len(self.original_starts)
+
+    def to_output(self, position):
+        """
+        Returns position in the typeset text of the original one.
+        """
+
+        return self._lookup(position, self.original_starts,
+                            self.original_ends, self.output_starts,
+                            self.output_ends)
+
+    def to_original(self, position):
+        """
+        Returns position in the original text of the typeset one.
+        """
+
+        return self._lookup(position, self.output_starts, self.output_ends,
+                            self.original_starts, self.original_ends)
+
+    @staticmethod
+    def _lookup(position, starts, ends, other_starts, other_ends):
+        # The last run which starts at or before the position
+        index = bisect_right(starts, position) - 1
+        if index < 0:
+            return position
+        if position < ends[index]:
+            return other_starts[index]
+        return other_ends[index] + position - ends[index]
+
+
+def apply_edits(text, edits):
+    """
+    Applies sorted non-overlapping edits to the text.
+
+    >>> from typus.trace import apply_edits
+    >>> apply_edits('foo bar', [(0, 1, 'F', None), (3, 4, '_', None)])
+    'Foo_bar'
+    """
+
+    chunks = []
+    position = 0
+    for edit in edits:
+        chunks.append(text[position:edit[0]])
+        chunks.append(edit[2])
+        position = edit[1]
+    chunks.append(text[position:])
+    return ''.join(chunks)
+
+
+class Trace(object):
+    """
+    Follows the text through the processors, which report what they
+    replace with :meth:`apply`. So the result is known as edits of
+    the original text without comparing them.
+
+    The current text is kept as segments, which cover the original text
+    in order: ``(length, start, end, literal, rules)``. A segment is
+    either copied from ``original[start:end]``, ``literal`` is ``None``
+    then, or replaced with the literal by the rules.
+
+    >>> from typus.trace import Trace
+    >>> trace = Trace('"foo"...')
+    >>> trace.apply([(0, 1, '“', 'Quotes'), (4, 5, '”', 'Quotes')])
+    >>> trace.apply([(5, 8, '…', 'expr_complex_symbols[0]')])
+    >>> trace.edit_list('“foo”…')  # doctest: +NORMALIZE_WHITESPACE
+    [Edit(start=0, end=1, replacement='“', rule='Quotes'),
+     Edit(start=4, end=5, replacement='”', rule='Quotes'),
+     Edit(start=5, end=8, replacement='…', rule='expr_complex_symbols[0]')]
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.segments = [(len(text), 0, len(text), None, ())] if text else []
+
+    def apply(self, edits):
+        """
+        Applies sorted non-overlapping edits of the current text:
+        ``(start, end, replacement, rule)``. Rule is ``None`` for escaping
+        and restoring of phrases and html, which change nothing at last.
+        """
+
+        if not edits:
+            return
+
+        segments = list(self.segments)
+        count = len(segments)
+        result = []
+        index = position = 0
+        for start, end, replacement, rule in edits:
+            # Keeps segments before the edit
+            while index < count and position + segments[index][0] <= start:
+                result.append(segments[index])
+                position += segments[index][0]
+                index += 1
+
+            before, rules = '', ()
+            origin = None
+            if index < count and position < start:
+                length, first, last, literal, more = segments[index]
+                cut = start - position
+                if literal is None:
+                    # Splits the copied segment
+                    result.append((cut, first, first + cut, None, ()))
+                    segments[index] = (length - cut, first + cut, last, None,
+                                       ())
+                else:
+                    # The edit takes the original text of the literal,
+                    # the rest of it covers nothing
+                    before = literal[:cut]
+                    origin, origin_end, rules = first, last, more
+                    segments[index] = (length - cut, last, last,
+                                       literal[cut:], more)
+                position = start
+            if origin is None:
+                origin = segments[index][1] if index < count \
+                    else len(self.text)
+                origin_end = origin
+
+            while index < count and position < end:
+                length, first, last, literal, more = segments[index]
+                if position + length <= end:
+                    rules = _merge(rules, more)
+                    origin_end = last
+                    position += length
+                    index += 1
+                    continue
+
+                cut = end - position
+                if literal is None:
+                    origin_end = first + cut
+                    segments[index] = (length - cut, first + cut, last, None,
+                                       ())
+                else:
+                    rules = _merge(rules, more)
+                    origin_end = last
+                    segments[index] = (length - cut, last, last,
+                                       literal[cut:], more)
+                position = end
+                break
+
+            literal = before + replacement
+            if rule is not None:
+                rules = _merge(rules, (rule, ))
+            result.append((len(literal), origin, origin_end, literal, rules))
+
+        result.extend(segments[index:])
+        self.segments = result
+
+    def edit_list(self, text):
+        """
+        Returns :class:`EditList` which turns the original text into
+        the given typeset one. Parts which are the same in both are
+        trimmed off edits.
+        """
+
+        # Literals which cover nothing of the original text are joined
+        # with the preceding ones, so split replacements, like restored
+        # html, are compared as a whole
+        joined = []
+        for _, start, end, literal, rules in self.segments:
+            if literal is None:
+                continue
+            if start == end and joined and joined[-1][1] == start:
+                first, _, before, more = joined[-1]
+                joined[-1] = (first, end, before + literal,
+                              _merge(more, rules))
+            else:
+                joined.append((start, end, literal, rules))
+
+        edits = EditList(text=text)
+        for start, end, literal, rules in joined:
+            original = self.text[start:end]
+            if literal == original:
+                continue
+            prefix = len(commonprefix((original, literal)))
+            suffix = len(commonprefix((original[prefix:][::-1],
+                                       literal[prefix:][::-1])))
+            edits.append(Edit(start + prefix, end - suffix,
+                              literal[prefix:len(literal) - suffix],
+                              '+'.join(rules) or None))
+        return edits
+
+
+def _merge(rules, more):
+    for rule in more:
+        if rule not in rules:
+            rules += (rule, )
+    return rules
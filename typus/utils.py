@@ -2,19 +2,31 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import re
+import sys
 from builtins import *  # noqa
-from functools import wraps
+from collections import OrderedDict, namedtuple
+from functools import update_wrapper, wraps
+from threading import Lock
 
-__all__ = ('re_compile', 'idict', 'map_choices', 'splinter')
+__all__ = ('re_compile', 'idict', 'map_choices', 'splinter', 'PhraseSet',
+           'LRUCache', 'cached_property', 'pattern_cache')
 
 
-def re_compile(pattern, flags=re.I | re.U | re.M | re.S):
+def re_compile(pattern, flags=re.I | re.U | re.M | re.S, lazy=False,
+               engine=None):
     """
     A shortcut to compile regex with predefined flags:
     :const:`re.I`, :const:`re.U`, :const:`re.M`, :const:`re.S`.
 
     :param str pattern: A string to compile pattern from.
     :param int flags: Python :mod:`re` module flags.
+    :param bool lazy: Compiles the pattern on the first use,
+        so module and class level ones cost nothing to import.
+    :param engine: :class:`typus.engines.Engine` to compile the pattern
+        with, :mod:`re` by default.
+
+    Patterns are shared by all Typus instances via :data:`pattern_cache`,
+    the lazy ones too.
 
     >>> foo = re_compile('[a-z]')  # matches with 'test' and 'TEST'
     >>> bool(foo.match('TEST'))
@@ -24,7 +36,36 @@ def re_compile(pattern, flags=re.I | re.U | re.M | re.S):
     False
     """
 
-    return re.compile(pattern, flags)
+    key = 'lazy' if lazy else 'pattern', pattern, flags
+    if engine is not None:
+        key += engine.name,
+    compiled = pattern_cache.get(key)
+    if compiled is None:
+        if lazy:
+            compiled = LazyPattern(pattern, flags, engine)
+        elif engine is not None:
+            compiled = engine.compile(pattern, flags)
+        else:
+            compiled = re.compile(pattern, flags)
+        pattern_cache.set(key, compiled)
+    return compiled
+
+
+class LazyPattern(object):
+    """
+    Compiles the pattern once any of its attributes is looked up and
+    stores them, so there is no overhead after that.
+    """
+
+    def __init__(self, pattern, flags, engine=None):
+        self.pattern, self.flags = pattern, flags
+        self.engine = engine
+
+    def __getattr__(self, name):
+        value = getattr(
+            re_compile(self.pattern, self.flags, engine=self.engine), name)
+        setattr(self, name, value)
+        return value
 
 
 class idict(dict):
@@ -76,13 +117,29 @@ def map_choices(data, group=r'({0})', dict_class=idict):
     """
 
     options = dict_class(data)
+    # Typus instances with the same choices share the replace function,
+    # so expressions made of them are analyzed once, see
+    # :class:`typus.rules.Rule`
+    cache_key = 'choices', tuple(options.items()), group, dict_class
+    try:
+        cached = pattern_cache.get(cache_key)
+    except TypeError:
+        # Unhashable values
+        cache_key = cached = None
+    if cached is not None:
+        return cached
+
     choices = '|'.join(re.escape(x) for x in options)
     pattern = group.format(choices)
 
     def replace(match):
         key = match.group()
         return str(options[key])
-    return pattern, replace
+
+    result = pattern, replace
+    if cache_key:
+        pattern_cache.set(cache_key, result)
+    return result
 
 
 def splinter(delimiter):
@@ -115,3 +172,243 @@ def splinter(delimiter):
         return [x.replace('\\' + delim, delim).strip()
                 for x in pattern.split(phrases)]
     return inner
+
+
+class PhraseSet(object):
+    """
+    :class:`typus.processors.EscapePhrases` helper.
+    Compiles phrases once into a single pattern which finds all of them
+    in one pass. Pass it as ``escape_phrases`` instead of a list, so
+    a large set of phrases is not compiled on every call.
+
+    Phrases are matched case-sensitively, the leftmost and then the longest
+    one wins. Phrases are put into a prefix tree first, so the pattern is
+    a deterministic automaton which costs almost the same for five
+    phrases and for five thousands.
+
+    :param iterable phrases: Phrases to escape, e.g. made with
+        :func:`splinter`. Empty and whitespace-only ones are skipped.
+
+    A prefix tree which nests deeper than ``max_depth`` groups, like
+    hundreds of phrases which are prefixes of each other, is too deep
+    for :mod:`re` to compile, such phrases are joined longest first
+    instead.
+
+    >>> phrases = PhraseSet(['foo', 'foo bar', 'bar', '(c)'])
+    >>> phrases.sub(lambda match: '[{0}]'.format(match.group()),
+    ...             'foo bar, bar foo')
+    '[foo bar], [bar] [foo]'
+    >>> en_typus('"foo bar" (c) (r)', escape_phrases=phrases)
+    '“foo bar” (c)®'
+    """
+
+    max_depth = 100
+
+    def __init__(self, phrases=()):
+        if isinstance(phrases, PhraseSet):
+            self.phrases, self.pattern = phrases.phrases, phrases.pattern
+            return
+
+        self.phrases = frozenset(x for x in phrases if x.strip())
+        self.pattern = None
+        if self.phrases:
+            pattern, depth = self._build(self._trie())
+            if depth > self.max_depth:
+                pattern = '|'.join(re.escape(x) for x in sorted(
+                    self.phrases, key=len, reverse=True))
+            # Case-sensitive like str.replace is
+            self.pattern = re.compile(pattern, re.U)
+
+    def __iter__(self):
+        return iter(self.phrases)
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def __eq__(self, other):
+        return isinstance(other, PhraseSet) and self.phrases == other.phrases
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.phrases)
+
+    def sub(self, repl, text):
+        """
+        Replaces phrases in the text, works like :meth:`re.Pattern.sub`.
+        """
+
+        return self.pattern.sub(repl, text) if self.pattern else text
+
+    def _trie(self):
+        trie = {}
+        for phrase in self.phrases:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            # Marks the end of a phrase
+            node[''] = {}
+        return trie
+
+    def _branches(self, node):
+        branches = []
+        for char in sorted(node):
+            if not char:
+                continue
+            chars, child = [char], node[char]
+            # Joins chains of single chars into one literal
+            while len(child) == 1 and '' not in child:
+                char, child = next(iter(child.items()))
+                chars.append(char)
+            branches.append((re.escape(''.join(chars)), child))
+        return branches
+
+    def _build(self, trie):
+        # Returns the pattern and how deep its groups nest. Children are
+        # built before their parents with a stack rather than recursion,
+        # which would overflow on long chains of phrases
+        built = {}
+        stack = [(trie, None)]
+        while stack:
+            node, branches = stack.pop()
+            if branches is None:
+                branches = self._branches(node)
+                stack.append((node, branches))
+                # Ends of phrases are built right away
+                stack.extend((child, None) for _, child in branches
+                             if len(child) > 1)
+                continue
+
+            patterns, depth = [], 0
+            for literal, child in branches:
+                if len(child) > 1:
+                    pattern, child_depth = built.pop(id(child))
+                    literal += pattern
+                    if child_depth > depth:
+                        depth = child_depth
+                patterns.append(literal)
+
+            pattern = '|'.join(patterns)
+            if '' in node:
+                # Greedy, so the longest phrase is tried first
+                pattern, depth = '(?:{0})?'.format(pattern), depth + 1
+            elif len(patterns) > 1:
+                pattern, depth = '(?:{0})'.format(pattern), depth + 1
+            built[id(node)] = pattern, depth
+        return built[id(trie)]
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses evictions size bytes')
+
+
+class LRUCache(object):
+    """
+    Thread-safe cache which drops least recently used items to fit
+    the limits. Pass it to :class:`typus.core.TypusCore` to cache results.
+
+    :param int maxsize: Maximum number of items, ``None`` for no limit.
+    :param int maxbytes: Maximum size of items in bytes,
+        ``None`` for no limit.
+
+    >>> cache = LRUCache(maxsize=2)
+    >>> cache.set('a', 1); cache.set('b', 2); cache.get('a')
+    1
+    >>> cache.set('c', 3)  # drops 'b', since 'a' was used recently
+    >>> cache.get('b') is None, cache.info().evictions
+    (True, 1)
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.lock = Lock()
+        self.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value, size = self.data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            # Moves to the end as the most recently used
+            self.data[key] = value, size
+            self.hits += 1
+            return value
+
+    def set(self, key, value, size=None):
+        """
+        Puts value into the cache. Size defaults to the size of
+        the key and the value objects in bytes.
+        """
+
+        if size is None:
+            size = sys.getsizeof(key) + sys.getsizeof(value)
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+
+        with self.lock:
+            if key in self.data:
+                self.bytes -= self.data.pop(key)[1]
+            self.data[key] = value, size
+            self.bytes += size
+            while (self.maxsize is not None and
+                   len(self.data) > self.maxsize or
+                   self.maxbytes is not None and self.bytes > self.maxbytes):
+                self.bytes -= self.data.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.data = OrderedDict()
+            self.hits = self.misses = self.evictions = self.bytes = 0
+
+    def info(self):
+        """
+        Returns cache statistics: hits, misses, evictions, number of items
+        and their size in bytes.
+        """
+
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             len(self.data), self.bytes)
+
+
+class cached_property(object):
+    """
+    Property which is computed on the first access and then stored in
+    the instance like a regular attribute. Two threads may compute it
+    both at once, the value should be the same anyway.
+
+    >>> class Foo(object):
+    ...     @cached_property
+    ...     def bar(self):
+    ...         print('computed')
+    ...         return 42
+    >>> foo = Foo()
+    >>> foo.bar
+    computed
+    42
+    >>> foo.bar
+    42
+    """
+
+    def __init__(self, func):
+        update_wrapper(self, func)
+        self.func = func
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        value = obj.__dict__[self.func.__name__] = self.func(obj)
+        return value
+
+
+#: Compiled patterns and analyzed expressions shared by all Typus instances
+#: in the process, see :func:`re_compile`. Use :meth:`LRUCache.info` to
+#: inspect it, change ``maxsize`` or ``maxbytes`` to limit it.
+pattern_cache = LRUCache(maxsize=4096)